@@ -2,32 +2,83 @@ import os
 from flask import Flask, render_template
 from flask_migrate import Migrate
 from dotenv import load_dotenv
-from urllib.parse import quote_plus  # <-- added
 
+from db import init_database
 from models import db
-from routes import init_routes
+from routes import QUERY_BUDGETS, init_routes
+from services import (
+    init_instrumentation,
+    init_listing_snapshot,
+    init_prediction_cache,
+    init_query_diagnostics,
+    init_usage_tracker,
+    init_vehicle_index,
+)
 
 load_dotenv()
 
 def create_app():
     app = Flask(__name__)
 
-    # Escape password and optional user if needed
-    db_user = quote_plus(os.getenv("DB_USER"))
-    db_password = quote_plus(os.getenv("DB_PASSWORD"))
-    db_host = os.getenv("DB_HOST", "localhost")
-    db_port = os.getenv("DB_PORT", "3307")
-    db_name = os.getenv("DB_NAME")
+    # In-process prediction cache in front of the predictions table
+    app.config['PREDICTION_CACHE_SIZE'] = int(os.getenv("PREDICTION_CACHE_SIZE") or 10000)
+    app.config['PREDICTION_CACHE_TTL'] = float(os.getenv("PREDICTION_CACHE_TTL") or 300)
+    app.config['PREDICTION_USAGE_FLUSH_INTERVAL'] = float(os.getenv("PREDICTION_USAGE_FLUSH_INTERVAL") or 30)
+    # Seconds to wait for another process fitting the same prediction
+    app.config['PREDICTION_LOCK_TIMEOUT'] = float(os.getenv("PREDICTION_LOCK_TIMEOUT") or 10)
+    # Named locks the fits share; bounds the locks, and timeouts, one request can take
+    app.config['PREDICTION_LOCK_SLOTS'] = int(os.getenv("PREDICTION_LOCK_SLOTS") or 16)
 
-    # Configure SQLAlchemy
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    )
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # In-memory make/model index behind search and autocomplete
+    app.config['VEHICLE_INDEX_CHECK_INTERVAL'] = float(os.getenv("VEHICLE_INDEX_CHECK_INTERVAL") or 60)
+    app.config['VEHICLE_INDEX_MAX_AGE'] = int(os.getenv("VEHICLE_INDEX_MAX_AGE") or 300)
+
+    # Memory-mapped listing snapshot written by scripts/export_snapshot.py; estimates
+    # for the groups it covers are fitted from it without touching the database
+    app.config['LISTING_SNAPSHOT_DIR'] = os.getenv("LISTING_SNAPSHOT_DIR") or None
+    app.config['LISTING_SNAPSHOT_CHECK_INTERVAL'] = float(os.getenv("LISTING_SNAPSHOT_CHECK_INTERVAL") or 30)
+
+    # Sample listings on the results page: the most recently seen, optionally only
+    # those seen in the last SAMPLE_MAX_AGE_DAYS (0 = any) and spread across
+    # SAMPLE_MILEAGE_BANDS equal mileage bands (1 = no bands)
+    app.config['SAMPLE_MAX_AGE_DAYS'] = int(os.getenv("SAMPLE_MAX_AGE_DAYS") or 0)
+    app.config['SAMPLE_MILEAGE_BANDS'] = int(os.getenv("SAMPLE_MILEAGE_BANDS") or 1)
+
+    # Listings per page of /listings and the default limit of /api/v1/listings
+    app.config['LISTINGS_PAGE_SIZE'] = int(os.getenv("LISTINGS_PAGE_SIZE") or 25)
+
+    # Groups with fewer listings than this in the hot table are also fitted from
+    # listings_archive; 0 fits every group from current listings only
+    app.config['ESTIMATE_HISTORY_MIN_LISTINGS'] = int(os.getenv("ESTIMATE_HISTORY_MIN_LISTINGS") or 0)
+
+    # Maximum number of vehicles accepted by /api/v1/estimate/batch
+    app.config['ESTIMATE_BATCH_LIMIT'] = int(os.getenv("ESTIMATE_BATCH_LIMIT") or 1000)
+
+    # Threads for regression fits in the async serving mode (asgi.py)
+    app.config['ESTIMATE_FIT_WORKERS'] = int(os.getenv("ESTIMATE_FIT_WORKERS") or 4)
+
+    # Requests slower than this are logged with their timing breakdown; 0 disables
+    app.config['REQUEST_SLOW_LOG_SECONDS'] = float(os.getenv("REQUEST_SLOW_LOG_SECONDS") or 1.0)
+
+    # Development and staging diagnostics: 'log' reports possible N+1 patterns,
+    # requests over their query budget and slow queries with their EXPLAIN plan;
+    # 'raise' fails those requests instead, so tests catch them
+    app.config['QUERY_DIAGNOSTICS'] = os.getenv("QUERY_DIAGNOSTICS") or 'off'
+    app.config['QUERY_N_PLUS_ONE_THRESHOLD'] = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD") or 5)
+    app.config['QUERY_SLOW_LOG_SECONDS'] = float(os.getenv("QUERY_SLOW_LOG_SECONDS") or 0.1)
+    app.config['QUERY_BUDGET'] = int(os.getenv("QUERY_BUDGET") or 0)
+    # Statements per request by route, including a prediction fit on a cache miss
+    app.config['QUERY_BUDGETS'] = dict(QUERY_BUDGETS)
 
     # Initialize extensions
-    db.init_app(app)
+    init_database(app)
+    init_instrumentation(app)
+    init_query_diagnostics(app)
     migrate = Migrate(app, db)
+    init_prediction_cache(app)
+    init_usage_tracker(app)
+    init_vehicle_index(app)
+    init_listing_snapshot(app)
 
     # Initialize routes
     init_routes(app)
@@ -0,0 +1,69 @@
+"""
+ASGI entry point for the async serving mode. The estimate and vehicle lookup
+endpoints are served by asyncio handlers on an aiomysql engine; every other
+route is passed through to the Flask app.
+
+    pip install -r requirements-async.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from controllers.async_api_controller import AsyncApiController
+from db.async_engine import create_async_engine_from_env
+from services import attach_sql_metrics, record_request
+
+
+def timed(route: str, endpoint):
+    """Wrap an async endpoint so its requests land in the same latency metrics as Flask's."""
+    async def handler(request):
+        start = time.perf_counter()
+        response = await endpoint(request)
+        record_request(route, request.method, response.status_code, time.perf_counter() - start)
+        return response
+    return handler
+
+
+def create_asgi_app(wsgi_app=flask_app, engine=None) -> Starlette:
+    """
+    Build the ASGI application.
+    
+    Args:
+        wsgi_app: Flask app serving every route without an async handler
+        engine: Async engine; created from the DB_* settings when omitted
+        
+    Returns:
+        Starlette application
+    """
+    controller = AsyncApiController(
+        engine if engine is not None else create_async_engine_from_env(),
+        wsgi_app,
+        fit_workers=wsgi_app.config.get('ESTIMATE_FIT_WORKERS', 4),
+    )
+    attach_sql_metrics(controller.engine.sync_engine)
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await controller.close()
+    
+    async_routes = [
+        ("/api/v1/estimate", controller.estimate, ["GET", "POST"]),
+        ("/api/v1/estimate/batch", controller.estimate_batch, ["POST"]),
+        ("/api/v1/makes", controller.makes, None),
+        ("/api/v1/models", controller.models, None),
+        ("/api/v1/autocomplete", controller.autocomplete, None),
+    ]
+    routes = [
+        Route(path, timed(path, endpoint), methods=methods) for path, endpoint, methods in async_routes
+    ]
+    routes.append(Mount("/", app=WSGIMiddleware(wsgi_app)))
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_asgi_app()
@@ -0,0 +1,5 @@
+"""
+Component benchmarks: a deterministic synthetic feed generator and timings
+for feed parsing, ingest, regression fits and estimate latency. Run with
+python -m benchmarks.run; see the README.
+"""
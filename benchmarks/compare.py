@@ -0,0 +1,64 @@
+import json
+import argparse
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """Flatten nested results into dotted metric names, keeping numbers only."""
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(baseline: dict, candidate: dict):
+    """
+    Pair up the metrics of two result documents.
+    Args:
+        baseline: Results document of the reference run
+        candidate: Results document of the run being evaluated
+    Returns:
+        List of (metric, baseline value, candidate value, relative change or None)
+    """
+    before = flatten(baseline['results'])
+    after = flatten(candidate['results'])
+    rows = []
+    for name in sorted(before.keys() | after.keys()):
+        old, new = before.get(name), after.get(name)
+        change = (new - old) / old if old and new is not None else None
+        rows.append((name, old, new, change))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="Results file of the reference run")
+    parser.add_argument("candidate", help="Results file of the run being evaluated")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for document in (baseline, candidate):
+        print(f"{document['started_at']}  {document['git_commit'] or '-'}  "
+              f"{document['database']['dialect']}  {document['feed']['size'] or document['feed']['path']}")
+    print()
+    rows = compare(baseline, candidate)
+    width = max((len(name) for name, *_ in rows), default=10)
+    for name, old, new, change in rows:
+        old_text = '-' if old is None else f"{old:,}"
+        new_text = '-' if new is None else f"{new:,}"
+        change_text = '' if change is None else f"{change:+.1%}"
+        print(f"{name:<{width}}  {old_text:>16}  {new_text:>16}  {change_text:>8}")
+
+
+if __name__ == "__main__":
+    main()
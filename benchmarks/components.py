@@ -0,0 +1,218 @@
+import io
+import random
+import shutil
+import tempfile
+import time
+from contextlib import nullcontext, redirect_stdout
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from controllers import HomeController
+from models import db, Listing, Prediction, RegressionStat, Vehicle
+from scripts.export_snapshot import export_snapshot
+from scripts.feed_parser import parse_line
+from scripts.materialize_predictions import materialize_predictions, stream_group_sums
+from scripts.populate_database import process_file_batched
+from services import fit_groups, invalidate_predictions, listing_snapshot, model_id_cache
+
+
+def latency_summary(samples) -> dict:
+    """Summarise latency samples, given in seconds, in milliseconds."""
+    if not samples:
+        return {'count': 0}
+    milliseconds = np.array(samples) * 1000
+    return {
+        'count': len(samples),
+        'mean_ms': round(float(milliseconds.mean()), 4),
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 4),
+        'p95_ms': round(float(np.percentile(milliseconds, 95)), 4),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 4),
+        'max_ms': round(float(milliseconds.max()), 4),
+    }
+
+
+def bench_parse(file_path: str) -> dict:
+    """
+    Time parse_line over every line of the feed, reading the file up front
+    so only parsing is measured.
+    """
+    with open(file_path, 'r') as f:
+        f.readline()  # Skip the header line
+        lines = [line.strip() for line in f]
+
+    errors = 0
+    start_time = time.perf_counter()
+    for line in lines:
+        try:
+            parse_line(line)
+        except ValueError:
+            errors += 1
+    elapsed = time.perf_counter() - start_time
+    return {
+        'lines': len(lines),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'lines_per_second': round(len(lines) / elapsed, 1) if elapsed else None,
+    }
+
+
+def bench_ingest(file_path: str, app, chunk_size: int = 1000, verbose: bool = False) -> dict:
+    """
+    Load the feed into an empty schema with the batched loader. All tables in
+    the benchmark database are dropped and recreated first.
+    """
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    invalidate_predictions()
+    model_id_cache.invalidate()
+
+    start_time = time.perf_counter()
+    with nullcontext() if verbose else redirect_stdout(io.StringIO()):
+        processed, errors = process_file_batched(file_path, app, chunk_size)
+    elapsed = time.perf_counter() - start_time
+
+    with app.app_context():
+        listings = db.session.scalar(select(func.count()).select_from(Listing))
+        groups = db.session.scalar(select(func.count()).select_from(RegressionStat))
+    return {
+        'chunk_size': chunk_size,
+        'records': processed,
+        'errors': errors,
+        'listings': listings,
+        'regression_groups': groups,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(processed / elapsed, 1) if elapsed else None,
+    }
+
+
+def bench_fit(app, fetch_size: int = 100000) -> dict:
+    """
+    Time the regression fits: the vectorised pass over listings used by
+    materialize_predictions, the per-group fit from regression_stats used on
+    a cache miss, and the full materialize run including the writes.
+    """
+    with app.app_context():
+        start_time = time.perf_counter()
+        keys, sums, _ = stream_group_sums(fetch_size)
+        read_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        slope, _, _ = fit_groups(sums)
+        vectorised_time = time.perf_counter() - start_time
+
+        stats = db.session.scalars(select(RegressionStat)).all()
+        start_time = time.perf_counter()
+        fitted = sum(1 for stat in stats if Prediction.from_stat(stat) is not None)
+        per_group_time = time.perf_counter() - start_time
+        db.session.rollback()
+
+        start_time = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            written = materialize_predictions(fetch_size)
+        materialize_time = time.perf_counter() - start_time
+
+    return {
+        'groups': len(keys),
+        'listings': int(sums[0].sum()) if len(keys) else 0,
+        'stream_seconds': round(read_time, 3),
+        'vectorised_fit_seconds': round(vectorised_time, 4),
+        'vectorised_fitted': int((~np.isnan(slope)).sum()),
+        'per_group_fit_seconds': round(per_group_time, 4),
+        'per_group_fitted': fitted,
+        'per_group_fit_us': round(per_group_time / len(stats) * 1e6, 2) if stats else None,
+        'materialize_seconds': round(materialize_time, 3),
+        'materialized': written,
+    }
+
+
+def sample_vehicles(app, count: int, seed: int = 42) -> list:
+    """
+    Pick (year, make, model, mileage) queries from groups with enough
+    listings to fit, deterministically for a given database and seed.
+    """
+    with app.app_context():
+        rows = db.session.execute(
+            select(RegressionStat.year, Vehicle.make, Vehicle.model, RegressionStat.sum_x, RegressionStat.n)
+            .join(Vehicle, Vehicle.model_id == RegressionStat.model_id)
+            .where(RegressionStat.n >= 2)
+            .order_by(RegressionStat.year, RegressionStat.model_id)
+        ).all()
+    rng = random.Random(seed)
+    rows = rng.sample(rows, min(count, len(rows)))
+    return [(year, make, model, int(sum_x / n)) for year, make, model, sum_x, n in rows]
+
+
+def bench_estimate(app, samples: int = 200, seed: int = 42) -> dict:
+    """
+    Time HomeController.estimate for distinct vehicles in three states: a
+    miss that has to fit and store the prediction, a miss in the in-process
+    cache answered from the predictions table, and a cache hit.
+    """
+    vehicles = sample_vehicles(app, samples, seed)
+    controller = HomeController()
+    results = {'vehicles': len(vehicles)}
+
+    with app.app_context():
+        db.session.execute(delete(Prediction))
+        db.session.commit()
+        invalidate_predictions()
+        model_id_cache.invalidate()
+
+        for label in ('miss_fit', 'miss_stored', 'hit'):
+            if label == 'miss_stored':
+                invalidate_predictions()
+                model_id_cache.invalidate()
+            timings = []
+            for year, make, model, mileage in vehicles:
+                start_time = time.perf_counter()
+                controller.estimate(year, make, model, mileage)
+                timings.append(time.perf_counter() - start_time)
+                db.session.remove()
+            results[label] = latency_summary(timings)
+    return results
+
+
+
+def bench_snapshot(app, samples: int = 200, seed: int = 42) -> dict:
+    """
+    Export the listing snapshot to a temporary directory, then time
+    HomeController.estimate served from it: the first request per group
+    fits from the mapped arrays, later ones reuse the fit.
+    """
+    vehicles = sample_vehicles(app, samples, seed)
+    controller = HomeController()
+    directory = tempfile.mkdtemp(prefix='listing-snapshot-')
+    try:
+        with app.app_context():
+            start_time = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                export_snapshot(directory)
+            export_time = time.perf_counter() - start_time
+
+            listing_snapshot.configure(directory, check_interval=3600)
+            start_time = time.perf_counter()
+            snapshot = listing_snapshot.current()
+            open_time = time.perf_counter() - start_time
+            invalidate_predictions()
+            model_id_cache.invalidate()
+
+            results = {
+                'rows': snapshot.rows,
+                'groups': len(snapshot),
+                'export_seconds': round(export_time, 3),
+                'open_ms': round(open_time * 1000, 3),
+                'vehicles': len(vehicles),
+            }
+            for label in ('first', 'repeat'):
+                timings = []
+                for year, make, model, mileage in vehicles:
+                    start_time = time.perf_counter()
+                    controller.estimate(year, make, model, mileage)
+                    timings.append(time.perf_counter() - start_time)
+                    db.session.remove()
+                results[label] = latency_summary(timings)
+    finally:
+        listing_snapshot.configure(None, listing_snapshot.check_interval)
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
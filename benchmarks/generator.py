@@ -0,0 +1,267 @@
+import sys
+import os
+import bisect
+import random
+import argparse
+from datetime import date, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.feed_parser import FIELD_COUNT
+
+# Named feed sizes, in data lines
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+HEADER = (
+    "VIN|Year|Make|Model|Trim|DealerName|Street|City|State|Zip|Price|Mileage|Used|Certified|"
+    "Style|DrivenWheels|Engine|FuelType|ExteriorColor|InteriorColor|Website|FirstSeen|"
+    "LastSeen|VdpLastSeen|Status"
+)
+
+# Make, WMI prefix and number of models. About 1,000 models in total; the
+# largest makes have the longest model lines, as in real feeds
+MAKES = (
+    ('Toyota', '4T1', 48), ('Ford', '1FA', 52), ('Chevrolet', '1G1', 50), ('Honda', '1HG', 36),
+    ('Nissan', '1N4', 38), ('Jeep', '1C4', 18), ('Hyundai', 'KMH', 30), ('Kia', 'KNA', 28),
+    ('Ram', '3C6', 12), ('GMC', '1GT', 20), ('Subaru', 'JF1', 16), ('BMW', 'WBA', 44),
+    ('Mercedes-Benz', 'WDD', 46), ('Volkswagen', '3VW', 26), ('Dodge', '2C3', 20),
+    ('Lexus', 'JTH', 28), ('Mazda', 'JM1', 20), ('Audi', 'WAU', 34), ('Tesla', '5YJ', 6),
+    ('Buick', '1G4', 16), ('Cadillac', '1G6', 22), ('Acura', '19U', 16), ('Chrysler', '2C4', 12),
+    ('Infiniti', 'JN1', 18), ('Lincoln', '2LM', 16), ('Volvo', 'YV1', 18), ('Mitsubishi', 'JA4', 14),
+    ('Land Rover', 'SAL', 12), ('Porsche', 'WP0', 12), ('Jaguar', 'SAJ', 12), ('Genesis', 'KMT', 8),
+    ('Mini', 'WMW', 10), ('Alfa Romeo', 'ZAR', 6), ('Fiat', '3C3', 8), ('Maserati', 'ZAM', 8),
+    ('Bentley', 'SCB', 6), ('Ferrari', 'ZFF', 10), ('Lamborghini', 'ZHW', 6), ('Rolls-Royce', 'SCA', 5),
+    ('Aston Martin', 'SCF', 6), ('Polestar', 'LPS', 3), ('Rivian', '7FC', 3), ('Lucid', '50E', 2),
+    ('Scion', 'JTK', 8), ('Pontiac', '1G2', 14), ('Saturn', '1G8', 10), ('Mercury', '2ME', 10),
+    ('Hummer', '5GR', 4), ('Suzuki', 'JS3', 10), ('Smart', 'WME', 2),
+)
+
+MODEL_SYLLABLES = (
+    'al', 'ar', 'ca', 'co', 'da', 'el', 'en', 'ga', 'io', 'ka', 'la', 'li', 'ma', 'mo', 'na',
+    'no', 'ra', 'ri', 'sa', 'so', 'ta', 'te', 'va', 've', 'xo', 'za',
+)
+
+TRIMS = ('Base', 'S', 'SE', 'SEL', 'LE', 'XLE', 'LX', 'EX', 'EX-L', 'Sport', 'Touring',
+         'Limited', 'Platinum', 'Premium', 'Luxury', 'SR5', 'LT', 'LTZ', 'Denali', 'GT')
+STYLES = ('Sedan', 'SUV', 'Pickup', 'Hatchback', 'Coupe', 'Minivan', 'Wagon', 'Convertible')
+DRIVEN_WHEELS = ('FWD', 'RWD', 'AWD', '4WD')
+ENGINES = ('1.5L I4', '2.0L I4', '2.0L I4 Turbo', '2.5L I4', '3.0L V6', '3.5L V6',
+           '5.0L V8', '5.7L V8', '6.2L V8', 'Electric')
+FUEL_TYPES = ('Gasoline', 'Gasoline', 'Gasoline', 'Gasoline', 'Diesel', 'Hybrid', 'Flex Fuel')
+COLORS = ('Black', 'White', 'Silver', 'Gray', 'Blue', 'Red', 'Green', 'Brown', 'Beige', 'Orange')
+INTERIOR_COLORS = ('Black', 'Gray', 'Beige', 'Tan', 'Brown', 'White', 'Red')
+DEALER_WORDS = ('Auto', 'Motors', 'Cars', 'Autoplex', 'Automotive', 'Motor Company', 'Auto Group')
+STREETS = ('Main', 'Oak', 'Maple', 'Cedar', 'Elm', 'Washington', 'Lake', 'Hill', 'Park', 'Pine',
+           'Market', 'Broadway', 'Highland', 'Lincoln', 'Jackson', 'Sunset', 'Ridge', 'Mill')
+STREET_TYPES = ('St', 'Ave', 'Blvd', 'Rd', 'Hwy', 'Pkwy', 'Dr')
+CITIES = (
+    ('Houston', 'TX', '770'), ('Dallas', 'TX', '752'), ('Austin', 'TX', '787'),
+    ('Phoenix', 'AZ', '850'), ('Los Angeles', 'CA', '900'), ('San Diego', 'CA', '921'),
+    ('Sacramento', 'CA', '958'), ('Denver', 'CO', '802'), ('Miami', 'FL', '331'),
+    ('Orlando', 'FL', '328'), ('Tampa', 'FL', '336'), ('Atlanta', 'GA', '303'),
+    ('Chicago', 'IL', '606'), ('Indianapolis', 'IN', '462'), ('Boston', 'MA', '021'),
+    ('Detroit', 'MI', '482'), ('Minneapolis', 'MN', '554'), ('St. Louis', 'MO', '631'),
+    ('Charlotte', 'NC', '282'), ('Raleigh', 'NC', '276'), ('Newark', 'NJ', '071'),
+    ('New York', 'NY', '100'), ('Columbus', 'OH', '432'), ('Cleveland', 'OH', '441'),
+    ('Portland', 'OR', '972'), ('Philadelphia', 'PA', '191'), ('Pittsburgh', 'PA', '152'),
+    ('Nashville', 'TN', '372'), ('Salt Lake City', 'UT', '841'), ('Seattle', 'WA', '981'),
+    ('Las Vegas', 'NV', '891'), ('Kansas City', 'MO', '641'), ('Omaha', 'NE', '681'),
+    ('Richmond', 'VA', '232'), ('Milwaukee', 'WI', '532'), ('Albuquerque', 'NM', '871'),
+)
+
+# VIN characters; I, O and Q are never used
+VIN_CHARS = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+VIN_YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'  # 1980-2009, then repeating from 2010
+
+FIRST_YEAR = 1995
+LAST_YEAR = 2025
+FEED_START = date(2024, 1, 1)
+FEED_DAYS = 365
+
+# Share of lines that relist a VIN seen earlier in the feed
+RELIST_RATE = 0.08
+# Upper bound on remembered VINs, so memory stays flat at 10M lines
+RELIST_POOL_SIZE = 100_000
+
+
+def dealer_count(lines: int) -> int:
+    """Number of dealers for a feed size: about one per 150 lines, capped near the US total."""
+    return min(max(lines // 150, 50), 60_000)
+
+
+def zipf_weights(count: int, exponent: float = 1.1):
+    """Cumulative Zipf weights, so a few values dominate like real makes and models."""
+    weights = [1 / (rank ** exponent) for rank in range(1, count + 1)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+
+def build_catalog(rng: random.Random):
+    """
+    Build the vehicle catalog.
+    Args:
+        rng: Seeded random generator
+    Returns:
+        List of (make, WMI, model, VDS code, base price, style) tuples, most popular first
+    """
+    catalog = []
+    for make, wmi, model_count in MAKES:
+        names = set()
+        while len(names) < model_count:
+            syllables = rng.randint(2, 3)
+            name = ''.join(rng.choice(MODEL_SYLLABLES) for _ in range(syllables)).capitalize()
+            if rng.random() < 0.25:
+                name = f"{name} {rng.choice(('Hybrid', 'Sport', 'XL', 'Plus', 'GT'))}"
+            names.add(name)
+        luxury = wmi[0] in 'SWZ' or make in ('Lexus', 'Cadillac', 'Lincoln', 'Genesis', 'Tesla')
+        for name in sorted(names):
+            vds = ''.join(rng.choice(VIN_CHARS) for _ in range(5))
+            base_price = rng.uniform(38_000, 120_000) if luxury else rng.uniform(18_000, 55_000)
+            catalog.append((make, wmi, name, vds, base_price, rng.choice(STYLES)))
+    return catalog
+
+
+def build_dealers(rng: random.Random, count: int):
+    """
+    Build the dealer list.
+    Args:
+        rng: Seeded random generator
+        count: Number of dealers
+    Returns:
+        List of (name, street, city, state, zip, website) tuples
+    """
+    dealers = []
+    for i in range(count):
+        city, state, zip_prefix = rng.choice(CITIES)
+        name = f"{rng.choice(STREETS)} {rng.choice(DEALER_WORDS)} {i}"
+        street = f"{rng.randint(100, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}"
+        zip_code = f"{zip_prefix}{rng.randint(0, 99):02d}"
+        website = f"https://www.{name.lower().replace(' ', '').replace('.', '')}.com" if rng.random() < 0.8 else ''
+        dealers.append((name, street, city, state, zip_code, website))
+    return dealers
+
+
+def weighted_index(rng: random.Random, cumulative) -> int:
+    """Pick an index from cumulative weights."""
+    return min(bisect.bisect_left(cumulative, rng.random() * cumulative[-1]), len(cumulative) - 1)
+
+
+def make_vin(wmi: str, vds: str, year: int, serial: int) -> str:
+    """Build a 17-character VIN whose prefix and model year code match the vehicle."""
+    digits = []
+    for _ in range(6):
+        serial, digit = divmod(serial, len(VIN_CHARS))
+        digits.append(VIN_CHARS[digit])
+    year_code = VIN_YEAR_CODES[(year - 1980) % len(VIN_YEAR_CODES)]
+    check = VIN_CHARS[(serial + year) % 10]
+    return f"{wmi}{vds}{check}{year_code}{VIN_CHARS[year % 20]}{''.join(reversed(digits))}"
+
+
+def listing_line(rng: random.Random, vehicle, dealer, year: int, vin: str) -> str:
+    """Build one feed line with realistic mileage, price and seen dates."""
+    make, _, model, _, base_price, style = vehicle
+    name, street, city, state, zip_code, website = dealer
+
+    age = max(LAST_YEAR - year, 0)
+    used = age > 0 or rng.random() < 0.1
+    if used:
+        mileage = max(int(rng.gauss(12_000, 4_000) * (age + rng.random())), 5)
+    else:
+        mileage = rng.randint(0, 50)
+    # Steep depreciation for the first ten years, slower after that
+    depreciation = 0.86 ** min(age, 10) * 0.95 ** max(age - 10, 0)
+    value = base_price * depreciation * max(1 - mileage / 300_000, 0.3)
+    price = value + rng.gauss(0, value * 0.08)
+    price = max(round(price, -1), 500)
+    first_seen = FEED_START + timedelta(days=rng.randrange(FEED_DAYS))
+    last_seen = first_seen + timedelta(days=rng.randrange(90))
+
+    fields = [
+        vin,
+        str(year),
+        make,
+        model,
+        rng.choice(TRIMS) if rng.random() < 0.9 else '',
+        name, street, city, state, zip_code,
+        str(int(price)) if rng.random() < 0.97 else '',
+        str(mileage) if rng.random() < 0.98 else '',
+        'TRUE' if used else 'FALSE',
+        'TRUE' if used and rng.random() < 0.12 else 'FALSE',
+        style,
+        rng.choice(DRIVEN_WHEELS),
+        rng.choice(ENGINES),
+        rng.choice(FUEL_TYPES),
+        rng.choice(COLORS),
+        rng.choice(INTERIOR_COLORS) if rng.random() < 0.85 else '',
+        website,
+        first_seen.isoformat(),
+        last_seen.isoformat(),
+        last_seen.isoformat() if rng.random() < 0.9 else '',
+        'Active',
+    ]
+    return '|'.join(fields)
+
+
+def generate_feed(file_path: str, lines: int, seed: int = 42) -> None:
+    """
+    Write a deterministic synthetic feed in the 25-field pipe-delimited format.
+    The same size and seed always produce the same file. Makes and models
+    follow a Zipf popularity curve over about 1,000 models, dealers scale
+    with the feed size, and a share of lines relist VINs seen earlier.
+    Args:
+        file_path: Path of the feed file to write
+        lines: Number of data lines, excluding the header
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    catalog = build_catalog(rng)
+    dealers = build_dealers(rng, dealer_count(lines))
+    vehicle_weights = zipf_weights(len(catalog), 0.9)
+    dealer_weights = zipf_weights(len(dealers), 0.6)
+    year_weights = zipf_weights(LAST_YEAR - FIRST_YEAR + 1, 0.7)
+
+    relist_pool = []
+    with open(file_path, 'w', buffering=1024 * 1024) as f:
+        f.write(HEADER + '\n')
+        for serial in range(lines):
+            if relist_pool and rng.random() < RELIST_RATE:
+                vehicle_index, year, vin = rng.choice(relist_pool)
+            else:
+                vehicle_index = weighted_index(rng, vehicle_weights)
+                year = LAST_YEAR - weighted_index(rng, year_weights)
+                vehicle = catalog[vehicle_index]
+                vin = make_vin(vehicle[1], vehicle[3], year, serial)
+                if len(relist_pool) < RELIST_POOL_SIZE:
+                    relist_pool.append((vehicle_index, year, vin))
+                else:
+                    relist_pool[rng.randrange(RELIST_POOL_SIZE)] = (vehicle_index, year, vin)
+            dealer = dealers[weighted_index(rng, dealer_weights)]
+            f.write(listing_line(rng, catalog[vehicle_index], dealer, year, vin) + '\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic pipe-delimited listings feed")
+    parser.add_argument("file_path", help="Path of the feed file to write")
+    parser.add_argument("--size", choices=SIZES, default='10k',
+                        help="Number of lines: 10k, 1m or 10m (default: 10k)")
+    parser.add_argument("--lines", type=int, help="Exact number of lines, overriding --size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    lines = args.lines or SIZES[args.size]
+    generate_feed(args.file_path, lines, args.seed)
+    print(f"Wrote {lines:,} lines ({FIELD_COUNT} fields each) to {args.file_path}")
+
+
+if __name__ == "__main__":
+    main()
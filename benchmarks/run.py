@@ -0,0 +1,152 @@
+import sys
+import os
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import make_url
+
+from db import init_database
+from models import db
+from benchmarks.components import bench_estimate, bench_fit, bench_ingest, bench_parse, bench_snapshot
+from benchmarks.generator import SIZES, generate_feed
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+# Run order matters: the later benchmarks read what ingest loaded
+BENCHMARKS = ('parse', 'ingest', 'fit', 'estimate', 'snapshot')
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'bench.sqlite')}"
+
+
+def create_benchmark_app(database_url: str) -> Flask:
+    """Create a bare app bound to the benchmark database."""
+    app = Flask(__name__)
+    overrides = {'connect_args': {'check_same_thread': False}} if database_url.startswith('sqlite') else None
+    init_database(app, overrides, uri=database_url)
+    return app
+
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def feed_path(args) -> str:
+    """Return the feed to benchmark, generating it first if it does not exist yet."""
+    if args.feed:
+        return args.feed
+    path = os.path.join(DATA_DIR, f"feed-{args.size}-{args.seed}.txt")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"Generating {SIZES[args.size]:,} line feed at {path}...")
+        generate_feed(path, SIZES[args.size], args.seed)
+    return path
+
+
+def run(args) -> dict:
+    """Run the selected benchmarks and return the results document."""
+    selected = [name for name in BENCHMARKS if name in args.only]
+    file_path = feed_path(args)
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        server_version = '.'.join(str(part) for part in db.engine.dialect.server_version_info or ())
+
+    document = {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': {
+            'dialect': make_url(args.database_url).get_backend_name(),
+            'server_version': server_version,
+        },
+        'feed': {
+            'path': file_path,
+            'size': None if args.feed else args.size,
+            'seed': None if args.feed else args.seed,
+            'bytes': os.path.getsize(file_path),
+        },
+        'results': {},
+    }
+
+    for name in selected:
+        print(f"Running {name}...")
+        if name == 'parse':
+            result = bench_parse(file_path)
+        elif name == 'ingest':
+            result = bench_ingest(file_path, app, args.chunk_size, args.verbose)
+        elif name == 'fit':
+            result = bench_fit(app, args.fetch_size)
+        elif name == 'estimate':
+            result = bench_estimate(app, args.samples, args.seed)
+        else:
+            result = bench_snapshot(app, args.samples, args.seed)
+        document['results'][name] = result
+        print(json.dumps(result, indent=2))
+    return document
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark feed parsing, ingest, regression fits and estimate latency"
+    )
+    parser.add_argument("--size", choices=SIZES, default='10k',
+                        help="Synthetic feed size: 10k, 1m or 10m lines (default: 10k)")
+    parser.add_argument("--seed", type=int, default=42, help="Generator and sampling seed (default: 42)")
+    parser.add_argument("--feed", help="Benchmark an existing feed file instead of a generated one")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help="SQLAlchemy URL of the benchmark database; ingest drops and "
+                             "recreates all of its tables (default: SQLite file in benchmarks/data)")
+    parser.add_argument("--only", type=lambda value: value.split(','), default=list(BENCHMARKS),
+                        help=f"Comma-separated benchmarks to run (default: {','.join(BENCHMARKS)})")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Lines per chunk for the ingest benchmark (default: 1000)")
+    parser.add_argument("--fetch-size", type=int, default=100000,
+                        help="Rows per round trip for the fit benchmark (default: 100000)")
+    parser.add_argument("--samples", type=int, default=200,
+                        help="Distinct vehicles timed by the estimate benchmark (default: 200)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<time>-<dialect>-<size>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show the loader's progress output")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        print(f"Error: unknown benchmark(s): {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    if args.feed and not os.path.exists(args.feed):
+        print(f"Error: File '{args.feed}' not found")
+        sys.exit(1)
+    if args.database_url == DEFAULT_DATABASE_URL:
+        os.makedirs(DATA_DIR, exist_ok=True)
+
+    document = run(args)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        label = 'custom' if args.feed else args.size
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{document['database']['dialect']}-{label}.json")
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
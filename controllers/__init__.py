@@ -1,3 +1,5 @@
 from .home_controller import HomeController
+from .api_controller import ApiController
+from .health_controller import HealthController
 
-__all__ = ['HomeController'] 
\ No newline at end of file
+__all__ = ['HomeController', 'ApiController', 'HealthController'] 
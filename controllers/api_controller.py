@@ -0,0 +1,335 @@
+import re
+from .base_controller import BaseController
+from .home_controller import HomeController, parse_listing_query
+from flask import current_app, jsonify, request
+from models import Dealer, Listing, PriceModel, Vehicle, db
+from services import decode_vin, vehicle_index_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+VIN_PATTERN = re.compile(r'[A-Z0-9]{17}')
+
+class ApiController(BaseController):
+    """Controller for the JSON price estimate API."""
+    
+    def __init__(self, home_controller: Optional[HomeController] = None):
+        super().__init__()
+        self.home_controller = home_controller or HomeController()
+    
+    def estimate(self):
+        """
+        Handle a single estimate, given as query parameters or a JSON object
+        with year, make, model and an optional mileage.
+        
+        Returns:
+            JSON estimate, 400 for invalid input or 404 if there is not enough data
+        """
+        data = request.get_json(silent=True) if request.is_json else request.args
+        try:
+            year, make, model, mileage = parse_vehicle(data)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        
+        price_model = self.home_controller.price_models([(year, make, model)])[(year, make, model)]
+        if price_model is None:
+            return jsonify(error="Not enough data to estimate this vehicle"), 404
+        return jsonify(estimate_result(year, make, model, mileage, price_model))
+    
+    def estimate_batch(self):
+        """
+        Handle a batch of estimates. The body is a JSON object whose "vehicles"
+        list holds up to ESTIMATE_BATCH_LIMIT objects shaped like the single
+        estimate input. Results are returned in input order, with a null
+        estimated_price for vehicles without enough data.
+        
+        Returns:
+            JSON object with a "results" list, or 400 for invalid input
+        """
+        try:
+            parsed = parse_batch(
+                request.get_json(silent=True),
+                current_app.config.get('ESTIMATE_BATCH_LIMIT', 1000),
+            )
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        
+        price_models = self.home_controller.price_models(
+            (year, make, model) for year, make, model, _ in parsed
+        )
+        results = [
+            estimate_result(year, make, model, mileage, price_models[(year, make, model)])
+            for year, make, model, mileage in parsed
+        ]
+        return jsonify(results=results)
+    
+    def vin(self, vin: str):
+        """
+        Handle a VIN lookup. A listed VIN returns its listing and an estimate at
+        the listing's mileage. Any other VIN is decoded to a year, make and model
+        through its prefix and estimated like a search. A mileage query
+        parameter overrides the mileage used for the estimate.
+        
+        Args:
+            vin: Vehicle identification number from the URL
+            
+        Returns:
+            JSON result, 400 for an invalid VIN or 404 if it cannot be decoded
+        """
+        vin = vin.strip().upper()
+        if not VIN_PATTERN.fullmatch(vin):
+            return jsonify(error="VIN must be 17 letters or digits"), 400
+        try:
+            mileage = parse_mileage(request.args.get("mileage"))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        
+        listing = self._listing(vin)
+        if listing is not None:
+            source = "listing"
+            year, make, model = listing.year, listing.make, listing.model
+            if mileage is None:
+                mileage = listing.mileage
+        else:
+            decoded = decode_vin(vin)
+            if decoded is None:
+                return jsonify(error="VIN is not listed and its prefix is unknown"), 404
+            source = "vin_prefix"
+            year, make, model = decoded.year, decoded.make, decoded.model
+        
+        price_model = self.home_controller.price_models([(year, make, model)])[(year, make, model)]
+        result = estimate_result(year, make, model, mileage, price_model)
+        result.update(
+            vin=vin,
+            source=source,
+            listing=self._listing_json(listing) if listing is not None else None,
+        )
+        return jsonify(result)
+    
+    def listings(self):
+        """
+        Handle one page of the listings for the year, make and model query
+        parameters, with an optional sort, trim, certified, state, cursor and
+        limit (at most 100).
+        
+        Returns:
+            JSON object with a "listings" list and the "next_cursor" to pass for
+            the next page (null on the last page), or 400 for invalid parameters
+        """
+        try:
+            query = parse_listing_query(request.args)
+            limit = parse_int(request.args.get("limit"), "limit") or current_app.config.get('LISTINGS_PAGE_SIZE', 25)
+            listings, next_cursor = self.home_controller.listing_page(**query, limit=min(max(limit, 1), 100))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(
+            listings=[self._listing_json(listing) for listing in listings],
+            next_cursor=next_cursor,
+        )
+    
+    def makes(self):
+        """
+        Handle the list of makes.
+        
+        Returns:
+            Cacheable JSON object with a sorted "makes" list
+        """
+        index = vehicle_index_cache.get()
+        return self._cached(index, makes=index.makes())
+    
+    def models(self):
+        """
+        Handle the list of models for the make query parameter, matched
+        case-insensitively.
+        
+        Returns:
+            Cacheable JSON object with a sorted "models" list, or 400 without a make
+        """
+        make = request.args.get("make", "").strip()
+        if not make:
+            return jsonify(error="make is required"), 400
+        index = vehicle_index_cache.get()
+        return self._cached(index, make=make, models=index.models(make))
+    
+    def autocomplete(self):
+        """
+        Handle vehicle autocomplete for the q query parameter. Matches vehicles
+        whose "make model" or model starts with q, case-insensitively.
+        
+        Returns:
+            Cacheable JSON object with a "vehicles" list of make and model objects
+        """
+        prefix = request.args.get("q", "").strip()
+        try:
+            limit = parse_int(request.args.get("limit"), "limit") or 10
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        limit = min(max(limit, 1), 100)
+        
+        index = vehicle_index_cache.get()
+        matches = index.complete(prefix, limit) if prefix else []
+        return self._cached(
+            index, vehicles=[{"make": make, "model": model} for make, model in matches]
+        )
+    
+    def _cached(self, index, **payload):
+        """
+        Build a JSON response with cache headers. The ETag changes whenever the
+        vehicle index is rebuilt with different contents.
+        """
+        response = jsonify(payload)
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get('VEHICLE_INDEX_MAX_AGE', 300)
+        response.set_etag(index.etag)
+        return response.make_conditional(request)
+    
+    def _listing(self, vin: str):
+        """
+        Fetch a listing with its vehicle and dealer by primary key.
+        
+        Returns:
+            Row with the listing columns the API returns, or None if the VIN is not listed
+        """
+        return (
+            db.session.query(
+                Listing.vin,
+                Listing.year,
+                Listing.trim,
+                Listing.price,
+                Listing.mileage,
+                Listing.used,
+                Listing.certified,
+                Listing.first_seen,
+                Listing.last_seen,
+                Listing.status,
+                Vehicle.make,
+                Vehicle.model,
+                Dealer.name.label('dealer_name'),
+                Dealer.city,
+                Dealer.state,
+            )
+            .join(Vehicle, Listing.model_id == Vehicle.model_id)
+            .join(Dealer, Listing.dealer_id == Dealer.dealer_id)
+            .filter(Listing.vin == vin)
+            .first()
+        )
+    
+    def _listing_json(self, listing) -> Dict[str, Any]:
+        """Convert a listing row to JSON-serializable values."""
+        return {
+            "vin": listing.vin,
+            "year": listing.year,
+            "make": listing.make,
+            "model": listing.model,
+            "trim": listing.trim,
+            "price": float(listing.price) if listing.price is not None else None,
+            "mileage": listing.mileage,
+            "used": listing.used,
+            "certified": listing.certified,
+            "first_seen": listing.first_seen.isoformat() if listing.first_seen else None,
+            "last_seen": listing.last_seen.isoformat() if listing.last_seen else None,
+            "status": listing.status,
+            "dealer_name": listing.dealer_name,
+            "city": listing.city,
+            "state": listing.state,
+        }
+
+
+def parse_vehicle(data) -> Tuple[int, str, str, Optional[int]]:
+    """
+    Validate one estimate request.
+    
+    Returns:
+        Tuple of (year, make, model, mileage)
+        
+    Raises:
+        ValueError: If a field is missing or has the wrong type
+    """
+    if not hasattr(data, 'get'):
+        raise ValueError("Expected an object with year, make and model")
+    
+    make = data.get("make")
+    model = data.get("model")
+    if not isinstance(make, str) or not make or not isinstance(model, str) or not model:
+        raise ValueError("make and model are required")
+    
+    year = parse_int(data.get("year"), "year")
+    if year is None:
+        raise ValueError("year is required")
+    return year, make, model, parse_mileage(data.get("mileage"))
+
+
+def parse_batch(data, limit: int) -> List[Tuple[int, str, str, Optional[int]]]:
+    """
+    Validate a batch estimate request body.
+    
+    Returns:
+        List of (year, make, model, mileage) tuples in input order
+        
+    Raises:
+        ValueError: If the body is malformed, too large or has an invalid vehicle
+    """
+    vehicles = data.get("vehicles") if isinstance(data, dict) else None
+    if not isinstance(vehicles, list):
+        raise ValueError('Expected a JSON object with a "vehicles" list')
+    if len(vehicles) > limit:
+        raise ValueError(f"At most {limit} vehicles per batch")
+    
+    parsed = []
+    for index, item in enumerate(vehicles):
+        try:
+            parsed.append(parse_vehicle(item))
+        except ValueError as e:
+            raise ValueError(f"vehicles[{index}]: {e}")
+    return parsed
+
+
+def parse_int(value, name: str) -> Optional[int]:
+    """
+    Convert a JSON number or query string value to an int, treating empty
+    values as missing. A JSON float is accepted only if it is whole, so 2015.0
+    is 2015 but 2015.7 and 1e400 (infinity once parsed) are rejected.
+    
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        return int(value)
+    except (OverflowError, TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def parse_mileage(value) -> Optional[int]:
+    """
+    Convert an optional mileage with parse_int.
+    
+    Raises:
+        ValueError: If the mileage is not an integer or is negative
+    """
+    mileage = parse_int(value, "mileage")
+    if mileage is not None and mileage < 0:
+        raise ValueError("mileage must not be negative")
+    return mileage
+
+
+def estimate_result(year: int, make: str, model: str, mileage: Optional[int],
+                    price_model: Optional[PriceModel]) -> Dict[str, Any]:
+    """Build the JSON result for one vehicle."""
+    result = {
+        "year": year,
+        "make": make,
+        "model": model,
+        "mileage": mileage,
+        "estimated_price": None,
+        "confidence_score": None,
+        "sample_size": None,
+    }
+    if price_model is not None:
+        result.update(
+            estimated_price=round(price_model.predict(mileage), 2),
+            confidence_score=price_model.confidence_score,
+            sample_size=price_model.sample_size,
+        )
+    return result
@@ -0,0 +1,222 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .api_controller import estimate_result, parse_batch, parse_int, parse_vehicle
+from flask import Flask
+from models import PriceModel
+from services import (
+    AsyncSingleFlight,
+    PredictionFit,
+    PriceModelLookup,
+    async_advisory_locks,
+    prediction_lock_names,
+    vehicle_index_cache,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from typing import Dict, Optional, Tuple
+
+class AsyncApiController:
+    """
+    Asyncio handlers for the JSON estimate and vehicle lookup endpoints, served
+    by asgi.py. Database round trips are awaited on an async engine, so one
+    process can hold many estimates in flight; regression fits run on a
+    bounded thread pool so they never block the event loop.
+    """
+    
+    def __init__(self, engine: AsyncEngine, flask_app: Flask, fit_workers: int = 4):
+        """
+        Args:
+            engine: Async engine for database lookups
+            flask_app: Flask app whose config and context back the shared caches
+            fit_workers: Size of the regression fit thread pool
+        """
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.flask_app = flask_app
+        self.fit_executor = ThreadPoolExecutor(max_workers=fit_workers, thread_name_prefix='estimate-fit')
+        self.fit_flight = AsyncSingleFlight()
+    
+    async def estimate(self, request: Request) -> Response:
+        """
+        Handle a single estimate, given as query parameters or a JSON object.
+        
+        Returns:
+            JSON estimate, 400 for invalid input or 404 if there is not enough data
+        """
+        if request.method == "POST":
+            data = await self._json(request)
+        else:
+            data = request.query_params
+        try:
+            year, make, model, mileage = parse_vehicle(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        
+        price_model = (await self.price_models([(year, make, model)]))[(year, make, model)]
+        if price_model is None:
+            return JSONResponse({"error": "Not enough data to estimate this vehicle"}, status_code=404)
+        return JSONResponse(estimate_result(year, make, model, mileage, price_model))
+    
+    async def estimate_batch(self, request: Request) -> Response:
+        """
+        Handle a batch of estimates, returned in input order.
+        
+        Returns:
+            JSON object with a "results" list, or 400 for invalid input
+        """
+        try:
+            parsed = parse_batch(
+                await self._json(request),
+                self.flask_app.config.get('ESTIMATE_BATCH_LIMIT', 1000),
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        
+        price_models = await self.price_models(
+            (year, make, model) for year, make, model, _ in parsed
+        )
+        results = [
+            estimate_result(year, make, model, mileage, price_models[(year, make, model)])
+            for year, make, model, mileage in parsed
+        ]
+        return JSONResponse({"results": results})
+    
+    async def makes(self, request: Request) -> Response:
+        """Handle the list of makes."""
+        index = await self._vehicle_index()
+        return self._cached(request, index, {"makes": index.makes()})
+    
+    async def models(self, request: Request) -> Response:
+        """Handle the list of models for the make query parameter."""
+        make = request.query_params.get("make", "").strip()
+        if not make:
+            return JSONResponse({"error": "make is required"}, status_code=400)
+        index = await self._vehicle_index()
+        return self._cached(request, index, {"make": make, "models": index.models(make)})
+    
+    async def autocomplete(self, request: Request) -> Response:
+        """Handle vehicle autocomplete for the q query parameter."""
+        prefix = request.query_params.get("q", "").strip()
+        try:
+            limit = parse_int(request.query_params.get("limit"), "limit") or 10
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        limit = min(max(limit, 1), 100)
+        
+        index = await self._vehicle_index()
+        matches = index.complete(prefix, limit) if prefix else []
+        return self._cached(
+            request, index, {"vehicles": [{"make": make, "model": model} for make, model in matches]}
+        )
+    
+    async def price_models(self, vehicles) -> Dict[Tuple[int, str, str], Optional[PriceModel]]:
+        """
+        Async counterpart of HomeController.price_models, running the same
+        PriceModelLookup. Vehicles answered by the listing snapshot or the
+        in-process caches never touch the database. For the rest, the
+        vehicle lookup and the prediction lookup run concurrently, and only
+        groups with no stored prediction are fitted, once per group however
+        many requests are waiting for it.
+        
+        Args:
+            vehicles: Iterable of (year, make, model) tuples
+        
+        Returns:
+            Dictionary mapping each (year, make, model) to its PriceModel or None
+        """
+        lookup = PriceModelLookup(vehicles, self.flask_app.config.get('ESTIMATE_HISTORY_MIN_LISTINGS', 0))
+        if lookup.pending:
+            queries = [self._scalars(lookup.stored_query())]
+            statement = lookup.model_ids_query()
+            if statement is not None:
+                queries.append(self._rows(statement))
+            predictions, *rows = await asyncio.gather(*queries)
+            lookup.add_stored(predictions)
+            if rows:
+                lookup.add_model_ids(rows[0])
+            
+            unfitted = lookup.unfitted
+            if unfitted:
+                lookup.add_fitted(await self._fit(unfitted))
+        return lookup.results()
+    
+    async def _rows(self, statement) -> list:
+        """Run a Core select on its own connection."""
+        async with self.engine.connect() as connection:
+            return (await connection.execute(statement)).all()
+    
+    async def _scalars(self, statement) -> list:
+        """Run an ORM select in its own session."""
+        async with self.sessions() as session:
+            return (await session.scalars(statement)).all()
+    
+    async def _fit(self, keys) -> Dict[Tuple[int, int], PriceModel]:
+        """
+        Fit and store predictions for (year, model_id) groups. Concurrent
+        requests for the same group share one fit: within the event loop
+        through a single-flight, and across processes through MySQL named
+        locks. The fits themselves run on the bounded fit executor.
+        """
+        return await self.fit_flight.do(keys, self._fit_locked)
+    
+    async def _fit_locked(self, keys) -> Dict[Tuple[int, int], PriceModel]:
+        fit = PredictionFit(keys, self.flask_app.config.get('ESTIMATE_HISTORY_MIN_LISTINGS', 0))
+        timeout = self.flask_app.config.get('PREDICTION_LOCK_TIMEOUT', 10)
+        slots = self.flask_app.config.get('PREDICTION_LOCK_SLOTS', 16)
+        async with async_advisory_locks(self.engine, prediction_lock_names(keys, slots), timeout):
+            async with self.sessions() as session:
+                # Another process may have stored some of them while we waited
+                fit.add_stored(await session.scalars(fit.stored_query()))
+                if not fit.unfitted:
+                    return fit.price_models
+                
+                stats = (await session.scalars(fit.stats_query())).all()
+                history = fit.history_query(stats)
+                archived = (await session.execute(history)).all() if history is not None else ()
+                loop = asyncio.get_running_loop()
+                predictions = await loop.run_in_executor(
+                    self.fit_executor, fit.fit_predictions, stats, archived
+                )
+                if not predictions:
+                    return fit.price_models
+                
+                await session.execute(fit.store_query(predictions))
+                # Commit first, so the re-read also sees groups another process stored
+                await session.commit()
+                fit.add_stored(await session.scalars(fit.stored_query()))
+                return fit.price_models
+    
+    async def _vehicle_index(self):
+        """Return the vehicle index, refreshing it on a worker thread only when it is due."""
+        index = vehicle_index_cache.current()
+        if index is not None:
+            return index
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._load_vehicle_index)
+    
+    def _load_vehicle_index(self):
+        with self.flask_app.app_context():
+            return vehicle_index_cache.get()
+    
+    def _cached(self, request: Request, index, payload: dict) -> Response:
+        """Build a JSON response with cache headers, or a 304 if the ETag matches."""
+        etag = f'"{index.etag}"'
+        headers = {
+            "Cache-Control": f"public, max-age={self.flask_app.config.get('VEHICLE_INDEX_MAX_AGE', 300)}",
+            "ETag": etag,
+        }
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(payload, headers=headers)
+    
+    async def _json(self, request: Request):
+        try:
+            return await request.json()
+        except ValueError:
+            return None
+    
+    async def close(self) -> None:
+        """Release the engine's connections and the fit threads."""
+        self.fit_executor.shutdown(wait=False)
+        await self.engine.dispose()
@@ -1,4 +1,5 @@
 from flask import render_template
+from services import timed_phase
 from typing import Dict, Any
 
 class BaseController:
@@ -20,7 +21,8 @@ class BaseController:
         """
         # Merge instance template data with passed kwargs
         template_data = {**self.template_data, **kwargs}
-        return render_template(template_name, **template_data)
+        with timed_phase('render'):
+            return render_template(template_name, **template_data)
     
     def add_template_data(self, key: str, value: Any) -> None:
         """
@@ -0,0 +1,26 @@
+from .base_controller import BaseController
+from db import pool_metrics
+from flask import Response, jsonify
+from models import db
+from services import metrics
+
+class HealthController(BaseController):
+    """Controller for operational status endpoints."""
+    
+    def health(self):
+        """
+        Handle the health check route.
+        
+        Returns:
+            JSON object with the connection pool metrics
+        """
+        return jsonify(status="ok", pool=pool_metrics.snapshot(db.engine))
+    
+    def metrics(self) -> Response:
+        """
+        Handle the metrics route.
+        
+        Returns:
+            Every metric of this process in the Prometheus text format
+        """
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,10 +1,41 @@
 from .base_controller import BaseController
-from flask import request
-from models import Vehicle, Listing, Prediction, db
-from sqlalchemy import func
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime
+import base64
+import binascii
+import json
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from flask import current_app, request, url_for
+from models import Dealer, Vehicle, Listing, PriceModel, db
+from services import (
+    PredictionFit,
+    PriceModelLookup,
+    advisory_locks,
+    cached_model_ids,
+    listing_snapshot,
+    model_ids_query,
+    prediction_flight,
+    prediction_lock_names,
+    remember_model_ids,
+    timed_phase,
+    vehicle_index_cache,
+)
+from sqlalchemy import and_, or_, select, union_all
+from typing import Any, Dict, Optional, Tuple
+
+SAMPLE_SIZE = 100
+
+# Sort name -> (key columns, descending, cursor value parsers). The VIN breaks
+# ties, so every listing has a unique position. Each sort is served by an
+# index on (model_id, year, key columns): InnoDB appends the primary key to
+# every secondary index, so its entries are already in (key, vin) order. The
+# price sorts break ties on mileage first, so the covering index serves them
+LISTING_SORTS = {
+    'price': ((Listing.price, Listing.mileage), False, (Decimal, int)),
+    'price_desc': ((Listing.price, Listing.mileage), True, (Decimal, int)),
+    'mileage': ((Listing.mileage,), False, (int,)),
+    'mileage_desc': ((Listing.mileage,), True, (int,)),
+    'recent': ((Listing.last_seen,), True, (date.fromisoformat,)),
+}
 
 class HomeController(BaseController):
     """Controller for handling home page and search functionality."""
@@ -25,9 +56,8 @@ class HomeController(BaseController):
         Returns:
             Rendered search template with available makes and models
         """
-        # Get unique makes and models for the search form
-        makes = Vehicle.query.with_entities(Vehicle.make).distinct().all()
-        makes = [make[0] for make in makes]
+        # Makes for the search form come from the in-memory vehicle index
+        makes = vehicle_index_cache.get().makes()
         
         return self.render("search.html", makes=makes)
     
@@ -44,63 +74,20 @@ class HomeController(BaseController):
         model = request.form.get("model")
         mileage = request.form.get("mileage")
         
-        # Build query
-        query = Listing.query.join(Vehicle)
+        # The fitted line bounds the mileage bands of a stratified sample
+        price_model = None
+        if year and make and model:
+            vehicle = (int(year), make, model)
+            price_model = self.price_models([vehicle])[vehicle]
         
-        if year:
-            query = query.filter(Listing.year == year)
-        if make:
-            query = query.filter(Vehicle.make == make)
-        if model:
-            query = query.filter(Vehicle.model == model)
-
-        # Get all matching listings and filter out those with None prices
-        all_listings = [l for l in query.all() if l.price is not None]
+        with timed_phase('listings'):
+            sample_listings = self._sample_listings(year, make, model, price_model)
         
-        # Use up to 100 sample listings for both display and regression
-        sample_listings = all_listings[:100]
-    
-        # Try to get cached prediction first
+        # The estimate comes from the fitted line, which also counts listings
+        # the sample leaves out (too old for SAMPLE_MAX_AGE_DAYS, or archived)
         estimated_price = 0
-        if year and make and model and sample_listings:  # Only proceed if we have valid listings
-            vehicle = Vehicle.query.filter_by(make=make, model=model).first()
-            if vehicle:
-                prediction = Prediction.query.filter_by(
-                    year=int(year),
-                    model_id=vehicle.model_id,
-                    mileage=int(mileage) if mileage else None
-                ).first()
-                
-                if prediction:
-                    # Update last_used_at timestamp
-                    prediction.last_used_at = datetime.utcnow()
-                    db.session.commit()
-                    estimated_price = prediction.predicted_price
-                elif len(sample_listings) >= 2:
-                    # Calculate new prediction
-                    X = np.array([l.mileage for l in sample_listings]).reshape(-1, 1)
-                    y = np.array([l.price for l in sample_listings])
-                    lr_model = LinearRegression()
-                    lr_model.fit(X, y)
-                    
-                    # Calculate confidence score based on R²
-                    confidence_score = lr_model.score(X, y)
-                    
-                    # Predict price at the median mileage of the sample set
-                    median_mileage = float(np.median(X))
-                    estimated_price = lr_model.predict([[median_mileage]])[0]
-                    
-                    # Cache the prediction
-                    new_prediction = Prediction(
-                        year=int(year),
-                        model_id=vehicle.model_id,
-                        mileage=int(mileage) if mileage else None,
-                        predicted_price=estimated_price,
-                        confidence_score=confidence_score,
-                        sample_size=len(sample_listings)
-                    )
-                    db.session.add(new_prediction)
-                    db.session.commit()
+        if price_model:
+            estimated_price = price_model.predict(int(mileage) if mileage else None)
         
         # Round the estimated price to the nearest hundred
         estimated_price = int(round(estimated_price / 100.0)) * 100
@@ -113,4 +100,378 @@ class HomeController(BaseController):
             mileage=mileage if mileage else None,
             estimated_price=estimated_price,
             listings=sample_listings
-        )
\ No newline at end of file
+        )
+    
+    def browse(self) -> Any:
+        """
+        Handle the listings browser route: one page of the listings for a year,
+        make and model, with optional sorting and filters, linking to the next.
+        
+        Returns:
+            Rendered listings template, with status 400 for invalid parameters
+        """
+        try:
+            query = parse_listing_query(request.args)
+            listings, next_cursor = self.listing_page(
+                **query, limit=current_app.config.get('LISTINGS_PAGE_SIZE', 25)
+            )
+        except ValueError as e:
+            return self.render("listings.html", error=str(e), query=request.args, sorts=LISTING_SORTS), 400
+        
+        filters = {key: value for key, value in request.args.items() if key != "cursor" and value}
+        return self.render(
+            "listings.html",
+            query=request.args,
+            sorts=LISTING_SORTS,
+            listings=listings,
+            next_url=url_for("browse", **filters, cursor=next_cursor) if next_cursor else None,
+            first_url=url_for("browse", **filters) if query["cursor"] else None,
+        )
+    
+    def listing_page(self, year: int, make: str, model: str, sort: str = 'price',
+                     trim: Optional[str] = None, certified: Optional[bool] = None,
+                     state: Optional[str] = None, cursor: Optional[str] = None,
+                     limit: int = 25) -> Tuple[list, Optional[str]]:
+        """
+        Fetch one page of the listings with a price and mileage for a year and
+        model, by keyset pagination: the cursor holds the sort keys and VIN of
+        the last listing shown, and the page starts right after it. The model
+        is resolved to its model_id first, so the page is one query that
+        seeks into the sort's (model_id, year, key) index and reads limit + 1
+        rows, however deep the page. The trim, certified and state filters are
+        checked on the rows as they are read, so a selective filter reads past
+        the listings it skips.
+        
+        Args:
+            year: Model year
+            make: Vehicle make
+            model: Vehicle model
+            sort: Name of a LISTING_SORTS entry
+            trim: Only listings with this trim
+            certified: Only certified (True) or uncertified (False) listings
+            state: Only listings from dealers in this state
+            cursor: Cursor returned with the previous page, or None for the first
+            limit: Listings per page
+            
+        Returns:
+            Tuple of (rows with the listing columns the API returns, cursor of
+            the next page or None on the last page)
+            
+        Raises:
+            ValueError: If the sort is unknown or the cursor is invalid
+        """
+        if sort not in LISTING_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(LISTING_SORTS)}")
+        keys, descending, parsers = LISTING_SORTS[sort]
+        after = decode_cursor(cursor, sort, parsers) if cursor else None
+        
+        model_id = self._model_ids([(make, model)], listing_snapshot.current()).get((make, model))
+        if model_id is None:
+            return [], None
+        
+        query = (
+            select(
+                Listing.vin,
+                Listing.year,
+                Listing.trim,
+                Listing.price,
+                Listing.mileage,
+                Listing.used,
+                Listing.certified,
+                Listing.first_seen,
+                Listing.last_seen,
+                Listing.status,
+                Vehicle.make,
+                Vehicle.model,
+                Dealer.name.label('dealer_name'),
+                Dealer.city,
+                Dealer.state,
+            )
+            .join(Vehicle, Listing.model_id == Vehicle.model_id)
+            .join(Dealer, Listing.dealer_id == Dealer.dealer_id)
+            .where(
+                Listing.model_id == model_id,
+                Listing.year == year,
+                Listing.price.isnot(None),
+                Listing.mileage.isnot(None),
+            )
+        )
+        if keys[0] is Listing.last_seen:
+            # A NULL key has no place in the order a cursor could resume from
+            query = query.where(Listing.last_seen.isnot(None))
+        if trim:
+            query = query.where(Listing.trim == trim)
+        if certified is not None:
+            query = query.where(Listing.certified == certified)
+        if state:
+            query = query.where(Dealer.state == state)
+        
+        columns = keys + (Listing.vin,)
+        if after is not None:
+            query = query.where(keyset_after(columns, after, descending))
+        order = [column.desc() for column in columns] if descending else columns
+        
+        rows = db.session.execute(query.order_by(*order).limit(limit + 1)).all()
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(sort, [getattr(last, column.key) for column in columns])
+    
+    def estimate(self, year: int, make: str, model: str, mileage: Optional[int]) -> Optional[float]:
+        """
+        Estimate the price of a vehicle from the fitted line for its year and
+        model. Every mileage is served from the same cached prediction.
+        
+        Args:
+            year: Model year
+            make: Vehicle make
+            model: Vehicle model
+            mileage: Mileage entered by the user, if any
+            
+        Returns:
+            Unrounded estimated price, or None if there is not enough data
+        """
+        price_model = self.price_models([(year, make, model)])[(year, make, model)]
+        return price_model.predict(mileage) if price_model else None
+    
+    def price_models(self, vehicles) -> Dict[Tuple[int, str, str], Optional[PriceModel]]:
+        """
+        Look up the fitted price lines for many vehicles at once. When a
+        listing snapshot is mapped, groups it covers are fitted from it
+        without touching the database. The rest are looked up in the
+        in-process cache, then the predictions table, and only then fitted
+        from regression_stats; each of those steps is a single query however
+        many vehicles are asked for, and concurrent fits of the same group are
+        coalesced. Usage of cached predictions is recorded in the write-behind
+        usage tracker.
+        
+        Args:
+            vehicles: Iterable of (year, make, model) tuples
+            
+        Returns:
+            Dictionary mapping each (year, make, model) to its PriceModel, or to
+            None if the vehicle is unknown or there is not enough data
+        """
+        lookup = PriceModelLookup(vehicles, current_app.config.get('ESTIMATE_HISTORY_MIN_LISTINGS', 0))
+        if lookup.pending:
+            statement = lookup.model_ids_query()
+            if statement is not None:
+                lookup.add_model_ids(db.session.execute(statement))
+            lookup.add_stored(db.session.scalars(lookup.stored_query()))
+            
+            unfitted = lookup.unfitted
+            if unfitted:
+                lookup.add_fitted(self._fit(unfitted))
+        return lookup.results()
+    
+    def _fit(self, keys) -> Dict[Tuple[int, int], PriceModel]:
+        """
+        Fit and store predictions for (year, model_id) groups. Concurrent
+        requests for the same group share one fit: within the process through
+        prediction_flight, and across processes through MySQL named locks.
+        
+        Returns:
+            Dictionary mapping each group with enough data to its PriceModel
+        """
+        return prediction_flight.do(keys, self._fit_locked)
+    
+    def _fit_locked(self, keys) -> Dict[Tuple[int, int], PriceModel]:
+        fit = PredictionFit(keys, current_app.config.get('ESTIMATE_HISTORY_MIN_LISTINGS', 0))
+        timeout = current_app.config.get('PREDICTION_LOCK_TIMEOUT', 10)
+        slots = current_app.config.get('PREDICTION_LOCK_SLOTS', 16)
+        # End the transaction that found them missing: under REPEATABLE READ
+        # the re-read below would otherwise reuse its snapshot and never see
+        # predictions another process committed while we waited for the lock
+        db.session.commit()
+        with advisory_locks(db.engine, prediction_lock_names(keys, slots), timeout):
+            # Another process may have stored some of them while we waited
+            fit.add_stored(db.session.scalars(fit.stored_query()))
+            if not fit.unfitted:
+                return fit.price_models
+            
+            stats = db.session.scalars(fit.stats_query()).all()
+            history = fit.history_query(stats)
+            archived = db.session.execute(history).all() if history is not None else ()
+            predictions = fit.fit_predictions(stats, archived)
+            if not predictions:
+                return fit.price_models
+            
+            db.session.execute(fit.store_query(predictions))
+            # Commit first, so the re-read also sees groups another process stored
+            db.session.commit()
+            fit.add_stored(db.session.scalars(fit.stored_query()))
+            return fit.price_models
+    
+    def _model_ids(self, vehicles, snapshot=None) -> Dict[Tuple[str, str], int]:
+        """
+        Resolve (make, model) pairs to model_ids through the in-process cache
+        and the listing snapshot, looking up any misses in one query.
+        
+        Returns:
+            Dictionary mapping each known (make, model) to its model_id
+        """
+        model_ids, missing = cached_model_ids(vehicles, snapshot)
+        if missing:
+            model_ids.update(remember_model_ids(missing, db.session.execute(model_ids_query(missing))))
+        return model_ids
+    
+    def _sample_listings(self, year, make, model, price_model: Optional[PriceModel] = None) -> list:
+        """
+        Fetch the SAMPLE_SIZE most recently seen listings with a price and
+        mileage. With a year, make and model, the model is resolved to its
+        model_id first, so idx_model_year_last_seen serves the filter and the
+        order and the query stops after SAMPLE_SIZE rows. SAMPLE_MAX_AGE_DAYS
+        drops listings not seen recently.
+        
+        With SAMPLE_MILEAGE_BANDS above 1 and a fitted line, the line's mileage
+        range is split into that many equal bands and the most recent listings
+        are taken from each, so low and high mileage are both represented.
+        Each band stops after its share of rows, but may scan past listings in
+        other bands to find them.
+        
+        Args:
+            year: Model year filter, if given
+            make: Make filter, if given
+            model: Model filter, if given
+            price_model: Fitted line for the year and model, if any
+            
+        Returns:
+            List of rows with year, trim, price, mileage, model_id, make, model,
+            city, state and last_seen, most recently seen first
+        """
+        query = (
+            select(
+                Listing.year,
+                Listing.trim,
+                Listing.price,
+                Listing.mileage,
+                Listing.model_id,
+                Vehicle.make,
+                Vehicle.model,
+                Dealer.city,
+                Dealer.state,
+                Listing.last_seen,
+            )
+            .join(Vehicle, Listing.model_id == Vehicle.model_id)
+            .join(Dealer, Listing.dealer_id == Dealer.dealer_id)
+            .where(Listing.price.isnot(None), Listing.mileage.isnot(None))
+            .order_by(Listing.last_seen.desc())
+        )
+        
+        if year:
+            query = query.where(Listing.year == year)
+        if make and model:
+            model_id = self._model_ids([(make, model)], listing_snapshot.current()).get((make, model))
+            if model_id is None:
+                return []
+            query = query.where(Listing.model_id == model_id)
+        elif make:
+            query = query.where(Vehicle.make == make)
+        elif model:
+            query = query.where(Vehicle.model == model)
+        
+        max_age_days = current_app.config.get('SAMPLE_MAX_AGE_DAYS', 0)
+        if max_age_days:
+            query = query.where(Listing.last_seen >= date.today() - timedelta(days=max_age_days))
+        
+        bands = current_app.config.get('SAMPLE_MILEAGE_BANDS', 1)
+        if bands <= 1 or price_model is None or price_model.max_mileage <= price_model.min_mileage:
+            return db.session.execute(query.limit(SAMPLE_SIZE)).all()
+        
+        # One statement: each band is a derived table, which MySQL and SQLite
+        # both accept inside UNION ALL with its own ORDER BY and LIMIT
+        per_band = -(-SAMPLE_SIZE // bands)
+        width = (price_model.max_mileage - price_model.min_mileage) / bands
+        edges = [price_model.min_mileage + width * i for i in range(1, bands)]
+        band_queries = []
+        for i in range(bands):
+            band = query
+            if i > 0:
+                band = band.where(Listing.mileage >= edges[i - 1])
+            if i < bands - 1:
+                band = band.where(Listing.mileage < edges[i])
+            band_queries.append(select(band.limit(per_band).subquery().c))
+        rows = db.session.execute(union_all(*band_queries)).all()
+        rows.sort(key=lambda row: row.last_seen, reverse=True)
+        return rows[:SAMPLE_SIZE]
+
+
+def encode_cursor(sort: str, values) -> str:
+    """Encode the sort key values and VIN of a listing as an opaque, URL-safe cursor."""
+    payload = json.dumps([sort, [str(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, parsers) -> Tuple[Any, ...]:
+    """
+    Decode a cursor made by encode_cursor for the same sort.
+    
+    Args:
+        cursor: Cursor from the previous page
+        sort: Name of a LISTING_SORTS entry
+        parsers: The sort's parser for each key column
+        
+    Returns:
+        Tuple of the sort key values followed by the VIN
+        
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or not isinstance(values, list) or len(values) != len(parsers) + 1:
+            raise ValueError
+        *keys, vin = values
+        return tuple(parse(value) for parse, value in zip(parsers, keys)) + (str(vin),)
+    except (binascii.Error, InvalidOperation, TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError("cursor is invalid for this sort")
+
+
+def keyset_after(columns, values, descending: bool):
+    """
+    Select the rows after a position in (columns) order. The row comparison is
+    spelled out, (a, b) > (x, y) as a > x OR (a = x AND b > y), so MySQL turns
+    it into an index range in either direction.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        beyond = column < value if descending else column > value
+        clauses.append(and_(*(prior == seen for prior, seen in zip(columns[:i], values[:i])), beyond))
+    return or_(*clauses)
+
+
+def parse_listing_query(args) -> Dict[str, Any]:
+    """
+    Parse the listing browser parameters: a required year, make and model,
+    and an optional sort, trim, certified, state and cursor.
+    
+    Returns:
+        Keyword arguments for HomeController.listing_page, without the limit
+        
+    Raises:
+        ValueError: If a parameter is missing or invalid
+    """
+    make = (args.get("make") or "").strip()
+    model = (args.get("model") or "").strip()
+    try:
+        year = int(args.get("year") or "")
+    except ValueError:
+        raise ValueError("year must be an integer")
+    if not make or not model:
+        raise ValueError("make and model are required")
+    
+    certified = (args.get("certified") or "").strip().lower()
+    if certified not in ("", "true", "false", "1", "0"):
+        raise ValueError("certified must be true or false")
+    
+    return {
+        "year": year,
+        "make": make,
+        "model": model,
+        "sort": args.get("sort") or "price",
+        "trim": (args.get("trim") or "").strip() or None,
+        "certified": certified in ("true", "1") if certified else None,
+        "state": (args.get("state") or "").strip().upper() or None,
+        "cursor": args.get("cursor") or None,
+    }
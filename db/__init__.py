@@ -0,0 +1,27 @@
+from .pool import (
+    PoolMetrics,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    database_uri,
+    engine_options,
+    init_database,
+    pool_metrics,
+)
+from .access import cursor, executemany, stream
+from .upsert import greatest, least, upsert
+
+__all__ = [
+    'PoolMetrics',
+    'TimedAsyncQueuePool',
+    'TimedQueuePool',
+    'database_uri',
+    'engine_options',
+    'init_database',
+    'pool_metrics',
+    'cursor',
+    'executemany',
+    'stream',
+    'greatest',
+    'least',
+    'upsert',
+]
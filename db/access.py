@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+
+from sqlalchemy.sql import ClauseElement
+
+from models import db
+
+
+@contextmanager
+def cursor(streaming: bool = False, engine=None):
+    """
+    Check out a pooled connection and yield a DBAPI cursor. The transaction is
+    committed if the block succeeds and rolled back otherwise; the cursor is
+    closed and the connection returned to the pool either way.
+    
+    A streaming block that fails or is abandoned, such as a stream() the
+    consumer stopped reading, may leave rows in flight. An unbuffered
+    mysql-connector cursor then refuses the rollback and the close with
+    "Unread result found", and draining it would read the rest of the result,
+    so the connection is discarded from the pool instead.
+    
+    Args:
+        streaming: Use an unbuffered cursor so rows are read from the server
+            as they are fetched instead of all at once
+        engine: Engine to use; defaults to the app's engine
+    """
+    engine = engine if engine is not None else db.engine
+    connection = engine.raw_connection()
+    try:
+        if streaming and engine.dialect.driver == 'mysqlconnector':
+            dbapi_cursor = connection.driver_connection.cursor(buffered=False)
+        else:
+            dbapi_cursor = connection.cursor()
+        try:
+            yield dbapi_cursor
+            connection.commit()
+        except BaseException:
+            if streaming:
+                # Closing the connection ends the result on the server too
+                connection.invalidate()
+            else:
+                connection.rollback()
+            raise
+        finally:
+            if connection.is_valid:
+                dbapi_cursor.close()
+    finally:
+        connection.close()
+
+
+def _compile(statement, params, engine):
+    """Render a Core statement or SQL string to the driver's paramstyle."""
+    if not isinstance(statement, ClauseElement):
+        return str(statement), params or ()
+    compiled = statement.compile(dialect=engine.dialect)
+    values = compiled.construct_params(params)
+    if compiled.positional:
+        return compiled.string, tuple(values[name] for name in compiled.positiontup)
+    return compiled.string, values
+
+
+def stream(statement, params=None, batch_size: int = 10000, engine=None):
+    """
+    Iterate over a large result in batches without loading it into memory.
+    The connection stays checked out until the iteration finishes; closing
+    the generator early discards it, as cursor() describes.
+    
+    Args:
+        statement: Core select or SQL string
+        params: Bound parameter values
+        batch_size: Rows fetched per batch
+        engine: Engine to use; defaults to the app's engine
+        
+    Yields:
+        Lists of up to batch_size row tuples
+    """
+    engine = engine if engine is not None else db.engine
+    sql, values = _compile(statement, params, engine)
+    with cursor(streaming=True, engine=engine) as dbapi_cursor:
+        dbapi_cursor.execute(sql, values)
+        while True:
+            rows = dbapi_cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
+def executemany(statement, rows, batch_size: int = 5000) -> int:
+    """
+    Execute a write statement for many parameter sets through the session, in
+    bounded batches. Runs in the caller's transaction.
+    
+    Args:
+        statement: Core insert, update or delete
+        rows: List of parameter dictionaries
+        batch_size: Parameter sets per round trip
+        
+    Returns:
+        Number of parameter sets executed
+    """
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(statement, rows[i:i + batch_size])
+    return len(rows)
@@ -0,0 +1,25 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from .pool import TimedAsyncQueuePool, database_uri, engine_options, pool_metrics
+
+
+def async_database_uri() -> str:
+    """The DB_* connection URI with the aiomysql driver instead of mysql-connector."""
+    return database_uri().replace("mysql+mysqlconnector://", "mysql+aiomysql://", 1)
+
+
+def create_async_engine_from_env(uri: str = None) -> AsyncEngine:
+    """
+    Create the asyncio engine used by the async serving mode. It takes the
+    same DB_POOL_* settings as the app's engine and reports to the same pool
+    metrics. Requires the packages in requirements-async.txt.
+    
+    Args:
+        uri: Connection URI; defaults to async_database_uri()
+    """
+    engine = create_async_engine(
+        uri or async_database_uri(),
+        **engine_options({'poolclass': TimedAsyncQueuePool}),
+    )
+    pool_metrics.attach(engine.sync_engine)
+    return engine
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from urllib.parse import quote_plus
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from models import db
+
+
+def database_uri() -> str:
+    """Build the MySQL connection URI from the DB_* environment variables."""
+    # Escape password and optional user if needed
+    db_user = quote_plus(os.getenv("DB_USER") or "")
+    db_password = quote_plus(os.getenv("DB_PASSWORD") or "")
+    db_host = os.getenv("DB_HOST", "localhost")
+    db_port = os.getenv("DB_PORT", "3307")
+    db_name = os.getenv("DB_NAME")
+    return f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def engine_options(overrides=None) -> dict:
+    """
+    Build the SQLAlchemy engine options from the DB_POOL_* environment variables.
+    Connections are recycled before MySQL's wait_timeout closes them, and
+    pre-ping replaces any that died while idle in the pool.
+    
+    Args:
+        overrides: Extra engine options, e.g. connect_args, taking precedence
+        
+    Returns:
+        Dictionary for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.getenv("DB_POOL_SIZE") or 10),
+        'max_overflow': int(os.getenv("DB_MAX_OVERFLOW") or 20),
+        'pool_timeout': float(os.getenv("DB_POOL_TIMEOUT") or 30),
+        'pool_recycle': int(os.getenv("DB_POOL_RECYCLE") or 1800),
+        'pool_pre_ping': (os.getenv("DB_POOL_PRE_PING") or "true").lower() in ("1", "true", "yes"),
+    }
+    options.update(overrides or {})
+    return options
+
+
+class PoolMetrics:
+    """Counters for connection pool usage and the time spent waiting for a connection."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+    
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        """Record how long one checkout waited for a connection."""
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+    
+    def attach(self, engine) -> None:
+        """Count connects, checkouts and invalidations of an engine's pool."""
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+    
+    def snapshot(self, engine=None) -> dict:
+        """
+        Current counters, plus the pool's size and usage when an engine is given.
+        
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            metrics = {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+        pool = engine.pool if engine is not None else None
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return metrics
+    
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+    
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedCheckoutMixin:
+    """Pool mixin that records how long each checkout waits in pool_metrics."""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    """QueuePool for the app's engine, with checkout wait metrics."""
+
+
+class TimedAsyncQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """Asyncio pool for the async serving engine, with checkout wait metrics."""
+
+
+def init_database(app: Flask, overrides=None, uri=None) -> None:
+    """
+    Configure the shared SQLAlchemy engine for an application and attach the
+    pool metrics. Used by the web app and the scripts alike.
+    
+    Args:
+        app: Flask application instance
+        overrides: Extra engine options passed to engine_options()
+        uri: Database URI to use instead of the one built from DB_*
+    """
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri or database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(overrides)
+    db.init_app(app)
+    with app.app_context():
+        pool_metrics.attach(db.engine)
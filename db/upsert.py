@@ -0,0 +1,59 @@
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import ReturnTypeFromArgs
+
+from models import db
+
+
+class least(ReturnTypeFromArgs):
+    """LEAST(), rendered as the multi-argument MIN() on SQLite."""
+    inherit_cache = True
+
+
+class greatest(ReturnTypeFromArgs):
+    """GREATEST(), rendered as the multi-argument MAX() on SQLite."""
+    inherit_cache = True
+
+
+@compiles(least, 'sqlite')
+def _sqlite_least(element, compiler, **kw):
+    return f"min({compiler.process(element.clause_expr.element, **kw)})"
+
+
+@compiles(greatest, 'sqlite')
+def _sqlite_greatest(element, compiler, **kw):
+    return f"max({compiler.process(element.clause_expr.element, **kw)})"
+
+
+def upsert(model, rows, updates, conflict_columns=None):
+    """
+    Build a multi-row insert that updates rows whose key already exists:
+    INSERT ... ON DUPLICATE KEY UPDATE on MySQL, and INSERT ... ON CONFLICT
+    DO UPDATE on SQLite so the ingest path also runs against a local stand-in.
+    
+    Args:
+        model: Mapped class to insert into
+        rows: List of row dictionaries, or None to build an executemany statement
+        updates: Column names to overwrite with the inserted values, or a
+            callable taking the inserted row and returning a dictionary of
+            column to update expression
+        conflict_columns: Unique key that detects existing rows on SQLite;
+            defaults to the primary key
+            
+    Returns:
+        Insert statement
+    """
+    if db.engine.dialect.name == 'sqlite':
+        stmt = sqlite.insert(model)
+        inserted = stmt.excluded
+    else:
+        stmt = mysql.insert(model)
+        inserted = stmt.inserted
+    if rows is not None:
+        stmt = stmt.values(rows)
+    
+    values = updates(inserted) if callable(updates) else {column: inserted[column] for column in updates}
+    if db.engine.dialect.name == 'sqlite':
+        index_elements = conflict_columns or [column.name for column in model.__table__.primary_key]
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=values)
+    return stmt.on_duplicate_key_update(values)
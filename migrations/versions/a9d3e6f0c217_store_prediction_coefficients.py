@@ -0,0 +1,62 @@
+"""Store fitted coefficients in predictions
+
+Revision ID: a9d3e6f0c217
+Revises: f2a7c9e41b86
+Create Date: 2026-10-18 18:12:07.394162
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e6f0c217'
+down_revision = 'f2a7c9e41b86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('regression_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('min_x', sa.Double(), nullable=True))
+        batch_op.add_column(sa.Column('max_x', sa.Double(), nullable=True))
+
+    op.execute(
+        "UPDATE regression_stats r JOIN ("
+        "SELECT year, model_id, MIN(mileage) AS min_x, MAX(mileage) AS max_x "
+        "FROM listings WHERE price IS NOT NULL AND mileage IS NOT NULL "
+        "GROUP BY year, model_id"
+        ") l USING (year, model_id) "
+        "SET r.min_x = l.min_x, r.max_x = l.max_x"
+    )
+
+    # Cached per-mileage prices cannot be converted; they are refitted on demand
+    op.execute("DELETE FROM predictions")
+
+    with op.batch_alter_table('predictions', schema=None) as batch_op:
+        batch_op.drop_index('idx_year_model_mileage')
+        batch_op.drop_column('mileage')
+        batch_op.add_column(sa.Column('slope', sa.Float(), nullable=False))
+        batch_op.add_column(sa.Column('intercept', sa.Float(), nullable=False))
+        batch_op.add_column(sa.Column('mean_mileage', sa.Float(), nullable=False))
+        batch_op.add_column(sa.Column('min_mileage', sa.Integer(), nullable=False))
+        batch_op.add_column(sa.Column('max_mileage', sa.Integer(), nullable=False))
+        batch_op.create_index('idx_prediction_year_model', ['year', 'model_id'], unique=False)
+
+
+def downgrade():
+    op.execute("DELETE FROM predictions")
+
+    with op.batch_alter_table('predictions', schema=None) as batch_op:
+        batch_op.drop_index('idx_prediction_year_model')
+        batch_op.drop_column('max_mileage')
+        batch_op.drop_column('min_mileage')
+        batch_op.drop_column('mean_mileage')
+        batch_op.drop_column('intercept')
+        batch_op.drop_column('slope')
+        batch_op.add_column(sa.Column('mileage', sa.Integer(), nullable=True))
+        batch_op.create_index('idx_year_model_mileage', ['year', 'model_id', 'mileage'], unique=False)
+
+    with op.batch_alter_table('regression_stats', schema=None) as batch_op:
+        batch_op.drop_column('max_x')
+        batch_op.drop_column('min_x')
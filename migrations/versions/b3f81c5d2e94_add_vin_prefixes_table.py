@@ -0,0 +1,39 @@
+"""Add vin_prefixes table
+
+Revision ID: b3f81c5d2e94
+Revises: a9d3e6f0c217
+Create Date: 2026-10-18 19:41:26.508337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f81c5d2e94'
+down_revision = 'a9d3e6f0c217'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('vin_prefixes',
+    sa.Column('prefix', sa.String(length=9), nullable=False),
+    sa.Column('year', sa.SmallInteger(), nullable=False),
+    sa.Column('model_id', sa.SmallInteger(), nullable=False),
+    sa.Column('listing_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['model_id'], ['vehicles.model_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('prefix', 'year', 'model_id')
+    )
+
+    # Backfill from the existing listings
+    op.execute(
+        "INSERT INTO vin_prefixes (prefix, year, model_id, listing_count) "
+        "SELECT CONCAT(UPPER(LEFT(vin, 8)), UPPER(SUBSTRING(vin, 10, 1))), year, model_id, COUNT(*) "
+        "FROM listings WHERE CHAR_LENGTH(vin) = 17 "
+        "GROUP BY CONCAT(UPPER(LEFT(vin, 8)), UPPER(SUBSTRING(vin, 10, 1))), year, model_id"
+    )
+
+
+def downgrade():
+    op.drop_table('vin_prefixes')
@@ -0,0 +1,62 @@
+"""Add dealer natural key
+
+Revision ID: b7d2e4f1a9c3
+Revises: 045a6f52365d
+Create Date: 2026-10-18 09:12:31.415027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f1a9c3'
+down_revision = '045a6f52365d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dealers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('natural_key', sa.String(length=40), nullable=True))
+
+    # Must match Dealer.natural_key_for
+    op.execute(
+        "UPDATE dealers SET natural_key = "
+        "SHA1(LOWER(CONCAT_WS('|', name, IFNULL(street, ''), city, state, zip)))"
+    )
+
+    # Merge duplicate dealers into the lowest dealer_id before the key becomes unique
+    op.execute(
+        "CREATE TEMPORARY TABLE dealer_keep "
+        "SELECT natural_key, MIN(dealer_id) AS keep_id FROM dealers GROUP BY natural_key"
+    )
+    op.execute(
+        "UPDATE listings l "
+        "JOIN dealers d ON d.dealer_id = l.dealer_id "
+        "JOIN dealer_keep k ON k.natural_key = d.natural_key "
+        "SET l.dealer_id = k.keep_id "
+        "WHERE d.dealer_id <> k.keep_id"
+    )
+    op.execute(
+        "DELETE w FROM dealer_websites w "
+        "JOIN dealers d ON d.dealer_id = w.dealer_id "
+        "JOIN dealer_keep k ON k.natural_key = d.natural_key "
+        "WHERE d.dealer_id <> k.keep_id"
+    )
+    op.execute(
+        "DELETE d FROM dealers d "
+        "JOIN dealer_keep k ON k.natural_key = d.natural_key "
+        "WHERE d.dealer_id <> k.keep_id"
+    )
+    op.execute("DROP TEMPORARY TABLE dealer_keep")
+
+    with op.batch_alter_table('dealers', schema=None) as batch_op:
+        batch_op.alter_column('natural_key', existing_type=sa.String(length=40), nullable=False)
+        batch_op.create_index('uq_dealer_natural_key', ['natural_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('dealers', schema=None) as batch_op:
+        batch_op.drop_index('uq_dealer_natural_key')
+        batch_op.drop_column('natural_key')
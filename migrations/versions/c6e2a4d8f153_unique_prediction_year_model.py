@@ -0,0 +1,34 @@
+"""Make the predictions (year, model_id) index unique
+
+Revision ID: c6e2a4d8f153
+Revises: b3f81c5d2e94
+Create Date: 2026-10-18 21:07:44.215903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a4d8f153'
+down_revision = 'b3f81c5d2e94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest of any duplicates left by concurrent fits
+    op.execute(
+        "DELETE p FROM predictions p "
+        "JOIN predictions q ON q.year = p.year AND q.model_id = p.model_id AND q.id < p.id"
+    )
+
+    with op.batch_alter_table('predictions', schema=None) as batch_op:
+        batch_op.drop_index('idx_prediction_year_model')
+        batch_op.create_index('idx_prediction_year_model', ['year', 'model_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('predictions', schema=None) as batch_op:
+        batch_op.drop_index('idx_prediction_year_model')
+        batch_op.create_index('idx_prediction_year_model', ['year', 'model_id'], unique=False)
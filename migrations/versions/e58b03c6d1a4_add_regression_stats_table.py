@@ -0,0 +1,44 @@
+"""Add regression_stats table
+
+Revision ID: e58b03c6d1a4
+Revises: d41c8a7e5f02
+Create Date: 2026-10-18 14:03:52.681190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58b03c6d1a4'
+down_revision = 'd41c8a7e5f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('regression_stats',
+    sa.Column('year', sa.SmallInteger(), nullable=False),
+    sa.Column('model_id', sa.SmallInteger(), nullable=False),
+    sa.Column('n', sa.BigInteger(), nullable=False),
+    sa.Column('sum_x', sa.Double(), nullable=False),
+    sa.Column('sum_y', sa.Double(), nullable=False),
+    sa.Column('sum_xy', sa.Double(), nullable=False),
+    sa.Column('sum_xx', sa.Double(), nullable=False),
+    sa.Column('sum_yy', sa.Double(), nullable=False),
+    sa.ForeignKeyConstraint(['model_id'], ['vehicles.model_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('year', 'model_id')
+    )
+
+    # Backfill from the existing listings
+    op.execute(
+        "INSERT INTO regression_stats (year, model_id, n, sum_x, sum_y, sum_xy, sum_xx, sum_yy) "
+        "SELECT year, model_id, COUNT(*), SUM(mileage), SUM(price), SUM(mileage * price), "
+        "SUM(mileage * mileage), SUM(price * price) "
+        "FROM listings WHERE price IS NOT NULL AND mileage IS NOT NULL "
+        "GROUP BY year, model_id"
+    )
+
+
+def downgrade():
+    op.drop_table('regression_stats')
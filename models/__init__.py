@@ -2,7 +2,10 @@ from .base import db
 from .dealer import Dealer
 from .vehicle import Vehicle
 from .listing import Listing
+from .listing_archive import ListingArchive
 from .dealer_website import DealerWebsite
-from .prediction import Prediction
+from .prediction import Prediction, PriceModel
+from .regression_stat import RegressionStat
+from .vin_prefix import VinPrefix
 
-__all__ = ['db', 'Dealer', 'Vehicle', 'Listing', 'DealerWebsite', 'Prediction'] 
\ No newline at end of file
+__all__ = ['db', 'Dealer', 'Vehicle', 'Listing', 'ListingArchive', 'DealerWebsite', 'Prediction', 'PriceModel', 'RegressionStat', 'VinPrefix'] 
\ No newline at end of file
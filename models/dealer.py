@@ -1,8 +1,16 @@
+import hashlib
 from datetime import date
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, Index, String
 from sqlalchemy.orm import relationship
 from .base import db
 
+
+def _natural_key_default(context) -> str:
+    params = context.get_current_parameters()
+    return Dealer.natural_key_for(
+        params['name'], params.get('street'), params['city'], params['state'], params['zip']
+    )
+
 class Dealer(db.Model):
     """Model representing a car dealer."""
     
@@ -14,10 +22,24 @@ class Dealer(db.Model):
     city = db.Column(db.String(255), nullable=False)
     state = db.Column(db.String(2), nullable=False)
     zip = db.Column(db.String(10), nullable=False)
+    natural_key = db.Column(db.String(40), nullable=False, default=_natural_key_default)
     
     # Relationships
     listings = relationship('Listing', back_populates='dealer')
     website = relationship('DealerWebsite', back_populates='dealer', uselist=False)
     
+    __table_args__ = (
+        Index('uq_dealer_natural_key', 'natural_key', unique=True),
+    )
+    
+    @staticmethod
+    def natural_key_for(name: str, street: str, city: str, state: str, zip: str) -> str:
+        """
+        Hash the identifying address of a dealer, ignoring case. Matches the
+        SQL expression SHA1(LOWER(CONCAT_WS('|', name, IFNULL(street, ''), city, state, zip))).
+        """
+        raw = '|'.join((name, street or '', city, state, zip)).lower()
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
     def __repr__(self) -> str:
         return f"<Dealer {self.name} ({self.city}, {self.state})>" 
\ No newline at end of file
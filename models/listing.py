@@ -27,15 +27,24 @@ class Listing(db.Model):
     last_seen = db.Column(db.Date, nullable=False)
     vdp_last_seen = db.Column(db.Date)
     status = db.Column(db.String(20))
+    content_hash = db.Column(db.String(40))
     
     # Relationships
     dealer = relationship('Dealer', back_populates='listings')
     vehicle = relationship('Vehicle', back_populates='listings')
     
     __table_args__ = (
-        Index('idx_year_model', 'year', 'model_id'),
+        # Every secondary index ends with the primary key under InnoDB, so
+        # these are also in vin order within equal keys, as keyset pages need.
+        # Serves the most recently seen listings of a year and model in order
+        Index('idx_model_year_last_seen', 'model_id', 'year', 'last_seen'),
+        # Covers the estimate, regression and snapshot reads without touching
+        # the rows, and the listings browser's price sorts
+        Index('idx_model_year_price_mileage', 'model_id', 'year', 'price', 'mileage'),
+        # The listings browser's mileage sorts
+        Index('idx_model_year_mileage', 'model_id', 'year', 'mileage'),
         Index('idx_mileage', 'mileage'),
     )
     
     def __repr__(self) -> str:
-        return f"<Listing {self.year} {self.vehicle.make} {self.vehicle.model} ({self.vin})>" 
\ No newline at end of file
+        return f"<Listing {self.year} model {self.model_id} ({self.vin})>" 
\ No newline at end of file
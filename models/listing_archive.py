@@ -0,0 +1,42 @@
+from datetime import datetime
+from sqlalchemy import Index
+from .base import db
+
+class ListingArchive(db.Model):
+    """
+    Model holding listings moved out of listings by scripts/archive_listings.py
+    because they were sold, removed or not seen for a while. Same columns as
+    Listing, without foreign keys, so history outlives its dealers and vehicles.
+    """
+    
+    __tablename__ = 'listings_archive'
+    
+    vin = db.Column(db.String(17), primary_key=True)
+    year = db.Column(db.SmallInteger, nullable=False)
+    model_id = db.Column(db.SmallInteger, nullable=False)
+    trim = db.Column(db.String(255))
+    dealer_id = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Numeric(10, 2))
+    mileage = db.Column(db.Integer)
+    used = db.Column(db.Boolean, nullable=False, default=True)
+    certified = db.Column(db.Boolean, nullable=False, default=False)
+    style = db.Column(db.String(255))
+    driven_wheels = db.Column(db.String(255))
+    engine = db.Column(db.String(255))
+    fuel_type = db.Column(db.String(255))
+    exterior_color = db.Column(db.String(255))
+    interior_color = db.Column(db.String(255))
+    first_seen = db.Column(db.Date, nullable=False)
+    last_seen = db.Column(db.Date, nullable=False)
+    vdp_last_seen = db.Column(db.Date)
+    status = db.Column(db.String(20))
+    content_hash = db.Column(db.String(40))
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Serves the history sums for rare models
+        Index('idx_archive_model_year_price_mileage', 'model_id', 'year', 'price', 'mileage'),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<ListingArchive {self.year} model {self.model_id} ({self.vin})>"
@@ -1,18 +1,50 @@
 from datetime import datetime
+from typing import NamedTuple, Optional
 from sqlalchemy import ForeignKey, Index, String, Float
 from sqlalchemy.orm import relationship
 from .base import db
 
+class PriceModel(NamedTuple):
+    """
+    Immutable copy of a prediction's fitted line, safe to keep outside a
+    session. prediction_id is None for lines fitted from the listing snapshot.
+    """
+    
+    prediction_id: Optional[int]
+    slope: float
+    intercept: float
+    mean_mileage: float
+    min_mileage: int
+    max_mileage: int
+    confidence_score: float
+    sample_size: int
+    
+    def predict(self, mileage: Optional[int] = None) -> float:
+        """
+        Price at a mileage. Mileage outside the range of the fitted listings is
+        clamped to that range rather than extrapolated, and prices never go
+        below zero. Without a mileage, the mean mileage is used.
+        """
+        if mileage is None:
+            x = self.mean_mileage
+        else:
+            x = min(max(mileage, self.min_mileage), self.max_mileage)
+        return max(self.intercept + self.slope * x, 0.0)
+
 class Prediction(db.Model):
-    """Model representing a cached price prediction."""
+    """Model representing a cached price regression for a year and model."""
     
     __tablename__ = 'predictions'
     
     id = db.Column(db.Integer, primary_key=True)
     year = db.Column(db.SmallInteger, nullable=False)
     model_id = db.Column(db.SmallInteger, ForeignKey('vehicles.model_id', ondelete='CASCADE'), nullable=False)
-    mileage = db.Column(db.Integer, nullable=True)
-    predicted_price = db.Column(db.Float, nullable=False)
+    slope = db.Column(db.Float, nullable=False)
+    intercept = db.Column(db.Float, nullable=False)
+    mean_mileage = db.Column(db.Float, nullable=False)
+    min_mileage = db.Column(db.Integer, nullable=False)
+    max_mileage = db.Column(db.Integer, nullable=False)
+    predicted_price = db.Column(db.Float, nullable=False)  # Price at the mean mileage
     confidence_score = db.Column(db.Float, nullable=False)
     sample_size = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -22,8 +54,49 @@ class Prediction(db.Model):
     vehicle = relationship('Vehicle', back_populates='predictions')
     
     __table_args__ = (
-        Index('idx_year_model_mileage', 'year', 'model_id', 'mileage'),
+        Index('idx_prediction_year_model', 'year', 'model_id', unique=True),
+        Index('idx_last_used_at', 'last_used_at'),
     )
     
+    @classmethod
+    def from_stat(cls, stat) -> Optional['Prediction']:
+        """
+        Fit a prediction from a RegressionStat. predicted_price is the price at
+        the mean mileage.
+        
+        Returns:
+            Unsaved Prediction, or None if the group has too few listings
+        """
+        fitted = stat.fit()
+        if not fitted:
+            return None
+        slope, intercept, confidence_score = fitted
+        mean_mileage = stat.mean_mileage
+        return cls(
+            year=stat.year,
+            model_id=stat.model_id,
+            slope=slope,
+            intercept=intercept,
+            mean_mileage=mean_mileage,
+            min_mileage=int(stat.min_x if stat.min_x is not None else mean_mileage),
+            max_mileage=int(stat.max_x if stat.max_x is not None else mean_mileage),
+            predicted_price=max(intercept + slope * mean_mileage, 0.0),
+            confidence_score=confidence_score,
+            sample_size=stat.n
+        )
+    
+    def price_model(self) -> PriceModel:
+        """Snapshot the fitted line for caching."""
+        return PriceModel(
+            prediction_id=self.id,
+            slope=self.slope,
+            intercept=self.intercept,
+            mean_mileage=self.mean_mileage,
+            min_mileage=self.min_mileage,
+            max_mileage=self.max_mileage,
+            confidence_score=self.confidence_score,
+            sample_size=self.sample_size,
+        )
+    
     def __repr__(self) -> str:
-        return f"<Prediction {self.year} {self.vehicle.make} {self.vehicle.model} (${self.predicted_price:,.2f})>" 
\ No newline at end of file
+        return f"<Prediction {self.year} model {self.model_id} (${self.predicted_price:,.2f})>"
@@ -0,0 +1,56 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import relationship
+from .base import db
+
+class RegressionStat(db.Model):
+    """Model holding the sufficient statistics for a price-on-mileage regression per year and model."""
+    
+    __tablename__ = 'regression_stats'
+    
+    year = db.Column(db.SmallInteger, primary_key=True)
+    model_id = db.Column(db.SmallInteger, ForeignKey('vehicles.model_id', ondelete='CASCADE'), primary_key=True)
+    n = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_x = db.Column(db.Double, nullable=False, default=0)
+    sum_y = db.Column(db.Double, nullable=False, default=0)
+    sum_xy = db.Column(db.Double, nullable=False, default=0)
+    sum_xx = db.Column(db.Double, nullable=False, default=0)
+    sum_yy = db.Column(db.Double, nullable=False, default=0)
+    # Only ever widened by increments; exact after a rebuild
+    min_x = db.Column(db.Double)
+    max_x = db.Column(db.Double)
+    
+    # Relationships
+    vehicle = relationship('Vehicle', back_populates='regression_stats')
+    
+    def fit(self):
+        """
+        Fit price = intercept + slope * mileage from the stored sums.
+        
+        Returns:
+            Tuple of (slope, intercept, r_squared), or None with fewer than two listings
+        """
+        n = self.n
+        if n < 2:
+            return None
+        
+        cov_xy = self.sum_xy - self.sum_x * self.sum_y / n
+        var_x = self.sum_xx - self.sum_x ** 2 / n
+        var_y = self.sum_yy - self.sum_y ** 2 / n
+        
+        slope = cov_xy / var_x if var_x > 0 else 0.0
+        intercept = (self.sum_y - slope * self.sum_x) / n
+        if var_y <= 0:
+            r_squared = 1.0  # Every price is the same, so the flat line fits exactly
+        elif var_x <= 0:
+            r_squared = 0.0
+        else:
+            r_squared = min(cov_xy ** 2 / (var_x * var_y), 1.0)
+        return slope, intercept, r_squared
+    
+    @property
+    def mean_mileage(self) -> float:
+        """Mean mileage of the listings in this group."""
+        return self.sum_x / self.n if self.n else 0.0
+    
+    def __repr__(self) -> str:
+        return f"<RegressionStat {self.year} model {self.model_id} (n={self.n})>"
@@ -7,13 +7,16 @@ class Vehicle(db.Model):
     
     __tablename__ = 'vehicles'
     
-    model_id = db.Column(db.SmallInteger, primary_key=True)
+    # SQLite only autoincrements INTEGER primary keys (used by the benchmark stand-in)
+    model_id = db.Column(db.SmallInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
     make = db.Column(db.String(255), nullable=False)
     model = db.Column(db.String(255), nullable=False)
     
     # Relationships
     listings = relationship('Listing', back_populates='vehicle')
     predictions = relationship('Prediction', back_populates='vehicle')
+    regression_stats = relationship('RegressionStat', back_populates='vehicle')
+    vin_prefixes = relationship('VinPrefix', back_populates='vehicle')
     
     __table_args__ = (
         db.UniqueConstraint('make', 'model', name='make_model'),
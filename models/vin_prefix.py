@@ -0,0 +1,35 @@
+from typing import Optional
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import relationship
+from .base import db
+
+class VinPrefix(db.Model):
+    """Model counting listings per VIN prefix, year and model, used to decode VINs that are not listed."""
+    
+    __tablename__ = 'vin_prefixes'
+    
+    prefix = db.Column(db.String(9), primary_key=True)
+    year = db.Column(db.SmallInteger, primary_key=True)
+    model_id = db.Column(db.SmallInteger, ForeignKey('vehicles.model_id', ondelete='CASCADE'), primary_key=True)
+    listing_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Relationships
+    vehicle = relationship('Vehicle', back_populates='vin_prefixes')
+    
+    @staticmethod
+    def prefix_for(vin: str) -> Optional[str]:
+        """
+        Build the lookup prefix for a VIN: the WMI and VDS (positions 1-8) plus
+        the model year character (position 10). The check digit is skipped.
+        Must match PREFIX_SQL in services/vin_prefixes.py.
+        
+        Returns:
+            Nine character prefix, or None if the VIN is not 17 characters long
+        """
+        if not vin or len(vin) != 17:
+            return None
+        vin = vin.upper()
+        return vin[:8] + vin[9]
+    
+    def __repr__(self) -> str:
+        return f"<VinPrefix {self.prefix} {self.year} model {self.model_id} ({self.listing_count})>"
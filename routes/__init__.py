@@ -1,5 +1,24 @@
 from flask import Flask
 from .home import init_home_routes
+from .api import init_api_routes
+from .health import init_health_routes
+
+# Most statements a request to each route may run, including a prediction
+# fit on a cache miss; enforced by QUERY_DIAGNOSTICS and tests/test_query_budgets.py
+QUERY_BUDGETS = {
+    '/': 0,
+    '/search': 1,
+    '/results': 8,
+    '/listings': 2,
+    '/api/v1/estimate': 8,
+    '/api/v1/estimate/batch': 8,
+    '/api/v1/vin/<vin>': 8,
+    '/api/v1/listings': 2,
+    '/api/v1/makes': 1,
+    '/api/v1/models': 1,
+    '/api/v1/autocomplete': 1,
+}
+
 
 def init_routes(app: Flask) -> None:
     """
@@ -8,4 +27,6 @@ def init_routes(app: Flask) -> None:
     Args:
         app: Flask application instance
     """
-    init_home_routes(app) 
\ No newline at end of file
+    init_home_routes(app)
+    init_api_routes(app)
+    init_health_routes(app) 
\ No newline at end of file
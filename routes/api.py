@@ -0,0 +1,19 @@
+from flask import Flask
+from controllers import ApiController
+
+def init_api_routes(app: Flask) -> None:
+    """
+    Initialize JSON API routes.
+    
+    Args:
+        app: Flask application instance
+    """
+    api_controller = ApiController()
+    
+    app.add_url_rule("/api/v1/estimate", methods=["GET", "POST"], view_func=api_controller.estimate)
+    app.add_url_rule("/api/v1/estimate/batch", methods=["POST"], view_func=api_controller.estimate_batch)
+    app.add_url_rule("/api/v1/vin/<vin>", view_func=api_controller.vin)
+    app.add_url_rule("/api/v1/listings", view_func=api_controller.listings)
+    app.add_url_rule("/api/v1/makes", view_func=api_controller.makes)
+    app.add_url_rule("/api/v1/models", view_func=api_controller.models)
+    app.add_url_rule("/api/v1/autocomplete", view_func=api_controller.autocomplete) 
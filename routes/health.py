@@ -0,0 +1,14 @@
+from flask import Flask
+from controllers import HealthController
+
+def init_health_routes(app: Flask) -> None:
+    """
+    Initialize operational routes.
+    
+    Args:
+        app: Flask application instance
+    """
+    health_controller = HealthController()
+    
+    app.add_url_rule("/health", view_func=health_controller.health)
+    app.add_url_rule("/metrics", view_func=health_controller.metrics)
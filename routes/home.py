@@ -12,4 +12,5 @@ def init_home_routes(app: Flask) -> None:
     
     app.add_url_rule("/", view_func=home_controller.index)
     app.add_url_rule("/search", view_func=home_controller.search)
-    app.add_url_rule("/results", methods=["POST"], view_func=home_controller.results) 
\ No newline at end of file
+    app.add_url_rule("/results", methods=["POST"], view_func=home_controller.results)
+    app.add_url_rule("/listings", view_func=home_controller.browse) 
\ No newline at end of file
@@ -0,0 +1,139 @@
+import sys
+import os
+import time
+import argparse
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, literal, or_, select
+
+from db import upsert
+from models import db, Listing, ListingArchive
+from scripts.populate_database import create_app
+from services import RegressionStatsDelta, VinPrefixDelta, invalidate_stored_predictions
+
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_STATUSES = ('sold', 'removed')
+
+# Every listing column is copied; archived_at is set by the job
+ARCHIVE_COLUMNS = [column.name for column in Listing.__table__.columns]
+
+
+def archive_batch(candidates, after_vin: str, batch_size: int):
+    """
+    Move the next batch of candidate listings after after_vin into
+    listings_archive in one transaction, and take them out of
+    regression_stats, vin_prefixes and the stored predictions.
+    
+    Args:
+        candidates: Condition selecting the listings to archive
+        after_vin: Last VIN of the previous batch, or '' to start
+        batch_size: Listings per batch
+    
+    Returns:
+        Tuple of (listings archived, last VIN of the batch or None when done)
+    """
+    # Walk the primary key, so each batch resumes where the last one stopped
+    # instead of rescanning the listings that were kept
+    rows = db.session.execute(
+        select(Listing.vin, Listing.year, Listing.model_id, Listing.mileage, Listing.price)
+        .where(Listing.vin > after_vin, candidates)
+        .order_by(Listing.vin)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, None
+    vins = [row.vin for row in rows]
+
+    copy = select(
+        *(getattr(Listing, column) for column in ARCHIVE_COLUMNS),
+        literal(datetime.utcnow()).label('archived_at'),
+    ).where(Listing.vin.in_(vins))
+    # A VIN archived before, relisted and archived again replaces its old row
+    stmt = upsert(ListingArchive, None, ARCHIVE_COLUMNS + ['archived_at'])
+    db.session.execute(stmt.from_select(ARCHIVE_COLUMNS + ['archived_at'], copy))
+    db.session.execute(delete(Listing).where(Listing.vin.in_(vins)))
+
+    # Archived VINs stop counting towards VIN decoding, as they would after a
+    # rebuild from listings, so a relisted VIN is counted once again
+    regression = RegressionStatsDelta()
+    prefixes = VinPrefixDelta()
+    for row in rows:
+        regression.remove(row.year, row.model_id, row.mileage, row.price)
+        prefixes.remove(row.vin, row.year, row.model_id)
+    prefixes.apply()
+    invalidate_stored_predictions(regression.apply())
+    db.session.commit()
+    return len(rows), vins[-1]
+
+
+def archive_listings(max_age_days: float = None, statuses=ARCHIVE_STATUSES,
+                     batch_size: int = ARCHIVE_BATCH_SIZE, pause: float = 0.0) -> int:
+    """
+    Move listings not seen for max_age_days, or whose status is one of
+    statuses, from listings to listings_archive in bounded batches so each
+    transaction holds its locks briefly.
+    
+    Args:
+        max_age_days: Archive listings whose last_seen is older than this many days
+        statuses: Archive listings with one of these statuses, matched case-insensitively
+        batch_size: Listings per transaction
+        pause: Seconds to sleep between batches, to leave room for ingest
+    
+    Returns:
+        Number of listings archived
+    """
+    conditions = []
+    if max_age_days is not None:
+        conditions.append(Listing.last_seen < date.today() - timedelta(days=max_age_days))
+    if statuses:
+        conditions.append(func.lower(Listing.status).in_([status.lower() for status in statuses]))
+    if not conditions:
+        return 0
+    candidates = or_(*conditions)
+
+    archived = 0
+    after_vin = ''
+    while True:
+        count, after_vin = archive_batch(candidates, after_vin, batch_size)
+        if after_vin is None:
+            return archived
+        archived += count
+        print(f"Archived {archived:,} listings (through {after_vin})")
+        if pause:
+            time.sleep(pause)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Move sold, removed and stale listings from listings to listings_archive"
+    )
+    parser.add_argument("--max-age-days", type=float,
+                        default=float(os.getenv("LISTING_ARCHIVE_MAX_AGE_DAYS") or 90),
+                        help="Archive listings not seen for this many days "
+                             "(default: LISTING_ARCHIVE_MAX_AGE_DAYS or 90)")
+    parser.add_argument("--statuses", type=lambda value: [status for status in value.split(',') if status],
+                        default=list(ARCHIVE_STATUSES),
+                        help=f"Comma-separated statuses to archive regardless of age "
+                             f"(default: {','.join(ARCHIVE_STATUSES)}; empty for none)")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE,
+                        help=f"Listings moved per transaction (default: {ARCHIVE_BATCH_SIZE})")
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="Seconds to sleep between batches (default: 0)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+
+    with app.app_context():
+        start_time = time.time()
+        archived = archive_listings(args.max_age_days, args.statuses, args.batch_size, args.pause)
+        remaining = db.session.execute(select(func.count()).select_from(Listing)).scalar()
+        print(f"Archived {archived:,} listings in {time.time() - start_time:.1f}s")
+        print(f"Listings remaining: {remaining:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import sys
+import os
+import re
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event, select
+
+from models import db, Listing, Vehicle
+from services import model_id_cache, prediction_cache, statement_shape
+
+# SQLite plan steps that read a whole table rather than an index range
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def sample_requests(vin: str, year: int, make: str, model: str, mileage: int) -> list:
+    """Return (method, path, keyword arguments) for every route that reads the database."""
+    vehicle = {'year': year, 'make': make, 'model': model, 'mileage': mileage}
+    return [
+        ('GET', '/search', {}),
+        ('POST', '/results', {'data': {key: str(value) for key, value in vehicle.items()}}),
+        ('GET', '/listings', {'query_string': {'year': year, 'make': make, 'model': model, 'state': 'CA'}}),
+        ('GET', '/api/v1/listings', {'query_string': {'year': year, 'make': make, 'model': model, 'sort': 'mileage'}}),
+        ('GET', '/api/v1/estimate', {'query_string': vehicle}),
+        ('POST', '/api/v1/estimate/batch', {'json': {'vehicles': [vehicle, {**vehicle, 'year': year - 1}]}}),
+        ('GET', f'/api/v1/vin/{vin}', {}),
+        ('GET', '/api/v1/makes', {}),
+        ('GET', '/api/v1/models', {'query_string': {'make': make}}),
+        ('GET', '/api/v1/autocomplete', {'query_string': {'q': make[:2]}}),
+    ]
+
+
+def capture_statements(app: Flask) -> list:
+    """
+    Send every sample request twice, first with the caches cleared so the
+    cache-miss path runs too, and record the SELECTs they execute.
+    
+    Returns:
+        List of (route, statement, parameters), one per statement shape
+    """
+    with app.app_context():
+        row = db.session.execute(
+            select(Listing.vin, Listing.year, Vehicle.make, Vehicle.model, Listing.mileage)
+            .join(Vehicle, Listing.model_id == Vehicle.model_id)
+            .where(Listing.price.isnot(None), Listing.mileage.isnot(None))
+            .limit(1)
+        ).first()
+        engine = db.engine
+    if row is None:
+        print("Error: no listings with a price and mileage to build sample requests from")
+        sys.exit(1)
+
+    captured = {}
+    current = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.setdefault(statement_shape(statement), (current['route'], statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        for method, path, kwargs in sample_requests(*row):
+            current['route'] = f"{method} {path}"
+            prediction_cache.invalidate()
+            model_id_cache.invalidate()
+            for _ in range(2):
+                response = client.open(path, method=method, **kwargs)
+                if response.status_code >= 500:
+                    print(f"Warning: {method} {path} returned {response.status_code}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return list(captured.values())
+
+
+def explain_rows(connection, statement: str, parameters) -> list:
+    """Return the plan of a statement as dictionaries, in the dialect's own EXPLAIN format."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    result = connection.exec_driver_sql(prefix + statement, parameters)
+    return [dict(row._mapping) for row in result]
+
+
+def full_scans(dialect: str, plan: list, tables) -> list:
+    """Return the tables a plan reads in full, ignoring derived tables and subqueries."""
+    scanned = []
+    for step in plan:
+        if dialect == 'sqlite':
+            match = SQLITE_SCAN.match(step['detail'])
+            table = match.group(1) if match else None
+        else:
+            table = step.get('table') if step.get('type') == 'ALL' else None
+        if table in tables:
+            scanned.append(table)
+    return scanned
+
+
+def format_plan(plan: list) -> str:
+    if not plan:
+        return "    (empty plan)"
+    columns = list(plan[0])
+    return '\n'.join(
+        "    " + " | ".join(f"{column}={step[column]}" for column in columns if step[column] is not None)
+        for step in plan
+    )
+
+
+def audit(app: Flask, allow=(), verbose: bool = False) -> int:
+    """
+    Run EXPLAIN on every SELECT the application's routes execute and report
+    the ones that scan a whole table.
+    
+    Args:
+        app: Application to send the sample requests to
+        allow: Tables whose full scans are expected
+        verbose: Print every plan, not only the failing ones
+    
+    Returns:
+        Number of statements with an unexpected full scan
+    """
+    statements = capture_statements(app)
+    failures = 0
+    with app.app_context():
+        tables = set(db.metadata.tables) - set(allow)
+        with db.engine.connect() as connection:
+            dialect = connection.dialect.name
+            for route, statement, parameters in statements:
+                plan = explain_rows(connection, statement, parameters)
+                scanned = full_scans(dialect, plan, tables)
+                if scanned:
+                    failures += 1
+                if scanned or verbose:
+                    status = f"FULL SCAN of {', '.join(scanned)}" if scanned else "ok"
+                    print(f"\n[{status}] {route}\n  {statement_shape(statement)}\n{format_plan(plan)}")
+    print(f"\nAudited {len(statements)} statements: {failures} with a full table scan")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="EXPLAIN every query the web app runs for a set of sample requests "
+                    "and fail if any of them scans a whole table"
+    )
+    parser.add_argument("--allow", type=lambda value: value.split(','), default=[],
+                        help="Comma-separated tables whose full scans are expected")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not only the failing ones")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    # Imported here: importing app builds the application from the DB_* settings
+    from app import app
+
+    failures = audit(app, args.allow, args.verbose)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+from collections import defaultdict
+
+from sqlalchemy import select, update
+
+from db import upsert
+from models import db, Listing, DealerWebsite
+from services import RegressionStatsDelta, VinPrefixDelta, invalidate_stored_predictions
+
+LISTING_COLUMNS = (
+    'year', 'model_id', 'trim', 'dealer_id', 'price', 'mileage', 'used',
+    'certified', 'style', 'driven_wheels', 'engine', 'fuel_type',
+    'exterior_color', 'interior_color', 'first_seen', 'last_seen',
+    'vdp_last_seen', 'status',
+)
+
+# last_seen moves on every feed without the listing changing, so it is left
+# out of the content hash and handled by a cheaper update
+HASHED_COLUMNS = ('vin',) + tuple(column for column in LISTING_COLUMNS if column != 'last_seen')
+
+UPSERT_COLUMNS = LISTING_COLUMNS + ('content_hash',)
+
+
+def content_hash(row) -> str:
+    """Hash the listing columns that matter for change detection."""
+    raw = '|'.join(str(row[column]) for column in HASHED_COLUMNS)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def listing_row(record, model_id: int, dealer_id: int) -> dict:
+    """
+    Build the listings row for a parsed record.
+    Args:
+        record: Parsed feed record
+        model_id: Resolved vehicle id
+        dealer_id: Resolved dealer id
+    Returns:
+        Dictionary of listing column values, including content_hash
+    """
+    row = {column: record[column] for column in LISTING_COLUMNS if column in record}
+    row['vin'] = record['vin']
+    row['model_id'] = model_id
+    row['dealer_id'] = dealer_id
+    row['content_hash'] = content_hash(row)
+    return row
+
+
+def regression_values(row):
+    """Return the (year, model_id, mileage, price) a listing contributes to the regression."""
+    return row['year'], row['model_id'], row['mileage'], row['price']
+
+
+def vehicle_values(row):
+    """Return the (year, model_id) a listing contributes to the VIN prefix counts."""
+    return row['year'], row['model_id']
+
+
+def write_chunk(records, dimensions, stats=None) -> int:
+    """
+    Write a chunk of parsed records with set-based upserts. Listings whose
+    content hash matches the stored one are not rewritten; if only last_seen
+    moved, just that column is updated. regression_stats and vin_prefixes
+    are adjusted for every rewritten listing and cached predictions for the
+    affected groups are invalidated. The caller is responsible for committing or
+    rolling back the session.
+    Args:
+        records: Parsed feed records
+        dimensions: DimensionCache used to resolve model and dealer ids
+        stats: Optional Counter updated with 'upserted', 'touched' and 'unchanged'
+    Returns:
+        Number of records written
+    """
+    if not records:
+        return 0
+
+    dimensions.resolve(records)
+
+    # Later lines win when a VIN or dealer website repeats within the chunk
+    websites = {}
+    listings = {}
+    for record in records:
+        dealer_id = dimensions.dealer_id(record)
+        if record['website']:
+            websites[dealer_id] = {'dealer_id': dealer_id, 'url': record['website']}
+        listings[record['vin']] = listing_row(record, dimensions.model_id(record), dealer_id)
+
+    stored = {
+        row.vin: row
+        for row in db.session.execute(
+            select(
+                Listing.vin, Listing.content_hash, Listing.last_seen,
+                Listing.year, Listing.model_id, Listing.mileage, Listing.price,
+            ).where(Listing.vin.in_(listings.keys()))
+        )
+    }
+
+    changed = []
+    touched = defaultdict(list)  # last_seen -> VINs whose content is unchanged
+    unchanged = 0
+    regression = RegressionStatsDelta()
+    prefixes = VinPrefixDelta()
+    for vin, row in listings.items():
+        current = stored.get(vin)
+        if current is None or current.content_hash != row['content_hash']:
+            changed.append(row)
+            regression.replace(
+                regression_values(current._mapping) if current is not None else None,
+                regression_values(row),
+            )
+            prefixes.replace(
+                vin,
+                vehicle_values(current._mapping) if current is not None else None,
+                vehicle_values(row),
+            )
+        elif current.last_seen != row['last_seen']:
+            touched[row['last_seen']].append(vin)
+        else:
+            unchanged += 1
+
+    if websites:
+        db.session.execute(upsert(DealerWebsite, list(websites.values()), ['url']))
+    if changed:
+        db.session.execute(upsert(Listing, changed, UPSERT_COLUMNS))
+    for last_seen, vins in touched.items():
+        db.session.execute(
+            update(Listing).where(Listing.vin.in_(vins)).values(last_seen=last_seen)
+        )
+    prefixes.apply()
+    invalidate_stored_predictions(regression.apply())
+
+    if stats is not None:
+        stats['upserted'] += len(changed)
+        stats['touched'] += sum(len(vins) for vins in touched.values())
+        stats['unchanged'] += unchanged
+    return len(records)
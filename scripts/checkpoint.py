@@ -0,0 +1,43 @@
+import json
+import os
+
+
+class Checkpoint:
+    """
+    Byte-offset checkpoint for a feed file, stored next to it as
+    <file>.checkpoint. A checkpoint is only honoured if the feed file has
+    the same size and modification time as when it was written.
+    """
+
+    def __init__(self, file_path: str):
+        self.path = f"{file_path}.checkpoint"
+        stat = os.stat(file_path)
+        self.fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load(self):
+        """
+        Read the saved position.
+        Returns:
+            Tuple of (byte offset, lines already processed); (0, 0) if there is
+            no usable checkpoint
+        """
+        if not os.path.exists(self.path):
+            return 0, 0
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+        if state.get('fingerprint') != self.fingerprint:
+            print(f"Ignoring checkpoint {self.path}: feed file has changed")
+            return 0, 0
+        return state['offset'], state['line_num']
+
+    def save(self, offset: int, line_num: int) -> None:
+        """Atomically record that everything before offset has been committed."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'offset': offset, 'line_num': line_num}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the whole file has been processed."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
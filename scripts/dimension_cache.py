@@ -0,0 +1,112 @@
+from sqlalchemy import and_, literal, select, union_all
+
+from db import upsert
+from models import db, Dealer, Vehicle
+from services import invalidate_vehicle_index
+
+DEALER_COLUMNS = ('name', 'street', 'city', 'state', 'zip')
+
+
+class DimensionCache:
+    """
+    In-memory maps of the vehicles and dealers dimension tables, used by the
+    batch ingest path to resolve foreign keys without per-row lookups.
+    """
+
+    def __init__(self):
+        self.model_ids = {}   # (make, model) as spelled in the feed -> model_id
+        self.dealer_ids = {}  # natural_key -> dealer_id
+
+    def load(self) -> None:
+        """Load every existing vehicle and dealer. Requires an app context."""
+        self.model_ids = {
+            (make, model): model_id
+            for make, model, model_id in db.session.execute(
+                select(Vehicle.make, Vehicle.model, Vehicle.model_id)
+            )
+        }
+        self.dealer_ids = dict(db.session.execute(select(Dealer.natural_key, Dealer.dealer_id)).all())
+        print(f"Loaded {len(self.model_ids):,} vehicles and {len(self.dealer_ids):,} dealers into cache")
+
+    def resolve(self, records) -> None:
+        """
+        Make sure every vehicle and dealer referenced by the records has an id,
+        inserting the missing ones with one multi-row statement per table.
+        Newly allocated rows are committed right away so the cache never holds
+        ids from a transaction that is later rolled back. Each record gets a
+        'dealer_key' entry with its dealer natural key.
+        Args:
+            records: Parsed feed records
+        """
+        missing_vehicles = {
+            (r['make'], r['model']) for r in records
+        } - self.model_ids.keys()
+        missing_dealers = {}
+        for record in records:
+            key = record['dealer_key'] = Dealer.natural_key_for(*record['dealer'])
+            if key not in self.dealer_ids:
+                missing_dealers[key] = record['dealer']
+
+        if not (missing_vehicles or missing_dealers):
+            return
+
+        if missing_vehicles:
+            db.session.execute(upsert(
+                Vehicle,
+                [{'make': make, 'model': model} for make, model in missing_vehicles],
+                # Leave an existing row, and its spelling, as it is
+                lambda inserted: {'model_id': Vehicle.model_id},
+                conflict_columns=['make', 'model'],
+            ))
+            self.model_ids.update(self._match_vehicles(missing_vehicles))
+
+        if missing_dealers:
+            db.session.execute(upsert(
+                Dealer,
+                [
+                    {**dict(zip(DEALER_COLUMNS, dealer)), 'natural_key': key}
+                    for key, dealer in missing_dealers.items()
+                ],
+                ['natural_key'],
+                conflict_columns=['natural_key'],
+            ))
+            self.dealer_ids.update(db.session.execute(
+                select(Dealer.natural_key, Dealer.dealer_id).where(
+                    Dealer.natural_key.in_(missing_dealers.keys())
+                )
+            ).all())
+
+        db.session.commit()
+        if missing_vehicles:
+            invalidate_vehicle_index()
+
+    def _match_vehicles(self, spellings) -> dict:
+        """
+        Look up the vehicles rows for (make, model) pairs as spelled in the
+        feed. The join compares them with the column's own collation, so a
+        spelling that the unique key treats as an existing vehicle ("TOYOTA",
+        "Citroen" for "Citroën" under MySQL's accent- and case-insensitive
+        default) maps to that row, whatever its stored spelling.
+        Args:
+            spellings: Iterable of (make, model) pairs
+        Returns:
+            Dictionary mapping each pair to its model_id
+        """
+        requested = union_all(*(
+            select(literal(make).label('make'), literal(model).label('model'))
+            for make, model in spellings
+        )).subquery()
+        rows = db.session.execute(
+            select(requested.c.make, requested.c.model, Vehicle.model_id).join(
+                Vehicle, and_(Vehicle.make == requested.c.make, Vehicle.model == requested.c.model)
+            )
+        )
+        return {(make, model): model_id for make, model, model_id in rows}
+
+    def model_id(self, record) -> int:
+        """Return the model_id for a resolved record."""
+        return self.model_ids[(record['make'], record['model'])]
+
+    def dealer_id(self, record) -> int:
+        """Return the dealer_id for a resolved record."""
+        return self.dealer_ids[record['dealer_key']]
@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import argparse
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select
+
+from models import db, Prediction
+from scripts.populate_database import create_app
+
+DELETE_BATCH_SIZE = 5000
+
+
+def delete_used_before(cutoff: datetime, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """
+    Delete predictions last used before the cutoff, in bounded batches so
+    each transaction holds its locks briefly.
+    
+    Returns:
+        Number of predictions deleted
+    """
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(Prediction.id)
+            .where(Prediction.last_used_at < cutoff)
+            .order_by(Prediction.last_used_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(Prediction).where(Prediction.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def evict_predictions(max_age_days: float = None, max_rows: int = None) -> tuple:
+    """
+    Apply the predictions retention policy.
+    
+    Args:
+        max_age_days: Delete predictions not used for this many days
+        max_rows: Then delete the least recently used predictions until at most
+            this many remain
+            
+    Returns:
+        Tuple of (deleted by age, deleted by row budget)
+    """
+    by_age = 0
+    if max_age_days is not None:
+        by_age = delete_used_before(datetime.utcnow() - timedelta(days=max_age_days))
+
+    by_budget = 0
+    if max_rows is not None:
+        # last_used_at of the newest prediction outside the budget
+        cutoff = db.session.execute(
+            select(Prediction.last_used_at)
+            .order_by(Prediction.last_used_at.desc())
+            .offset(max_rows)
+            .limit(1)
+        ).scalar()
+        if cutoff is not None:
+            # Rows sharing the cutoff timestamp are removed too
+            by_budget = delete_used_before(cutoff + timedelta(microseconds=1))
+
+    return by_age, by_budget
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evict old predictions by last_used_at")
+    parser.add_argument("--max-age-days", type=float, default=30,
+                        help="Delete predictions unused for this many days (default: 30)")
+    parser.add_argument("--max-rows", type=int, default=None,
+                        help="Keep at most this many predictions, evicting least recently used first")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+
+    with app.app_context():
+        start_time = time.time()
+        by_age, by_budget = evict_predictions(args.max_age_days, args.max_rows)
+        remaining = db.session.execute(select(func.count(Prediction.id))).scalar()
+        print(f"Deleted {by_age:,} predictions older than {args.max_age_days:g} days "
+              f"and {by_budget:,} over the row budget in {time.time() - start_time:.1f}s")
+        print(f"Predictions remaining: {remaining:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import select
+
+from db import stream
+from models import db, Listing, Vehicle
+from scripts.populate_database import create_app
+from services import write_snapshot
+
+
+def export_snapshot(directory: str, fetch_size: int = 100000, keep: int = 2) -> str:
+    """
+    Stream (year, model_id, mileage, price) for every listing with a price
+    and mileage and write them as a new listing snapshot version.
+    
+    Args:
+        directory: Snapshot root directory
+        fetch_size: Rows fetched per round trip while streaming listings
+        keep: Number of snapshot versions to keep
+    
+    Returns:
+        Name of the new version
+    """
+    start_time = time.time()
+    query = (
+        select(Listing.year, Listing.model_id, Listing.mileage, Listing.price)
+        .where(Listing.price.isnot(None), Listing.mileage.isnot(None))
+    )
+    partitions = [np.array(partition, dtype=np.float64) for partition in stream(query, batch_size=fetch_size)]
+    columns = np.vstack(partitions) if partitions else np.empty((0, 4))
+    vehicles = db.session.execute(select(Vehicle.model_id, Vehicle.make, Vehicle.model)).all()
+    read_time = time.time() - start_time
+
+    version = write_snapshot(
+        directory, columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3], vehicles, keep
+    )
+    print(f"Exported {len(columns):,} listings to {os.path.join(directory, version)} "
+          f"in {time.time() - start_time:.1f}s (read {read_time:.1f}s)")
+    return version
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export year, model_id, mileage and price of every listing as a memory-mapped snapshot"
+    )
+    parser.add_argument("--directory", default=os.getenv("LISTING_SNAPSHOT_DIR"),
+                        help="Snapshot root directory (default: LISTING_SNAPSHOT_DIR)")
+    parser.add_argument("--fetch-size", type=int, default=100000,
+                        help="Rows fetched per round trip while streaming listings (default: 100000)")
+    parser.add_argument("--keep", type=int, default=2,
+                        help="Snapshot versions to keep, including the new one (default: 2)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if not args.directory:
+        print("Error: set LISTING_SNAPSHOT_DIR or pass --directory")
+        sys.exit(1)
+    if args.keep < 1:
+        print("Error: --keep must be at least 1")
+        sys.exit(1)
+
+    app = create_app()
+
+    with app.app_context():
+        export_snapshot(args.directory, args.fetch_size, args.keep)
+
+
+if __name__ == "__main__":
+    main()
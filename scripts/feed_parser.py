@@ -0,0 +1,74 @@
+from datetime import datetime
+
+# Field order of the pipe-delimited feed, as documented in the README
+FEED_FIELDS = (
+    'vin', 'year', 'make', 'model', 'trim',
+    'dealer_name', 'dealer_street', 'dealer_city', 'dealer_state', 'dealer_zip',
+    'price', 'mileage', 'used', 'certified',
+    'style', 'driven_wheels', 'engine', 'fuel_type',
+    'exterior_color', 'interior_color',
+    'website', 'first_seen', 'last_seen', 'vdp_last_seen', 'status',
+)
+
+FIELD_COUNT = len(FEED_FIELDS)
+
+
+class FieldCountError(ValueError):
+    """Raised when a feed line does not have the expected number of fields."""
+
+
+def parse_date(value: str):
+    """Parse a YYYY-MM-DD feed date, returning None for empty values."""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def parse_line(line: str) -> dict:
+    """
+    Parse one pipe-delimited feed line into a listing record.
+    Args:
+        line: Stripped line from the feed file
+    Returns:
+        Dictionary with the listing columns plus make, model, dealer and website
+    Raises:
+        FieldCountError: If the line does not have 25 fields
+        ValueError: If a required field is missing or a value cannot be converted
+    """
+    fields = line.split('|')
+    if len(fields) != FIELD_COUNT:
+        raise FieldCountError(f"Invalid field count: {len(fields)} fields")
+
+    vin, year_str, make, model, trim = fields[0:5]
+    dealer_info = fields[5:10]  # name, street, city, state, zip
+    price_str, mileage_str = fields[10:12]
+    used_str, certified_str = fields[12:14]
+    style, driven_wheels, engine, fuel_type = fields[14:18]
+    ext_color, int_color = fields[18:20]
+    website, first_seen, last_seen, vdp_last_seen, status = fields[20:25]
+
+    # Check required fields
+    if not (vin and year_str and first_seen and last_seen):
+        raise ValueError("Missing required field(s)")
+
+    return {
+        'vin': vin,
+        'year': int(year_str),
+        'make': make,
+        'model': model,
+        'trim': trim or None,
+        'dealer': tuple(dealer_info),
+        'price': float(price_str) if price_str else None,
+        'mileage': int(mileage_str) if mileage_str else None,
+        'used': used_str == 'TRUE',
+        'certified': certified_str == 'TRUE',
+        'style': style or None,
+        'driven_wheels': driven_wheels or None,
+        'engine': engine or None,
+        'fuel_type': fuel_type or None,
+        'exterior_color': ext_color or None,
+        'interior_color': int_color or None,
+        'website': website or None,
+        'first_seen': parse_date(first_seen),
+        'last_seen': parse_date(last_seen),
+        'vdp_last_seen': parse_date(vdp_last_seen),
+        'status': status or None,
+    }
@@ -7,15 +7,32 @@ def read_from_file(file_path: str, chunk_size: int = 1000):
     Yields:
         List of lines from the file
     """
-    with open(file_path, "r") as file:
+    for chunk, _ in read_chunks_with_offsets(file_path, chunk_size):
+        yield chunk
+
+
+def read_chunks_with_offsets(file_path: str, chunk_size: int = 1000, start_offset: int = 0):
+    """
+    Generator function to read large files in chunks, tracking byte offsets
+    so a reader can checkpoint and resume
+    Args:
+        file_path: Path to the file to read
+        chunk_size: Number of lines to read at once
+        start_offset: Byte offset to resume from; 0 starts after the header
+    Yields:
+        Tuple of (list of lines, byte offset just past the chunk)
+    """
+    with open(file_path, "rb") as file:
         # Skip the header line
-        next(file)
-        
+        file.readline()
+        if start_offset > file.tell():
+            file.seek(start_offset)
+
         chunk = []
         for line in file:
-            chunk.append(line.strip())
+            chunk.append(line.decode("utf-8").strip())
             if len(chunk) >= chunk_size:
-                yield chunk
+                yield chunk, file.tell()
                 chunk = []
         if chunk:  # Don't forget the last chunk
-            yield chunk 
\ No newline at end of file
+            yield chunk, file.tell()
@@ -0,0 +1,145 @@
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import delete, select
+
+from db import executemany, stream, upsert
+from models import db, Listing, Prediction
+from services import fit_groups, group_sums, invalidate_predictions
+
+GROUP_KEY_BASE = 1 << 16  # year and model_id are both SMALLINT
+WRITE_BATCH_SIZE = 5000
+
+FITTED_COLUMNS = (
+    'slope', 'intercept', 'mean_mileage', 'min_mileage', 'max_mileage',
+    'predicted_price', 'confidence_score', 'sample_size',
+)
+
+
+def stream_group_sums(fetch_size: int):
+    """
+    Stream (year, model_id, mileage, price) for every listing with a price and
+    mileage through an unbuffered cursor, reducing each fetched batch to
+    per-group sums as it arrives.
+    
+    Returns:
+        Tuple of (group keys, sums array of shape (6, groups), mileage range
+        array of shape (2, groups))
+    """
+    query = (
+        select(Listing.year, Listing.model_id, Listing.mileage, Listing.price)
+        .where(Listing.price.isnot(None), Listing.mileage.isnot(None))
+    )
+    partial_keys = []
+    partial_sums = []
+    partial_ranges = []
+    for partition in stream(query, batch_size=fetch_size):
+        columns = np.array(partition, dtype=np.float64)
+        keys = columns[:, 0].astype(np.int64) * GROUP_KEY_BASE + columns[:, 1].astype(np.int64)
+        keys, sums, ranges = group_sums(keys, columns[:, 2], columns[:, 3])
+        partial_keys.append(keys)
+        partial_sums.append(sums)
+        partial_ranges.append(ranges)
+
+    if not partial_keys:
+        return np.empty(0, dtype=np.int64), np.empty((6, 0)), np.empty((2, 0))
+
+    # Merge the per-partition sums into one row per group
+    keys = np.concatenate(partial_keys)
+    sums = np.hstack(partial_sums)
+    ranges = np.hstack(partial_ranges)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    merged = np.vstack([
+        np.bincount(inverse, weights=row, minlength=len(unique_keys)) for row in sums
+    ])
+    merged_ranges = np.vstack([
+        np.full(len(unique_keys), np.inf),
+        np.full(len(unique_keys), -np.inf),
+    ])
+    np.minimum.at(merged_ranges[0], inverse, ranges[0])
+    np.maximum.at(merged_ranges[1], inverse, ranges[1])
+    return unique_keys, merged, merged_ranges
+
+
+def materialize_predictions(fetch_size: int = 100000, min_listings: int = None) -> int:
+    """
+    Refit the price line for every (year, model_id) group in one pass over
+    listings and replace the contents of predictions.
+    
+    Args:
+        fetch_size: Rows fetched per round trip while streaming listings
+        min_listings: Leave groups with fewer listings to be fitted on demand
+            together with their archived listings; defaults to
+            ESTIMATE_HISTORY_MIN_LISTINGS
+        
+    Returns:
+        Number of predictions written
+    """
+    if min_listings is None:
+        min_listings = int(os.getenv("ESTIMATE_HISTORY_MIN_LISTINGS") or 0)
+    start_time = time.time()
+    keys, sums, ranges = stream_group_sums(fetch_size)
+    read_time = time.time() - start_time
+
+    slope, intercept, r_squared = fit_groups(sums)
+    n = sums[0]
+    mean_mileage = np.divide(sums[1], n, out=np.zeros_like(n), where=n > 0)
+    predicted = np.maximum(intercept + slope * mean_mileage, 0.0)
+    fitted = ~np.isnan(slope) & (n >= min_listings)
+
+    rows = [
+        {
+            'year': int(key // GROUP_KEY_BASE),
+            'model_id': int(key % GROUP_KEY_BASE),
+            'slope': float(group_slope),
+            'intercept': float(group_intercept),
+            'mean_mileage': float(group_mean),
+            'min_mileage': int(low),
+            'max_mileage': int(high),
+            'predicted_price': float(price),
+            'confidence_score': float(score),
+            'sample_size': int(size),
+        }
+        for key, group_slope, group_intercept, group_mean, low, high, price, score, size in zip(
+            keys[fitted], slope[fitted], intercept[fitted], mean_mileage[fitted],
+            ranges[0][fitted], ranges[1][fitted], predicted[fitted], r_squared[fitted], n[fitted]
+        )
+    ]
+
+    db.session.execute(delete(Prediction))
+    # A request may fit a group between the delete and the insert
+    stmt = upsert(Prediction, None, FITTED_COLUMNS, conflict_columns=['year', 'model_id'])
+    executemany(stmt, rows, WRITE_BATCH_SIZE)
+    db.session.commit()
+    invalidate_predictions()
+
+    total_time = time.time() - start_time
+    print(f"Materialized {len(rows):,} predictions from {int(n.sum()):,} listings "
+          f"in {total_time:.1f}s (read {read_time:.1f}s, {len(keys) - len(rows):,} groups too small or left for history)")
+    return len(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute predictions for every year and model")
+    parser.add_argument("--fetch-size", type=int, default=100000,
+                        help="Rows fetched per round trip (default: 100000)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    # Imported here so the ingest scripts can import this module without a cycle
+    from scripts.populate_database import create_app
+    app = create_app()
+
+    with app.app_context():
+        materialize_predictions(args.fetch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+
+from scripts.feed_parser import parse_line
+
+RANGE_BYTES = 8 * 1024 * 1024  # Size of each byte range handed to a worker
+
+
+def split_byte_ranges(file_path: str, range_bytes: int = RANGE_BYTES, start_offset: int = 0):
+    """
+    Split a feed file into byte ranges that start and end on line boundaries.
+    The header line is excluded.
+    Args:
+        file_path: Path to the feed file
+        range_bytes: Target size of each range
+        start_offset: Byte offset to resume from; 0 starts after the header
+    Returns:
+        List of (start, end) byte offsets
+    """
+    file_size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, 'rb') as f:
+        f.readline()  # Skip the header line
+        start = max(f.tell(), start_offset)
+        while start < file_size:
+            f.seek(min(start + range_bytes, file_size))
+            f.readline()  # Move to the end of the current line
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(task):
+    """
+    Read and parse one byte range of the feed. Runs in a worker process.
+    Args:
+        task: Tuple of (file_path, start, end)
+    Returns:
+        Tuple of (line count, list of (line, record), list of (line, error message),
+        byte count). Line numbers are relative to the start of the range.
+    """
+    file_path, start, end = task
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        # Split on b'\n' only, like the batch mode's line iteration; str.splitlines
+        # would also break lines at \r, \x0b, \x1c-\x1e, \x85 or \u2028 in a field
+        lines = f.read(end - start).split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()  # The range ends with a newline
+
+    records = []
+    errors = []
+    for line_num, line in enumerate(lines, 1):
+        line = line.decode('utf-8').strip()
+        if not line:
+            continue
+        try:
+            records.append((line_num, parse_line(line)))
+        except ValueError as e:
+            errors.append((line_num, str(e)))
+    return len(lines), records, errors, end - start
@@ -1,32 +1,40 @@
 import sys
 import os
 import time
-from urllib.parse import quote_plus 
+import argparse
+import multiprocessing
+from collections import Counter
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from db import init_database
 from models import db, Dealer, Vehicle, Listing, DealerWebsite
-from datetime import datetime
 from dotenv import load_dotenv
 
+from scripts.bulk_writer import listing_row, regression_values, vehicle_values, write_chunk
+from scripts.checkpoint import Checkpoint
+from scripts.dimension_cache import DimensionCache
+from scripts.feed_parser import FieldCountError, parse_line
+from scripts.file_processor import read_chunks_with_offsets
+from scripts.materialize_predictions import materialize_predictions
+from scripts.parallel_ingest import parse_range, split_byte_ranges
+from services import (
+    RegressionStatsDelta,
+    TextfileWriter,
+    VinPrefixDelta,
+    invalidate_stored_predictions,
+    invalidate_vehicle_index,
+    metrics,
+    record_ingest_rate,
+    record_ingest_rows,
+    timed_ingest_phase,
+)
+
 load_dotenv()
 
-def create_app():
+def create_app(engine_options=None):
     app = Flask(__name__)
-
-    # Safely encode DB credentials
-    db_user = quote_plus(os.getenv('DB_USER'))
-    db_password = quote_plus(os.getenv('DB_PASSWORD'))
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '3307')
-    db_name = os.getenv('DB_NAME')
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    )
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    db.init_app(app)
+    init_database(app, engine_options)
     return app
 def get_file_line_count(file_path):
     """Get total number of lines in file for progress tracking"""
@@ -36,106 +44,108 @@ def get_file_line_count(file_path):
     print(f"File contains {line_count:,} data lines")
     return line_count
 
+def report_progress(line_num, total_lines, start_time, last_progress_time, recent_lines,
+                    total_processed, total_errors):
+    """Print a progress line and return the time it was printed"""
+    current_time = time.time()
+    elapsed = current_time - start_time
+    progress_elapsed = current_time - last_progress_time
+
+    # Calculate rates
+    overall_rate = line_num / elapsed if elapsed > 0 else 0
+    recent_rate = recent_lines / progress_elapsed if progress_elapsed > 0 else 0
+
+    # Calculate ETA
+    remaining_lines = total_lines - line_num
+    eta_seconds = remaining_lines / overall_rate if overall_rate > 0 else 0
+    eta_minutes = eta_seconds / 60
+
+    record_ingest_rate(overall_rate)
+
+    # Progress percentage
+    progress_pct = (line_num / total_lines) * 100 if total_lines else 100.0
+
+    print(f"Progress: {line_num:,}/{total_lines:,} ({progress_pct:.1f}%) | "
+          f"Rate: {overall_rate:.1f}/sec (recent: {recent_rate:.1f}/sec) | "
+          f"Processed: {total_processed:,} | Errors: {total_errors:,} | "
+          f"ETA: {eta_minutes:.1f}min")
+    return current_time
+
+def report_error(total_errors, message, suppressed="  ... (suppressing further detailed errors)"):
+    """Count an error, printing one of the first 10, then a single suppression notice"""
+    record_ingest_rows(errors=1)
+    if total_errors <= 10:  # Only show first 10 detailed errors
+        print(f"  ERROR: {message}")
+    elif total_errors == 11:
+        print(suppressed)
+
+def print_summary(start_time, total_lines, total_processed, total_errors):
+    """Print the final processing summary"""
+    total_time = time.time() - start_time
+    print("\n" + "=" * 50)
+    print(f"Processing complete!")
+    print(f"Total time: {total_time:.1f} seconds ({total_time/60:.1f} minutes)")
+    print(f"Average rate: {total_lines/total_time:.1f} lines/second")
+    print(f"Lines processed: {total_lines:,}")
+    print(f"Records successfully processed: {total_processed:,}")
+    print(f"Errors encountered: {total_errors:,}")
+
+    if total_errors > 0:
+        error_rate = (total_errors / total_lines) * 100
+        print(f"Error rate: {error_rate:.2f}%")
+
 def process_file(file_path, app):
     total_processed = 0
     total_errors = 0
-    
+
     # Get total line count for progress tracking
     total_lines = get_file_line_count(file_path)
-    
+
     # Progress tracking variables
     start_time = time.time()
     last_progress_time = start_time
     progress_interval = 1000  # Show progress every 1000 lines
-    
+
     print(f"\nStarting to process {total_lines:,} lines...")
     print("=" * 50)
 
     try:
         with open(file_path, 'r') as f:
             next(f)  # Skip header
-            
+
             for line_num, line in enumerate(f, 1):
                 line = line.strip()
                 if not line:
                     continue
-                
+
                 # Show progress every N lines
                 if line_num % progress_interval == 0:
-                    current_time = time.time()
-                    elapsed = current_time - start_time
-                    progress_elapsed = current_time - last_progress_time
-                    
-                    # Calculate rates
-                    overall_rate = line_num / elapsed if elapsed > 0 else 0
-                    recent_rate = progress_interval / progress_elapsed if progress_elapsed > 0 else 0
-                    
-                    # Calculate ETA
-                    remaining_lines = total_lines - line_num
-                    eta_seconds = remaining_lines / overall_rate if overall_rate > 0 else 0
-                    eta_minutes = eta_seconds / 60
-                    
-                    # Progress percentage
-                    progress_pct = (line_num / total_lines) * 100
-                    
-                    print(f"Progress: {line_num:,}/{total_lines:,} ({progress_pct:.1f}%) | "
-                          f"Rate: {overall_rate:.1f}/sec (recent: {recent_rate:.1f}/sec) | "
-                          f"Processed: {total_processed:,} | Errors: {total_errors:,} | "
-                          f"ETA: {eta_minutes:.1f}min")
-                    
-                    last_progress_time = current_time
-                
-                fields = line.split('|')
-                if len(fields) != 25:
+                    last_progress_time = report_progress(
+                        line_num, total_lines, start_time, last_progress_time,
+                        progress_interval, total_processed, total_errors
+                    )
+
+                try:
+                    record = parse_line(line)
+                except FieldCountError as e:
+                    total_errors += 1
+                    report_error(total_errors, f"Line {line_num} - {str(e)}",
+                                 "  ... (suppressing further field count errors)")
+                    continue
+                except ValueError as e:
                     total_errors += 1
-                    if total_errors <= 10:  # Only show first 10 errors to avoid spam
-                        print(f"  ERROR: Line {line_num} - Invalid field count: {len(fields)} fields")
-                    elif total_errors == 11:
-                        print("  ... (suppressing further field count errors)")
+                    report_error(total_errors, f"Line {line_num} - {str(e)}")
                     continue
 
                 try:
-                    # Extract and validate critical fields
-                    vin, year_str, make, model, trim = fields[0:5]
-                    dealer_info = fields[5:10]  # name, street, city, state, zip
-                    price_str, mileage_str = fields[10:12]
-                    used_str, certified_str = fields[12:14]
-                    style, driven_wheels, engine, fuel_type = fields[14:18]
-                    ext_color, int_color = fields[18:20]
-                    website, first_seen, last_seen, vdp_last_seen, status = fields[20:25]
-
-                    # Check required fields
-                    if not (vin and year_str and first_seen and last_seen):
-                        raise ValueError("Missing required field(s)")
-
-                    # Convert types
-                    year = int(year_str)
-                    price = float(price_str) if price_str else None
-                    mileage = int(mileage_str) if mileage_str else None
-                    used = used_str == 'TRUE'
-                    certified = certified_str == 'TRUE'
-
-                    # Handle empty strings
-                    trim = trim or None
-                    style = style or None
-                    driven_wheels = driven_wheels or None
-                    engine = engine or None
-                    fuel_type = fuel_type or None
-                    ext_color = ext_color or None
-                    int_color = int_color or None
-                    vdp_last_seen = vdp_last_seen or None
-                    status = status or None
+                    dealer_info = record['dealer']
 
                     with app.app_context():
                         # Create or get dealer
                         dealer = Dealer.query.filter_by(
-                            name=dealer_info[0],
-                            street=dealer_info[1],
-                            city=dealer_info[2],
-                            state=dealer_info[3],
-                            zip=dealer_info[4]
+                            natural_key=Dealer.natural_key_for(*dealer_info)
                         ).first()
-                        
+
                         if not dealer:
                             dealer = Dealer(
                                 name=dealer_info[0],
@@ -149,131 +159,321 @@ def process_file(file_path, app):
 
                         # Create or get vehicle model
                         vehicle = Vehicle.query.filter_by(
-                            make=make,
-                            model=model
+                            make=record['make'],
+                            model=record['model']
                         ).first()
-                        
+
                         if not vehicle:
                             vehicle = Vehicle(
-                                make=make,
-                                model=model
+                                make=record['make'],
+                                model=record['model']
                             )
                             db.session.add(vehicle)
                             db.session.flush()  # Get model_id
+                            invalidate_vehicle_index()
 
                         # Create or update website
-                        if website:
+                        if record['website']:
                             dealer_website = DealerWebsite.query.get(dealer.dealer_id)
                             if dealer_website:
-                                dealer_website.url = website
+                                dealer_website.url = record['website']
                             else:
                                 dealer_website = DealerWebsite(
                                     dealer_id=dealer.dealer_id,
-                                    url=website
+                                    url=record['website']
                                 )
                                 db.session.add(dealer_website)
 
                         # Create or update listing
-                        listing = Listing.query.get(vin)
+                        listing = Listing.query.get(record['vin'])
+                        regression = RegressionStatsDelta()
+                        prefixes = VinPrefixDelta()
                         if listing:
-                            # Update existing listing
-                            listing.year = year
-                            listing.model_id = vehicle.model_id
-                            listing.trim = trim
-                            listing.dealer_id = dealer.dealer_id
-                            listing.price = price
-                            listing.mileage = mileage
-                            listing.used = used
-                            listing.certified = certified
-                            listing.style = style
-                            listing.driven_wheels = driven_wheels
-                            listing.engine = engine
-                            listing.fuel_type = fuel_type
-                            listing.exterior_color = ext_color
-                            listing.interior_color = int_color
-                            listing.first_seen = datetime.strptime(first_seen, '%Y-%m-%d').date()
-                            listing.last_seen = datetime.strptime(last_seen, '%Y-%m-%d').date()
-                            listing.vdp_last_seen = datetime.strptime(vdp_last_seen, '%Y-%m-%d').date() if vdp_last_seen else None
-                            listing.status = status
+                            old_values = (listing.year, listing.model_id, listing.mileage, listing.price)
+                            old_vehicle = (listing.year, listing.model_id)
                         else:
-                            # Create new listing
-                            listing = Listing(
-                                vin=vin,
-                                year=year,
-                                model_id=vehicle.model_id,
-                                trim=trim,
-                                dealer_id=dealer.dealer_id,
-                                price=price,
-                                mileage=mileage,
-                                used=used,
-                                certified=certified,
-                                style=style,
-                                driven_wheels=driven_wheels,
-                                engine=engine,
-                                fuel_type=fuel_type,
-                                exterior_color=ext_color,
-                                interior_color=int_color,
-                                first_seen=datetime.strptime(first_seen, '%Y-%m-%d').date(),
-                                last_seen=datetime.strptime(last_seen, '%Y-%m-%d').date(),
-                                vdp_last_seen=datetime.strptime(vdp_last_seen, '%Y-%m-%d').date() if vdp_last_seen else None,
-                                status=status
-                            )
+                            old_values = None
+                            old_vehicle = None
+                            listing = Listing(vin=record['vin'])
                             db.session.add(listing)
+                        row = listing_row(record, vehicle.model_id, dealer.dealer_id)
+                        for column, value in row.items():
+                            setattr(listing, column, value)
+                        regression.replace(old_values, regression_values(row))
+                        prefixes.replace(record['vin'], old_vehicle, vehicle_values(row))
+                        prefixes.apply()
+                        invalidate_stored_predictions(regression.apply())
 
-                        db.session.commit()
+                        with timed_ingest_phase('commit'):
+                            db.session.commit()
                         total_processed += 1
+                        record_ingest_rows(1)
 
                 except Exception as e:
                     db.session.rollback()
                     total_errors += 1
-                    if total_errors <= 10:  # Only show first 10 detailed errors
-                        print(f"  ERROR: Line {line_num} - {str(e)}")
-                    elif total_errors == 11:
-                        print("  ... (suppressing further detailed errors)")
+                    report_error(total_errors, f"Line {line_num} - {str(e)}")
 
     except Exception as e:
         print(f"File error: {e}")
         sys.exit(1)
-    
-    # Final summary
-    total_time = time.time() - start_time
-    print("\n" + "=" * 50)
-    print(f"Processing complete!")
-    print(f"Total time: {total_time:.1f} seconds ({total_time/60:.1f} minutes)")
-    print(f"Average rate: {total_lines/total_time:.1f} lines/second")
-    print(f"Lines processed: {total_lines:,}")
-    print(f"Records successfully processed: {total_processed:,}")
-    print(f"Errors encountered: {total_errors:,}")
-    
-    if total_errors > 0:
-        error_rate = (total_errors / total_lines) * 100
-        print(f"Error rate: {error_rate:.2f}%")
 
+    print_summary(start_time, total_lines, total_processed, total_errors)
     return total_processed, total_errors
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python populate_database.py <file_path>")
+def print_write_stats(stats):
+    """Print how many listings were rewritten, touched or left alone"""
+    print(f"Listings upserted: {stats['upserted']:,}")
+    print(f"Listings with only last_seen updated: {stats['touched']:,}")
+    print(f"Listings unchanged: {stats['unchanged']:,}")
+
+def write_records(records, dimensions, stats):
+    """
+    Write a chunk of parsed records in one transaction. If the chunk fails,
+    fall back to one transaction per record so a single bad row only costs itself.
+    Args:
+        records: List of (line number, parsed record) pairs
+        dimensions: DimensionCache used to resolve model and dealer ids
+        stats: Counter of upserted, touched and unchanged listings
+    Returns:
+        Tuple of (records written, list of (line number, error) pairs)
+    """
+    try:
+        chunk_stats = Counter()
+        with timed_ingest_phase('write'):
+            written = write_chunk([record for _, record in records], dimensions, chunk_stats)
+        with timed_ingest_phase('commit'):
+            db.session.commit()
+        stats.update(chunk_stats)
+        record_ingest_rows(written)
+        return written, []
+    except Exception:
+        db.session.rollback()
+
+    written = 0
+    errors = []
+    with timed_ingest_phase('record_fallback'):
+        for line_num, record in records:
+            try:
+                record_stats = Counter()
+                written += write_chunk([record], dimensions, record_stats)
+                db.session.commit()
+                stats.update(record_stats)
+            except Exception as e:
+                db.session.rollback()
+                errors.append((line_num, e))
+    record_ingest_rows(written)
+    return written, errors
+
+def process_file_batched(file_path, app, chunk_size=1000, resume=False):
+    """
+    Process the feed in chunks, writing each chunk with multi-row upserts
+    and a single commit. The byte offset is checkpointed after every commit.
+    Args:
+        file_path: Path to the feed file
+        app: Flask application used for the database session
+        chunk_size: Number of lines per chunk
+        resume: Continue from the last checkpoint if there is one
+    Returns:
+        Tuple of (records processed, errors)
+    """
+    total_processed = 0
+    total_errors = 0
+    stats = Counter()
+
+    total_lines = get_file_line_count(file_path)
+
+    dimensions = DimensionCache()
+    with app.app_context():
+        dimensions.load()
+
+    checkpoint = Checkpoint(file_path)
+    start_offset, line_num = checkpoint.load() if resume else (0, 0)
+    if line_num:
+        print(f"Resuming after line {line_num:,} (byte {start_offset:,})")
+
+    start_time = time.time()
+    last_progress_time = start_time
+
+    print(f"\nStarting to process {total_lines:,} lines in chunks of {chunk_size:,}...")
+    print("=" * 50)
+
+    try:
+        for chunk, end_offset in read_chunks_with_offsets(file_path, chunk_size, start_offset):
+            records = []
+            with timed_ingest_phase('parse'):
+                for offset, line in enumerate(chunk, line_num + 1):
+                    if not line:
+                        continue
+                    try:
+                        records.append((offset, parse_line(line)))
+                    except ValueError as e:
+                        total_errors += 1
+                        report_error(total_errors, f"Line {offset} - {str(e)}")
+            line_num += len(chunk)
+
+            with app.app_context():
+                written, errors = write_records(records, dimensions, stats)
+            total_processed += written
+            for error_line, e in errors:
+                total_errors += 1
+                report_error(total_errors, f"Line {error_line} - {str(e)}")
+            checkpoint.save(end_offset, line_num)
+
+            last_progress_time = report_progress(
+                line_num, total_lines, start_time, last_progress_time,
+                len(chunk), total_processed, total_errors
+            )
+
+    except Exception as e:
+        print(f"File error: {e}")
         sys.exit(1)
 
-    file_path = sys.argv[1]
-    
+    checkpoint.clear()
+    print_summary(start_time, total_lines, total_processed, total_errors)
+    print_write_stats(stats)
+    return total_processed, total_errors
+
+def process_file_parallel(file_path, app, workers, chunk_size=1000, resume=False):
+    """
+    Parse newline-aligned byte ranges of the feed in worker processes and
+    write the results from this process, in file order, with batched upserts.
+    A single writer keeps dealer and vehicle ids deterministic.
+    Args:
+        file_path: Path to the feed file
+        app: Flask application used for the database session
+        workers: Number of parser processes
+        chunk_size: Number of records per write batch
+        resume: Continue from the last checkpoint if there is one
+    Returns:
+        Tuple of (records processed, errors)
+    """
+    total_processed = 0
+    total_errors = 0
+    stats = Counter()
+
+    checkpoint = Checkpoint(file_path)
+    start_offset, line_num = checkpoint.load() if resume else (0, 0)
+    if line_num:
+        print(f"Resuming after line {line_num:,} (byte {start_offset:,})")
+
+    file_size = os.path.getsize(file_path)
+    ranges = split_byte_ranges(file_path, start_offset=start_offset)
+
+    dimensions = DimensionCache()
+    with app.app_context():
+        dimensions.load()
+
+    start_time = time.time()
+    last_progress_time = start_time
+    resumed_lines = line_num
+    bytes_done = 0
+
+    print(f"\nStarting to process {len(ranges):,} byte ranges with {workers} workers...")
+    print("=" * 50)
+
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            tasks = [(file_path, start, end) for start, end in ranges]
+            for (_, _, end), (line_count, records, parse_errors, byte_count) in zip(
+                tasks, pool.imap(parse_range, tasks)
+            ):
+                for error_line, message in parse_errors:
+                    total_errors += 1
+                    report_error(total_errors, f"Line {line_num + error_line} - {message}")
+
+                records = [(line_num + offset, record) for offset, record in records]
+                with app.app_context():
+                    for i in range(0, len(records), chunk_size):
+                        written, errors = write_records(records[i:i + chunk_size], dimensions, stats)
+                        total_processed += written
+                        for error_line, e in errors:
+                            total_errors += 1
+                            report_error(total_errors, f"Line {error_line} - {str(e)}")
+
+                line_num += line_count
+                bytes_done += byte_count
+                checkpoint.save(end, line_num)
+
+                # The line count is estimated from bytes so the file is never read twice
+                remaining_bytes = file_size - start_offset - bytes_done
+                estimated_lines = line_num + int((line_num - resumed_lines) * remaining_bytes / bytes_done)
+                last_progress_time = report_progress(
+                    line_num, max(estimated_lines, line_num), start_time, last_progress_time,
+                    line_count, total_processed, total_errors
+                )
+
+    except Exception as e:
+        print(f"File error: {e}")
+        sys.exit(1)
+
+    checkpoint.clear()
+    print_summary(start_time, line_num, total_processed, total_errors)
+    print_write_stats(stats)
+    return total_processed, total_errors
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Populate the database from a pipe-delimited listings feed")
+    parser.add_argument("file_path", help="Path to the feed file")
+    parser.add_argument("--batch", action="store_true",
+                        help="Write each chunk with multi-row upserts and one commit")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Lines per chunk in batch mode (default: 1000)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parser processes; more than 1 implies batch mode (default: 1)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume a batch or parallel run from its last checkpoint")
+    parser.add_argument("--materialize", action="store_true",
+                        help="Precompute predictions for every year and model after loading")
+    parser.add_argument("--metrics-file",
+                        help="Write ingest metrics in the Prometheus text format to this file "
+                             "every 15 seconds and at the end, e.g. for the node_exporter textfile collector")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    file_path = args.file_path
+
     if not os.path.exists(file_path):
         print(f"Error: File '{file_path}' not found")
         sys.exit(1)
-    
+
     file_size = os.path.getsize(file_path)
     print(f"Processing file: {file_path}")
     print(f"File size: {file_size:,} bytes ({file_size/(1024*1024):.1f} MB)")
-    
+
     app = create_app()
-    
-    with app.app_context():
-        db.create_all()  # This will create tables if they don't exist
-        print("Tables created/verified")
-        
-        total_processed, total_errors = process_file(file_path, app)
-        print(f"\nFinal Summary: {total_processed:,} records processed, {total_errors:,} errors")
+
+    metrics_writer = None
+    if args.metrics_file:
+        metrics_writer = TextfileWriter(metrics, args.metrics_file)
+        metrics_writer.start()
+
+    # process_file* exit the process on fatal errors; the final metrics
+    # matter most for a failed run, so they are written either way
+    try:
+        with app.app_context():
+            db.create_all()  # This will create tables if they don't exist
+            print("Tables created/verified")
+
+            if args.workers > 1:
+                total_processed, total_errors = process_file_parallel(
+                    file_path, app, args.workers, args.chunk_size, args.resume
+                )
+            elif args.batch:
+                total_processed, total_errors = process_file_batched(
+                    file_path, app, args.chunk_size, args.resume
+                )
+            else:
+                total_processed, total_errors = process_file(file_path, app)
+            print(f"\nFinal Summary: {total_processed:,} records processed, {total_errors:,} errors")
+
+            if args.materialize:
+                materialize_predictions()
+    finally:
+        if metrics_writer is not None:
+            metrics_writer.stop()
+            print(f"Metrics written to {args.metrics_file}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,296 @@
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, inspect, text
+
+from models import db, Dealer, Vehicle, Listing, DealerWebsite
+from scripts.bulk_writer import LISTING_COLUMNS
+from scripts.feed_parser import FEED_FIELDS
+from scripts.materialize_predictions import materialize_predictions
+from scripts.populate_database import create_app
+from services import invalidate_vehicle_index, rebuild_regression_stats, rebuild_vin_prefixes
+
+STAGING_TABLE = 'listings_staging'
+
+# Model column that defines the type of each feed field in the staging table
+FIELD_SOURCES = {
+    'make': Vehicle.__table__.c.make,
+    'model': Vehicle.__table__.c.model,
+    'dealer_name': Dealer.__table__.c.name,
+    'dealer_street': Dealer.__table__.c.street,
+    'dealer_city': Dealer.__table__.c.city,
+    'dealer_state': Dealer.__table__.c.state,
+    'dealer_zip': Dealer.__table__.c.zip,
+    'website': DealerWebsite.__table__.c.url,
+}
+
+BOOLEAN_FIELDS = ('used', 'certified')
+
+# Dealer and vehicle fields are kept verbatim so empty strings match the row-by-row loader
+VERBATIM_FIELDS = ('make', 'model', 'dealer_name', 'dealer_street', 'dealer_city',
+                   'dealer_state', 'dealer_zip')
+
+
+def build_staging_table(metadata: MetaData) -> Table:
+    """
+    Define the staging table: one nullable column per feed field, typed like
+    the model column it is loaded into, plus the file line order and the
+    dealer natural key.
+    """
+    columns = [Column('line_no', BigInteger, primary_key=True, autoincrement=True)]
+    for field in FEED_FIELDS:
+        source = FIELD_SOURCES.get(field, Listing.__table__.c.get(field))
+        columns.append(Column(field, source.type, nullable=True))
+    columns.append(Column('dealer_key', String(40), nullable=True))
+    return Table(STAGING_TABLE, metadata, *columns)
+
+
+def load_data_sql(file_path: str):
+    """Build the LOAD DATA LOCAL INFILE statement for the feed file."""
+    assignments = []
+    for field in FEED_FIELDS:
+        if field in BOOLEAN_FIELDS:
+            assignments.append(f"{field} = (@{field} = 'TRUE')")
+        elif field in VERBATIM_FIELDS:
+            assignments.append(f"{field} = @{field}")
+        elif field == FEED_FIELDS[-1]:
+            # Tolerate CRLF line endings
+            assignments.append(f"{field} = NULLIF(TRIM(TRAILING '\\r' FROM @{field}), '')")
+        else:
+            assignments.append(f"{field} = NULLIF(@{field}, '')")
+    # Must match Dealer.natural_key_for
+    assignments.append(
+        "dealer_key = SHA1(LOWER(CONCAT_WS('|', @dealer_name, IFNULL(@dealer_street, ''), "
+        "@dealer_city, @dealer_state, @dealer_zip)))"
+    )
+    variables = ', '.join(f"@{field}" for field in FEED_FIELDS)
+    sql = (
+        f"LOAD DATA LOCAL INFILE :file_path INTO TABLE {STAGING_TABLE} "
+        f"FIELDS TERMINATED BY '|' LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+        f"({variables}) SET {', '.join(assignments)}"
+    )
+    return text(sql).bindparams(file_path=os.path.abspath(file_path))
+
+
+# Latest line per VIN among the rows that have every required field
+VALID_ROWS = (
+    f"SELECT MAX(line_no) AS line_no FROM {STAGING_TABLE} "
+    "WHERE vin IS NOT NULL AND year IS NOT NULL "
+    "AND first_seen IS NOT NULL AND last_seen IS NOT NULL "
+    "GROUP BY vin"
+)
+
+# Vehicles, dealers and websites only come from the lines merge_listings_sql
+# keeps, so rejected and superseded lines leave no orphan rows behind
+RESOLVE_VEHICLES = (
+    "INSERT INTO vehicles (make, model) "
+    f"SELECT DISTINCT s.make, s.model FROM {STAGING_TABLE} s "
+    f"JOIN ({VALID_ROWS}) latest USING (line_no) "
+    "LEFT JOIN vehicles v ON v.make = s.make AND v.model = s.model "
+    "WHERE v.model_id IS NULL"
+)
+
+RESOLVE_DEALERS = (
+    "INSERT INTO dealers (name, street, city, state, zip, natural_key) "
+    "SELECT MIN(s.dealer_name), MIN(s.dealer_street), MIN(s.dealer_city), "
+    "MIN(s.dealer_state), MIN(s.dealer_zip), s.dealer_key "
+    f"FROM {STAGING_TABLE} s "
+    f"JOIN ({VALID_ROWS}) latest USING (line_no) "
+    "LEFT JOIN dealers d ON d.natural_key = s.dealer_key "
+    "WHERE d.dealer_id IS NULL "
+    "GROUP BY s.dealer_key"
+)
+
+# The website of each dealer's last kept line that has one
+MERGE_WEBSITES = (
+    "INSERT INTO dealer_websites (dealer_id, url) "
+    "SELECT d.dealer_id, s.website "
+    f"FROM {STAGING_TABLE} s "
+    f"JOIN (SELECT MAX(w.line_no) AS line_no FROM {STAGING_TABLE} w "
+    f"JOIN ({VALID_ROWS}) latest USING (line_no) "
+    "WHERE w.website IS NOT NULL GROUP BY w.dealer_key) latest_website USING (line_no) "
+    "JOIN dealers d ON d.natural_key = s.dealer_key "
+    "ON DUPLICATE KEY UPDATE url = VALUES(url)"
+)
+
+
+def merge_listings_sql(target: str, upsert: bool) -> str:
+    """
+    Build the statement that copies the latest valid staging row per VIN into
+    the target table. content_hash is left NULL so the next incremental run
+    re-hashes these listings.
+    """
+    expressions = {'model_id': 'v.model_id', 'dealer_id': 'd.dealer_id'}
+    columns = ('vin',) + LISTING_COLUMNS
+    select_list = ', '.join(expressions.get(column, f"s.{column}") for column in columns)
+    sql = (
+        f"INSERT INTO {target} ({', '.join(columns)}) "
+        f"SELECT {select_list} FROM {STAGING_TABLE} s "
+        f"JOIN ({VALID_ROWS}) latest USING (line_no) "
+        "JOIN vehicles v ON v.make = s.make AND v.model = s.model "
+        "JOIN dealers d ON d.natural_key = s.dealer_key"
+    )
+    if upsert:
+        updates = ', '.join(f"{column} = VALUES({column})" for column in LISTING_COLUMNS)
+        sql += f" ON DUPLICATE KEY UPDATE {updates}, content_hash = NULL"
+    return sql
+
+
+def foreign_key_rename_sql(foreign_key: dict, table: str, built_as: str):
+    """
+    Build the statement that renames a foreign key a swapped-in table kept
+    from the name it was built under.
+    
+    Args:
+        foreign_key: Foreign key as reflected by the SQLAlchemy inspector
+        table: Name the table was swapped in as
+        built_as: Name the table was created under
+        
+    Returns:
+        ALTER TABLE statement, or None if the name does not carry built_as
+    """
+    name = foreign_key['name']
+    if not name or not name.startswith(f"{built_as}_"):
+        return None
+    columns = ', '.join(foreign_key['constrained_columns'])
+    referred = ', '.join(foreign_key['referred_columns'])
+    sql = (
+        f"ALTER TABLE {table} DROP FOREIGN KEY {name}, "
+        f"ADD CONSTRAINT {table}{name[len(built_as):]} FOREIGN KEY ({columns}) "
+        f"REFERENCES {foreign_key['referred_table']} ({referred})"
+    )
+    ondelete = foreign_key.get('options', {}).get('ondelete')
+    if ondelete:
+        sql += f" ON DELETE {ondelete}"
+    return sql
+
+
+def rename_swapped_foreign_keys(connection, table: str, built_as: str) -> None:
+    """
+    Rename the foreign keys of a table swapped in with RENAME TABLE. Its
+    foreign keys were created as <built_as>_ibfk_N, and any RENAME TABLE left
+    under that name would make the next swap fail to create them again.
+    Checks are off while they are re-added, since the rows were just built
+    from the tables they reference, so the change does not scan the table.
+    """
+    statements = [
+        sql for sql in (
+            foreign_key_rename_sql(foreign_key, table, built_as)
+            for foreign_key in inspect(connection).get_foreign_keys(table)
+        ) if sql
+    ]
+    if not statements:
+        return
+    connection.execute(text("SET foreign_key_checks = 0"))
+    try:
+        for sql in statements:
+            connection.execute(text(sql))
+    finally:
+        connection.execute(text("SET foreign_key_checks = 1"))
+
+
+def run_step(connection, label: str, statement) -> int:
+    """Execute one loader step, printing its row count and duration."""
+    step_start = time.time()
+    result = connection.execute(text(statement) if isinstance(statement, str) else statement)
+    print(f"{label}: {result.rowcount:,} rows ({time.time() - step_start:.1f}s)")
+    return result.rowcount
+
+
+def load_file(file_path: str, swap: bool = False, keep_staging: bool = False) -> None:
+    """
+    Bulk load a feed file through the staging table.
+    Args:
+        file_path: Path to the feed file
+        swap: Build a fresh listings table and swap it in atomically instead of
+            merging into the existing one
+        keep_staging: Leave the staging table in place for inspection
+    """
+    start_time = time.time()
+    metadata = MetaData()
+    staging = build_staging_table(metadata)
+
+    staging.drop(db.engine, checkfirst=True)
+    staging.create(db.engine)
+
+    with db.engine.begin() as connection:
+        loaded = run_step(connection, "Loaded into staging", load_data_sql(file_path))
+        valid = connection.execute(text(f"SELECT COUNT(*) FROM ({VALID_ROWS}) valid_rows")).scalar()
+        if run_step(connection, "New vehicles", RESOLVE_VEHICLES):
+            invalidate_vehicle_index()
+        run_step(connection, "New dealers", RESOLVE_DEALERS)
+        run_step(connection, "Dealer websites", MERGE_WEBSITES)
+
+    if swap:
+        # The referenced tables are copied too so the foreign keys resolve
+        Vehicle.__table__.to_metadata(metadata)
+        Dealer.__table__.to_metadata(metadata)
+        new_table = Listing.__table__.to_metadata(metadata, name='listings_new')
+        new_table.drop(db.engine, checkfirst=True)
+        new_table.create(db.engine)
+        with db.engine.begin() as connection:
+            run_step(connection, "Listings built", merge_listings_sql('listings_new', upsert=False))
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "RENAME TABLE listings TO listings_old, listings_new TO listings"
+            ))
+            connection.execute(text("DROP TABLE listings_old"))
+            rename_swapped_foreign_keys(connection, 'listings', 'listings_new')
+        print("Swapped in new listings table")
+    else:
+        with db.engine.begin() as connection:
+            run_step(connection, "Listings merged", merge_listings_sql('listings', upsert=True))
+
+    with db.engine.begin() as connection:
+        rebuild_regression_stats(connection)
+        rebuild_vin_prefixes(connection)
+        connection.execute(text("DELETE FROM predictions"))
+        print("Rebuilt regression_stats and vin_prefixes, and cleared cached predictions")
+
+    if not keep_staging:
+        staging.drop(db.engine)
+
+    total_time = time.time() - start_time
+    print("\n" + "=" * 50)
+    print(f"Load complete in {total_time:.1f} seconds ({total_time/60:.1f} minutes)")
+    print(f"Lines loaded: {loaded:,}")
+    print(f"Distinct valid VINs: {valid:,}")
+    print(f"Rejected lines (missing required fields or duplicate VINs): {loaded - valid:,}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bulk load a pipe-delimited listings feed with LOAD DATA LOCAL INFILE"
+    )
+    parser.add_argument("file_path", help="Path to the feed file")
+    parser.add_argument("--swap", action="store_true",
+                        help="Rebuild listings in a new table and swap it in atomically")
+    parser.add_argument("--keep-staging", action="store_true",
+                        help=f"Keep the {STAGING_TABLE} table after loading")
+    parser.add_argument("--materialize", action="store_true",
+                        help="Precompute predictions for every year and model after loading")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    if not os.path.exists(args.file_path):
+        print(f"Error: File '{args.file_path}' not found")
+        sys.exit(1)
+
+    app = create_app(engine_options={'connect_args': {'allow_local_infile': True}})
+
+    with app.app_context():
+        db.create_all()
+        load_file(args.file_path, swap=args.swap, keep_staging=args.keep_staging)
+
+        if args.materialize:
+            materialize_predictions()
+
+
+if __name__ == "__main__":
+    main()
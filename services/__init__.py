@@ -0,0 +1,118 @@
+from .lru_cache import LRUCache
+from .single_flight import AsyncSingleFlight, SingleFlight
+from .advisory_lock import advisory_locks, async_advisory_locks, prediction_lock_names
+from .prediction_cache import (
+    init_prediction_cache,
+    invalidate_predictions,
+    invalidate_stored_predictions,
+    model_id_cache,
+    prediction_cache,
+    prediction_flight,
+)
+from .usage_tracker import UsageTracker, init_usage_tracker, usage_tracker
+from .regression_stats import (
+    RegressionStatsDelta,
+    archived_sums,
+    fit_groups,
+    group_sums,
+    history_groups,
+    rebuild_regression_stats,
+    with_history,
+)
+from .vin_prefixes import VinPrefixDelta, decode_vin, rebuild_vin_prefixes
+from .metrics import MetricsRegistry, TextfileWriter, metrics
+from .instrumentation import (
+    attach_sql_metrics,
+    init_instrumentation,
+    record_ingest_rate,
+    record_ingest_rows,
+    record_prediction_lookups,
+    record_request,
+    timed_ingest_phase,
+    timed_phase,
+)
+from .query_diagnostics import (
+    QueryBudgetExceeded,
+    attach_query_diagnostics,
+    init_query_diagnostics,
+    query_budget,
+    statement_shape,
+)
+from .price_lookup import (
+    PredictionFit,
+    PriceModelLookup,
+    cached_model_ids,
+    model_ids_query,
+    remember_model_ids,
+    stored_price_models,
+)
+from .listing_snapshot import (
+    ListingSnapshot,
+    init_listing_snapshot,
+    listing_snapshot,
+    write_snapshot,
+)
+from .vehicle_index import (
+    VehicleIndex,
+    init_vehicle_index,
+    invalidate_vehicle_index,
+    vehicle_index_cache,
+)
+
+__all__ = [
+    'LRUCache',
+    'AsyncSingleFlight',
+    'SingleFlight',
+    'advisory_locks',
+    'async_advisory_locks',
+    'prediction_lock_names',
+    'init_prediction_cache',
+    'invalidate_predictions',
+    'invalidate_stored_predictions',
+    'model_id_cache',
+    'prediction_cache',
+    'prediction_flight',
+    'RegressionStatsDelta',
+    'archived_sums',
+    'fit_groups',
+    'group_sums',
+    'history_groups',
+    'rebuild_regression_stats',
+    'with_history',
+    'UsageTracker',
+    'init_usage_tracker',
+    'usage_tracker',
+    'VinPrefixDelta',
+    'decode_vin',
+    'rebuild_vin_prefixes',
+    'MetricsRegistry',
+    'TextfileWriter',
+    'metrics',
+    'attach_sql_metrics',
+    'init_instrumentation',
+    'record_ingest_rate',
+    'record_ingest_rows',
+    'record_prediction_lookups',
+    'record_request',
+    'timed_ingest_phase',
+    'timed_phase',
+    'QueryBudgetExceeded',
+    'attach_query_diagnostics',
+    'init_query_diagnostics',
+    'query_budget',
+    'statement_shape',
+    'PredictionFit',
+    'PriceModelLookup',
+    'cached_model_ids',
+    'model_ids_query',
+    'remember_model_ids',
+    'stored_price_models',
+    'ListingSnapshot',
+    'init_listing_snapshot',
+    'listing_snapshot',
+    'write_snapshot',
+    'VehicleIndex',
+    'init_vehicle_index',
+    'invalidate_vehicle_index',
+    'vehicle_index_cache',
+]
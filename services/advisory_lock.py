@@ -0,0 +1,83 @@
+from contextlib import asynccontextmanager, contextmanager
+
+from sqlalchemy import text
+
+LOCK_PREFIX = 'vinaudit'
+
+
+def prediction_lock_names(keys, slots: int = 16) -> list:
+    """
+    MySQL lock names guarding the fits of (year, model_id) groups. Groups are
+    locked by model_id, and model_ids share one of a fixed number of slots,
+    so however large a batch, a request takes at most that many locks and
+    waits at most that many lock timeouts. Sorted so every process takes them
+    in the same order.
+    
+    Args:
+        keys: (year, model_id) groups
+        slots: Number of distinct lock names; every process must use the same
+        
+    Returns:
+        List of lock names
+    """
+    return sorted({f"{LOCK_PREFIX}:prediction:{model_id % slots}" for _, model_id in keys})
+
+
+def _lock_sql(function: str, names, timeout=None):
+    calls = ', '.join(
+        f"{function}(:name_{i}{', :timeout' if timeout is not None else ''})"
+        for i in range(len(names))
+    )
+    params = {f"name_{i}": name for i, name in enumerate(names)}
+    if timeout is not None:
+        params['timeout'] = timeout
+    return text(f"SELECT {calls}"), params
+
+
+@contextmanager
+def advisory_locks(engine, names, timeout: float = 10):
+    """
+    Hold MySQL named locks (GET_LOCK) for the duration of the block, so only
+    one process at a time does the work they guard. The locks are taken on a
+    dedicated connection, in one round trip and in the given order, and are
+    released on exit. Names whose lock timed out are not held; the block
+    still runs, so callers must tolerate the rare overlap. On databases
+    without named locks this only runs the block.
+    
+    Args:
+        engine: Engine to take a connection from
+        names: Lock names, at most 64 characters each
+        timeout: Seconds to wait for each lock
+        
+    Yields:
+        Set of names that were acquired
+    """
+    names = list(names)
+    if not names or engine.dialect.name != 'mysql':
+        yield set(names)
+        return
+    with engine.connect() as connection:
+        statement, params = _lock_sql('GET_LOCK', names, timeout)
+        acquired = connection.execute(statement, params).one()
+        try:
+            yield {name for name, ok in zip(names, acquired) if ok == 1}
+        finally:
+            statement, params = _lock_sql('RELEASE_LOCK', names)
+            connection.execute(statement, params)
+
+
+@asynccontextmanager
+async def async_advisory_locks(engine, names, timeout: float = 10):
+    """advisory_locks for an AsyncEngine."""
+    names = list(names)
+    if not names or engine.dialect.name != 'mysql':
+        yield set(names)
+        return
+    async with engine.connect() as connection:
+        statement, params = _lock_sql('GET_LOCK', names, timeout)
+        acquired = (await connection.execute(statement, params)).one()
+        try:
+            yield {name for name, ok in zip(names, acquired) if ok == 1}
+        finally:
+            statement, params = _lock_sql('RELEASE_LOCK', names)
+            await connection.execute(statement, params)
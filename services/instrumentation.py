@@ -0,0 +1,226 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from flask import Flask, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from db import pool_metrics
+from models import db
+from .metrics import Counter, Gauge, metrics
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+http_request_duration = metrics.histogram(
+    'vinaudit_http_request_duration_seconds', 'Request latency by route', ('route', 'method'), REQUEST_BUCKETS
+)
+http_requests = metrics.counter(
+    'vinaudit_http_requests_total', 'Requests by route and status', ('route', 'method', 'status')
+)
+request_sql_queries = metrics.histogram(
+    'vinaudit_request_sql_queries', 'SQL statements executed per request', ('route',), QUERY_COUNT_BUCKETS
+)
+request_sql_seconds = metrics.histogram(
+    'vinaudit_request_sql_seconds', 'Time spent in SQL per request', ('route',), REQUEST_BUCKETS
+)
+sql_statement_seconds = metrics.histogram(
+    'vinaudit_sql_statement_seconds', 'Latency of individual SQL statements'
+)
+phase_seconds = metrics.histogram(
+    'vinaudit_phase_seconds', 'Time spent in instrumented phases such as fit, render and usage flush',
+    ('phase',)
+)
+prediction_lookups = metrics.counter(
+    'vinaudit_prediction_lookups_total',
+    'Price model lookups by source: snapshot, cache hit, or cache miss', ('result',)
+)
+ingest_rows = metrics.counter('vinaudit_ingest_rows_total', 'Feed records written by ingest')
+ingest_errors = metrics.counter('vinaudit_ingest_errors_total', 'Feed lines rejected by ingest')
+ingest_rows_per_second = metrics.gauge(
+    'vinaudit_ingest_rows_per_second', 'Overall ingest rate of the current run'
+)
+ingest_phase_seconds = metrics.counter(
+    'vinaudit_ingest_phase_seconds_total', 'Time spent in each ingest phase', ('phase',)
+)
+ingest_commit_seconds = metrics.histogram(
+    'vinaudit_ingest_commit_seconds', 'Latency of ingest batch commits'
+)
+
+
+class RequestStats:
+    """What one request spent its time on, collected while it runs."""
+    
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.phases: Dict[str, float] = {}
+        self.lookups: Dict[str, int] = {}
+    
+    def server_timing(self, total: float) -> str:
+        """Format the breakdown as a Server-Timing header, in milliseconds."""
+        entries = [f'sql;dur={self.sql_seconds * 1000:.1f};desc="{self.sql_count} queries"']
+        entries.extend(f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in self.phases.items())
+        if self.lookups:
+            summary = ' '.join(f'{result}={count}' for result, count in sorted(self.lookups.items()))
+            entries.append(f'prediction;desc="{summary}"')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def record_request(route: str, method: str, status: int, seconds: float) -> None:
+    """Record one request in the per-route latency histogram and status counter."""
+    http_request_duration.observe(seconds, route=route, method=method)
+    http_requests.inc(route=route, method=method, status=str(status))
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Return the stats of the request being handled, or None outside a request."""
+    if not has_request_context():
+        return None
+    return g.get('_request_stats')
+
+
+@contextmanager
+def timed_phase(name: str):
+    """Time a block into vinaudit_phase_seconds and the current request's breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        phase_seconds.observe(elapsed, phase=name)
+        stats = current_request_stats()
+        if stats is not None:
+            stats.phases[name] = stats.phases.get(name, 0.0) + elapsed
+
+
+def record_prediction_lookups(result: str, count: int = 1) -> None:
+    """Count price model lookups answered by the snapshot ('snapshot'), the cache ('hit'), or neither ('miss')."""
+    if not count:
+        return
+    prediction_lookups.inc(count, result=result)
+    stats = current_request_stats()
+    if stats is not None:
+        stats.lookups[result] = stats.lookups.get(result, 0) + count
+
+
+@contextmanager
+def timed_ingest_phase(name: str):
+    """Time an ingest phase; commits are also recorded in the commit latency histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        ingest_phase_seconds.inc(elapsed, phase=name)
+        if name == 'commit':
+            ingest_commit_seconds.observe(elapsed)
+
+
+def record_ingest_rows(written: int = 0, errors: int = 0) -> None:
+    """Count records written and lines rejected by ingest."""
+    if written:
+        ingest_rows.inc(written)
+    if errors:
+        ingest_errors.inc(errors)
+
+
+def record_ingest_rate(rows_per_second: float) -> None:
+    """Publish the overall rate of the ingest run in progress."""
+    ingest_rows_per_second.set(rows_per_second)
+
+
+def attach_sql_metrics(engine) -> None:
+    """Time every statement an engine executes, attributing it to the current request if any."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info['_query_started'].pop()
+    sql_statement_seconds.observe(elapsed)
+    stats = current_request_stats()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+
+
+def _handle_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('_query_started'):
+        context.connection.info['_query_started'].pop()
+
+
+# snapshot() key -> (metric name, type, help)
+POOL_METRICS = {
+    'checkouts': ('vinaudit_db_pool_checkouts_total', Counter, 'Connections checked out of the pool'),
+    'connects': ('vinaudit_db_pool_connects_total', Counter, 'New database connections opened'),
+    'invalidations': ('vinaudit_db_pool_invalidations_total', Counter, 'Pooled connections invalidated'),
+    'timeouts': ('vinaudit_db_pool_timeouts_total', Counter, 'Checkouts that timed out waiting for a connection'),
+    'wait_seconds_total': ('vinaudit_db_pool_wait_seconds_total', Counter, 'Time spent waiting for a connection'),
+    'wait_seconds_max': ('vinaudit_db_pool_wait_seconds_max', Gauge, 'Longest wait for a connection'),
+    'size': ('vinaudit_db_pool_size', Gauge, 'Configured pool size'),
+    'checked_out': ('vinaudit_db_pool_checked_out', Gauge, 'Connections currently checked out'),
+    'checked_in': ('vinaudit_db_pool_checked_in', Gauge, 'Idle connections in the pool'),
+    'overflow': ('vinaudit_db_pool_overflow', Gauge, 'Connections open beyond the pool size'),
+}
+
+
+def collect_pool_metrics() -> list:
+    """Read the connection pool metrics at scrape time."""
+    snapshot = pool_metrics.snapshot(db.engine if has_app_context() else None)
+    collected = []
+    for key, value in snapshot.items():
+        name, metric_type, documentation = POOL_METRICS[key]
+        metric = metric_type(name, documentation)
+        if metric_type is Counter:
+            metric.inc(value)
+        else:
+            metric.set(value)
+        collected.append(metric)
+    return collected
+
+
+metrics.add_collector(collect_pool_metrics)
+
+
+def init_instrumentation(app: Flask) -> None:
+    """
+    Record per-request latency, SQL statement count and time, and the
+    instrumented phases. Each response carries the breakdown in a
+    Server-Timing header, and requests slower than REQUEST_SLOW_LOG_SECONDS
+    are logged with it.
+    
+    Args:
+        app: Flask application instance; its database engine must be set up
+    """
+    slow_seconds = app.config.get('REQUEST_SLOW_LOG_SECONDS', 1.0)
+    with app.app_context():
+        attach_sql_metrics(db.engine)
+    
+    @app.before_request
+    def start_request_stats():
+        g._request_stats = RequestStats()
+    
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started_at
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        record_request(route, request.method, response.status_code, total)
+        request_sql_queries.observe(stats.sql_count, route=route)
+        request_sql_seconds.observe(stats.sql_seconds, route=route)
+        timing = stats.server_timing(total)
+        response.headers['Server-Timing'] = timing
+        if slow_seconds and total >= slow_seconds:
+            app.logger.warning(f"Slow request {request.method} {request.path}: {timing}")
+        return response
@@ -0,0 +1,295 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from flask import Flask
+
+from models import PriceModel
+from .regression_stats import fit_groups
+
+# File in the snapshot root naming the live version directory
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+# Column arrays, sorted by (model_id, year)
+COLUMNS = {
+    'year': np.int16,
+    'model_id': np.int16,
+    'mileage': np.int32,
+    'price': np.float64,
+}
+
+
+def write_snapshot(directory: str, year, model_id, mileage, price, vehicles, keep: int = 2) -> str:
+    """
+    Write a new snapshot version and make it the live one. Rows are sorted by
+    (model_id, year) so each group is one contiguous slice, located through
+    offsets: group i spans rows offsets[i] to offsets[i + 1]. The version is
+    built in a temporary directory and published by atomically replacing
+    CURRENT, so readers never see a partial snapshot.
+    
+    Args:
+        directory: Snapshot root directory
+        year: Model year per listing
+        model_id: Vehicle id per listing
+        mileage: Mileage per listing
+        price: Price per listing
+        vehicles: Iterable of (model_id, make, model)
+        keep: Number of versions to keep, including the new one
+    
+    Returns:
+        Name of the new version
+    """
+    columns = {
+        'year': np.asarray(year, dtype=COLUMNS['year']),
+        'model_id': np.asarray(model_id, dtype=COLUMNS['model_id']),
+        'mileage': np.asarray(mileage, dtype=COLUMNS['mileage']),
+        'price': np.asarray(price, dtype=COLUMNS['price']),
+    }
+    order = np.lexsort((columns['year'], columns['model_id']))
+    columns = {name: values[order] for name, values in columns.items()}
+    
+    # A new group starts wherever model_id or year changes
+    boundaries = np.flatnonzero(
+        (np.diff(columns['model_id']) != 0) | (np.diff(columns['year']) != 0)
+    ) + 1
+    starts = np.concatenate(([0], boundaries)) if len(order) else np.empty(0, dtype=np.int64)
+    offsets = np.append(starts, len(order)).astype(np.int64)
+    
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    os.makedirs(directory, exist_ok=True)
+    staging = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(staging)
+    for name, values in columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+    np.save(os.path.join(staging, 'group_model_id.npy'), columns['model_id'][starts])
+    np.save(os.path.join(staging, 'group_year.npy'), columns['year'][starts])
+    np.save(os.path.join(staging, 'offsets.npy'), offsets)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': version,
+        'rows': int(len(order)),
+        'groups': int(len(starts)),
+        'vehicles': [[int(vehicle_id), make, model] for vehicle_id, make, model in vehicles],
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    os.rename(staging, os.path.join(directory, version))
+    
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+    
+    # Processes still mapping a removed version keep reading it until they reload
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if not name.startswith('.') and os.path.isdir(os.path.join(directory, name))
+    )
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return version
+
+
+def current_version(directory: str) -> Optional[str]:
+    """Return the name of the live version, or None if nothing has been exported."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class ListingSnapshot:
+    """
+    Read-only view of one snapshot version. The column arrays are memory
+    mapped, so opening is cheap, only the pages of the groups actually used
+    are read, and every worker process on the host shares them through the
+    page cache. Fits are kept per group for the life of the snapshot.
+    """
+    
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {manifest['format']} in {path}")
+        self.path = path
+        self.version = manifest['version']
+        self.rows = manifest['rows']
+        self.mileage = np.load(os.path.join(path, 'mileage.npy'), mmap_mode='r')
+        self.price = np.load(os.path.join(path, 'price.npy'), mmap_mode='r')
+        
+        offsets = np.load(os.path.join(path, 'offsets.npy'))
+        group_keys = zip(
+            np.load(os.path.join(path, 'group_year.npy')).tolist(),
+            np.load(os.path.join(path, 'group_model_id.npy')).tolist(),
+        )
+        self._groups = {
+            key: (int(start), int(stop))
+            for key, start, stop in zip(group_keys, offsets[:-1], offsets[1:])
+        }
+        # Matched case-insensitively, like MySQL
+        self._model_ids = {
+            (make.lower(), model.lower()): model_id
+            for model_id, make, model in manifest['vehicles']
+        }
+        self._fits = {}
+    
+    def model_id(self, make: str, model: str) -> Optional[int]:
+        """Resolve a make and model to its model_id, or None if it was not exported."""
+        return self._model_ids.get((make.lower(), model.lower()))
+    
+    def group(self, year: int, model_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Return the (mileage, price) arrays of a group, as views into the
+        mapped files, or None if the group has no listings in the snapshot.
+        """
+        span = self._groups.get((year, model_id))
+        if span is None:
+            return None
+        start, stop = span
+        return self.mileage[start:stop], self.price[start:stop]
+    
+    def price_model(self, year: int, model_id: int) -> Optional[PriceModel]:
+        """
+        Fit the price line of a group, the same way as RegressionStat.fit.
+        
+        Returns:
+            PriceModel with no prediction_id, or None if the group is missing
+            or has fewer than two listings
+        """
+        key = (year, model_id)
+        if key in self._fits:
+            return self._fits[key]
+        group = self.group(year, model_id)
+        price_model = None
+        if group is not None and len(group[0]) >= 2:
+            x = group[0].astype(np.float64)
+            y = np.asarray(group[1])
+            sums = np.array([[len(x)], [x.sum()], [y.sum()], [x @ y], [x @ x], [y @ y]])
+            slope, intercept, r_squared = (float(values[0]) for values in fit_groups(sums))
+            price_model = PriceModel(
+                prediction_id=None,
+                slope=slope,
+                intercept=intercept,
+                mean_mileage=float(x.mean()),
+                min_mileage=int(x.min()),
+                max_mileage=int(x.max()),
+                confidence_score=r_squared,
+                sample_size=len(x),
+            )
+        self._fits[key] = price_model
+        return price_model
+    
+    def price_models(self, keys) -> Dict[Tuple[int, int], PriceModel]:
+        """Fit many (year, model_id) groups, leaving out those the snapshot cannot answer."""
+        price_models = {}
+        for year, model_id in keys:
+            price_model = self.price_model(year, model_id)
+            if price_model is not None:
+                price_models[(year, model_id)] = price_model
+        return price_models
+    
+    def summary(self, year: int, model_id: int) -> Optional[dict]:
+        """
+        Summarize the prices and mileage of a group.
+        
+        Returns:
+            Dictionary of listing count, price mean, min, quartiles and max,
+            and mean mileage, or None if the group is missing
+        """
+        group = self.group(year, model_id)
+        if group is None:
+            return None
+        mileage, price = group
+        p25, p50, p75 = np.percentile(price, [25, 50, 75])
+        return {
+            'listings': len(price),
+            'mean_price': float(price.mean()),
+            'min_price': float(price.min()),
+            'p25_price': float(p25),
+            'median_price': float(p50),
+            'p75_price': float(p75),
+            'max_price': float(price.max()),
+            'mean_mileage': float(mileage.mean()),
+        }
+    
+    def __len__(self) -> int:
+        return len(self._groups)
+
+
+class ListingSnapshotEngine:
+    """
+    Holds the live ListingSnapshot. The CURRENT pointer is re-read at most
+    once per check interval, and a new version is mapped when it changes.
+    If a version cannot be opened, the previous one stays live and the
+    error is kept in last_error. Disabled until a directory is configured.
+    """
+    
+    def __init__(self, check_interval: float = 30.0):
+        self.directory = None
+        self.check_interval = check_interval
+        self.last_error = None
+        self._snapshot = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+    
+    def configure(self, directory: Optional[str], check_interval: float) -> None:
+        """Point the engine at a snapshot root directory; None disables it."""
+        self.directory = directory or None
+        self.check_interval = check_interval
+        self.last_error = None
+        self._snapshot = None
+        self._checked_at = float('-inf')
+    
+    def current(self) -> Optional[ListingSnapshot]:
+        """Return the live snapshot, or None if none is configured or exported."""
+        if self.directory is None:
+            return None
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                version = current_version(self.directory)
+                if version is None:
+                    self._snapshot = None
+                elif self._snapshot is None or self._snapshot.version != version:
+                    try:
+                        self._snapshot = ListingSnapshot(os.path.join(self.directory, version))
+                        self.last_error = None
+                    except (OSError, ValueError, KeyError) as e:
+                        self.last_error = e
+                self._checked_at = time.monotonic()
+            return self._snapshot
+
+
+listing_snapshot = ListingSnapshotEngine()
+
+
+def init_listing_snapshot(app: Flask) -> None:
+    """
+    Configure the listing snapshot and map it at startup. Without a
+    snapshot, estimates are served from the database alone.
+    
+    Args:
+        app: Flask application instance
+    """
+    listing_snapshot.configure(
+        app.config.get('LISTING_SNAPSHOT_DIR'),
+        app.config.get('LISTING_SNAPSHOT_CHECK_INTERVAL', 30.0),
+    )
+    if listing_snapshot.directory is None:
+        return
+    snapshot = listing_snapshot.current()
+    if listing_snapshot.last_error is not None:
+        app.logger.warning(f"Listing snapshot not loaded: {listing_snapshot.last_error}")
+    elif snapshot is None:
+        app.logger.warning(f"No listing snapshot in {listing_snapshot.directory}; estimating from the database")
+    else:
+        app.logger.info(f"Listing snapshot {snapshot.version}: {snapshot.rows:,} listings in {len(snapshot):,} groups")
@@ -0,0 +1,73 @@
+from flask import Flask
+from sqlalchemy import delete, tuple_
+
+from models import db, Prediction
+from .lru_cache import LRUCache
+from .single_flight import SingleFlight
+
+# (year, model_id) -> PriceModel
+prediction_cache = LRUCache(max_size=10000, ttl=300.0)
+
+# (make, model) -> model_id
+model_id_cache = LRUCache(max_size=10000, ttl=3600.0)
+
+# Coalesces concurrent fits of the same (year, model_id)
+prediction_flight = SingleFlight()
+
+
+def init_prediction_cache(app: Flask) -> None:
+    """
+    Size the in-process caches from the application config.
+    
+    Args:
+        app: Flask application instance
+    """
+    prediction_cache.configure(
+        app.config.get('PREDICTION_CACHE_SIZE', 10000),
+        app.config.get('PREDICTION_CACHE_TTL', 300.0),
+    )
+    model_id_cache.configure(
+        app.config.get('MODEL_ID_CACHE_SIZE', 10000),
+        app.config.get('MODEL_ID_CACHE_TTL', 3600.0),
+    )
+
+
+def invalidate_predictions(groups=None) -> int:
+    """
+    Invalidation hook for ingest: drop cached predictions for the given
+    (year, model_id) groups, or all of them. This only reaches the calling
+    process's cache. Web workers learn of fits replaced or deleted by ingest,
+    materialize_predictions or archive_listings, which run in their own
+    processes, only when their entries expire, so PREDICTION_CACHE_TTL
+    bounds how long they serve the old fit.
+    
+    Args:
+        groups: Iterable of (year, model_id) pairs; everything when omitted
+        
+    Returns:
+        Number of entries dropped
+    """
+    if groups is None:
+        model_id_cache.invalidate()
+        return prediction_cache.invalidate()
+    groups = set(groups)
+    return prediction_cache.invalidate(lambda key: key in groups)
+
+
+def invalidate_stored_predictions(groups) -> None:
+    """
+    Delete the predictions rows for (year, model_id) groups whose listings
+    changed, and drop them from this process's cache. Other processes keep
+    their cached fits until PREDICTION_CACHE_TTL expires them. Runs in the
+    caller's transaction.
+    
+    Args:
+        groups: Iterable of (year, model_id) pairs
+    """
+    groups = list(groups)
+    if not groups:
+        return
+    db.session.execute(
+        delete(Prediction).where(tuple_(Prediction.year, Prediction.model_id).in_(groups))
+    )
+    invalidate_predictions(groups)
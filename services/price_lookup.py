@@ -0,0 +1,273 @@
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from db import upsert
+from models import Prediction, PriceModel, RegressionStat, Vehicle
+from .instrumentation import record_prediction_lookups, timed_phase
+from .listing_snapshot import listing_snapshot
+from .prediction_cache import model_id_cache, prediction_cache
+from .regression_stats import archived_sums, history_groups, with_history
+from .usage_tracker import usage_tracker
+
+# Columns a fit sets; the rest take their defaults
+FITTED_COLUMNS = (
+    'year', 'model_id', 'slope', 'intercept', 'mean_mileage', 'min_mileage', 'max_mileage',
+    'predicted_price', 'confidence_score', 'sample_size',
+)
+
+
+def cached_model_ids(vehicles, snapshot=None) -> Tuple[Dict[Tuple[str, str], int], list]:
+    """
+    Resolve (make, model) pairs through the in-process cache and the listing
+    snapshot.
+    
+    Returns:
+        Tuple of (dictionary mapping each resolved pair to its model_id, list
+        of the pairs that have to be looked up with model_ids_query)
+    """
+    model_ids = {}
+    missing = []
+    for key in vehicles:
+        model_id = model_id_cache.get(key)
+        if model_id is None and snapshot is not None:
+            model_id = snapshot.model_id(*key)
+        if model_id is None:
+            missing.append(key)
+        else:
+            model_ids[key] = model_id
+    return model_ids, missing
+
+
+def model_ids_query(vehicles):
+    """Select the make, model and model_id of the vehicles rows for (make, model) pairs."""
+    return select(Vehicle.make, Vehicle.model, Vehicle.model_id).where(
+        tuple_(Vehicle.make, Vehicle.model).in_(list(vehicles))
+    )
+
+
+def remember_model_ids(vehicles, rows) -> Dict[Tuple[str, str], int]:
+    """
+    Map the rows selected by model_ids_query back to the requested pairs and
+    cache them.
+    
+    Returns:
+        Dictionary mapping each requested pair that has a row to its model_id
+    """
+    # MySQL compares case-insensitively, so match the rows back the same way
+    requested = defaultdict(list)
+    for make, model in vehicles:
+        requested[(make.lower(), model.lower())].append((make, model))
+    model_ids = {}
+    for make, model, model_id in rows:
+        for key in requested[(make.lower(), model.lower())]:
+            model_id_cache.put(key, model_id)
+            model_ids[key] = model_id
+    return model_ids
+
+
+def stored_price_models(predictions) -> Dict[Tuple[int, int], PriceModel]:
+    """
+    Key stored predictions by (year, model_id), recording their usage in the
+    write-behind usage tracker.
+    """
+    price_models = {}
+    for prediction in predictions:
+        usage_tracker.touch(prediction.id)
+        price_models[(prediction.year, prediction.model_id)] = prediction.price_model()
+    return price_models
+
+
+class PriceModelLookup:
+    """
+    The steps of looking up fitted price lines for many vehicles, shared by
+    the sync and asyncio controllers. Vehicles the listing snapshot or the
+    in-process caches answer are settled on construction; for the rest the
+    caller runs the statements built here, in whatever way its transport
+    allows, and hands the rows back. Each statement covers every pending
+    vehicle, so the lookup is at most two queries plus the fit.
+    """
+    
+    def __init__(self, vehicles, min_listings: int = 0):
+        """
+        Args:
+            vehicles: Iterable of (year, make, model) tuples
+            min_listings: ESTIMATE_HISTORY_MIN_LISTINGS; snapshot fits of
+                smaller groups are ignored so they are fitted with their history
+        """
+        self.vehicles = set(vehicles)
+        snapshot = listing_snapshot.current()
+        self.model_ids, self._unresolved = cached_model_ids(
+            {(make, model) for _, make, model in self.vehicles}, snapshot
+        )
+        keys = {
+            (year, self.model_ids[(make, model)])
+            for year, make, model in self.vehicles
+            if (make, model) in self.model_ids
+        }
+        
+        self.price_models = snapshot.price_models(keys) if snapshot is not None else {}
+        if min_listings:
+            # The snapshot only holds the hot table; rare groups are fitted with their history
+            self.price_models = {
+                key: price_model for key, price_model in self.price_models.items()
+                if price_model.sample_size >= min_listings
+            }
+        snapshot_hits = len(self.price_models)
+        for key in keys - self.price_models.keys():
+            price_model = prediction_cache.get(key)
+            if price_model is not None:
+                usage_tracker.touch(price_model.prediction_id)
+                self.price_models[key] = price_model
+        
+        self.pending = {
+            (year, make, model) for year, make, model in self.vehicles
+            if (year, self.model_ids.get((make, model))) not in self.price_models
+        }
+        self._cached = set(self.price_models)
+        record_prediction_lookups('snapshot', snapshot_hits)
+        record_prediction_lookups('hit', len(self.price_models) - snapshot_hits)
+        record_prediction_lookups('miss', len(self.pending))
+    
+    def model_ids_query(self):
+        """Select the model_ids missing from the caches, or None if there are none."""
+        return model_ids_query(self._unresolved) if self._unresolved else None
+    
+    def add_model_ids(self, rows) -> None:
+        """Record the rows selected by model_ids_query."""
+        self.model_ids.update(remember_model_ids(self._unresolved, rows))
+    
+    def stored_query(self):
+        """
+        Select the stored predictions of the pending vehicles. It joins
+        vehicles, so it does not have to wait for model_ids_query.
+        """
+        return (
+            select(Prediction)
+            .join(Vehicle, Prediction.model_id == Vehicle.model_id)
+            .where(tuple_(Prediction.year, Vehicle.make, Vehicle.model).in_(list(self.pending)))
+        )
+    
+    def add_stored(self, predictions) -> None:
+        """Record the predictions selected by stored_query."""
+        self.price_models.update(stored_price_models(predictions))
+    
+    @property
+    def unfitted(self) -> set:
+        """(year, model_id) groups that are known but have no price model yet."""
+        return {
+            (year, self.model_ids[(make, model)])
+            for year, make, model in self.pending
+            if (make, model) in self.model_ids
+        } - self.price_models.keys()
+    
+    def add_fitted(self, price_models) -> None:
+        """Record price models fitted for unfitted groups."""
+        self.price_models.update(price_models)
+    
+    def results(self) -> Dict[Tuple[int, str, str], Optional[PriceModel]]:
+        """
+        Cache the price models found outside the in-process cache and map
+        them back to the vehicles.
+        
+        Returns:
+            Dictionary mapping each (year, make, model) to its PriceModel, or to
+            None if the vehicle is unknown or there is not enough data
+        """
+        for key in self.price_models.keys() - self._cached:
+            prediction_cache.put(key, self.price_models[key])
+        return {
+            (year, make, model): self.price_models.get((year, self.model_ids.get((make, model))))
+            for year, make, model in self.vehicles
+        }
+
+
+class PredictionFit:
+    """
+    The steps of fitting and storing predictions for (year, model_id) groups,
+    shared by the sync and asyncio controllers. The caller holds the advisory
+    locks, runs the statements built here and the fit itself, and hands the
+    results back.
+    """
+    
+    def __init__(self, keys, min_listings: int = 0):
+        """
+        Args:
+            keys: (year, model_id) groups to fit
+            min_listings: ESTIMATE_HISTORY_MIN_LISTINGS; smaller groups also
+                count their archived listings
+        """
+        self.keys = set(keys)
+        self.min_listings = min_listings
+        self.price_models = {}
+    
+    @property
+    def unfitted(self) -> set:
+        """Groups that have no price model yet."""
+        return self.keys - self.price_models.keys()
+    
+    def stored_query(self):
+        """Select the stored predictions of the unfitted groups."""
+        return select(Prediction).where(tuple_(Prediction.year, Prediction.model_id).in_(list(self.unfitted)))
+    
+    def add_stored(self, predictions) -> None:
+        """Record the predictions selected by stored_query."""
+        self.price_models.update(stored_price_models(predictions))
+    
+    def stats_query(self):
+        """Select the regression sums of the unfitted groups."""
+        return select(RegressionStat).where(
+            tuple_(RegressionStat.year, RegressionStat.model_id).in_(list(self.unfitted))
+        )
+    
+    def history_query(self, stats):
+        """
+        Select the archived sums of the groups too small to fit from the hot
+        table alone.
+        
+        Args:
+            stats: RegressionStat rows selected by stats_query
+            
+        Returns:
+            Statement for archived_sums, or None if no group needs its history
+        """
+        rare = history_groups(stats, self.unfitted, self.min_listings)
+        return archived_sums(rare) if rare else None
+    
+    @staticmethod
+    def fit_predictions(stats, archived=()) -> list:
+        """
+        Fit predictions from regression sums. Touches no database, so the
+        asyncio controller can run it on a worker thread.
+        
+        Args:
+            stats: RegressionStat rows selected by stats_query
+            archived: Rows selected by history_query, if any
+            
+        Returns:
+            List of unsaved Prediction, one per group with enough data
+        """
+        if archived:
+            stats = with_history(stats, archived)
+        with timed_phase('fit'):
+            return [
+                prediction for prediction in map(Prediction.from_stat, stats) if prediction is not None
+            ]
+    
+    def store_query(self, predictions):
+        """
+        Insert fitted predictions in one statement. A group another process
+        stored first keeps its row (ON DUPLICATE KEY UPDATE id = id), so one
+        conflict neither fails nor undoes the others; once committed,
+        stored_query reads back every group, whichever process wrote it.
+        
+        Args:
+            predictions: Predictions returned by fit_predictions
+        """
+        return upsert(
+            Prediction,
+            [{column: getattr(prediction, column) for column in FITTED_COLUMNS} for prediction in predictions],
+            lambda inserted: {'id': Prediction.id},
+            conflict_columns=['year', 'model_id'],
+        )
@@ -0,0 +1,239 @@
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from models import db
+
+MODES = ('off', 'log', 'raise')
+
+# A parenthesised list of placeholders in any DBAPI paramstyle, e.g. an expanded IN list
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements run by this module itself are not recorded
+_active_logs: ContextVar[Tuple['QueryLog', ...]] = ContextVar('query_logs', default=())
+_suspended: ContextVar[bool] = ContextVar('query_logs_suspended', default=False)
+_attached = set()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block or request runs more statements, or repeats one more often, than allowed."""
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Reduce a statement to its shape, so executions that differ only in their
+    parameters, or in the length of an IN or VALUES list, count as one.
+    """
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    return _REPEATED_LIST.sub('(?)', shape)
+
+
+def _caller(root_path: Optional[str]) -> Optional[str]:
+    """Return the innermost application frame (file:line) that led to the statement."""
+    if not root_path:
+        return None
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(root_path) and 'site-packages' not in frame.filename \
+                and not frame.filename.endswith('query_diagnostics.py'):
+            return f"{os.path.relpath(frame.filename, root_path)}:{frame.lineno}"
+    return None
+
+
+class QueryLog:
+    """Statements executed during one request or query_budget block."""
+    
+    def __init__(self, slow_seconds: float = 0.0, root_path: Optional[str] = None):
+        self.slow_seconds = slow_seconds
+        self.root_path = root_path
+        self.count = 0
+        self.shapes = Counter()
+        self.callers: Dict[str, Optional[str]] = {}
+        self.slow: List[Tuple[str, object, float]] = []
+    
+    def record(self, statement: str, parameters, seconds: float, executemany: bool) -> None:
+        self.count += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        # Locating the caller walks the stack, so only do it once a shape repeats
+        if self.shapes[shape] == 2:
+            self.callers[shape] = _caller(self.root_path)
+        if self.slow_seconds and seconds >= self.slow_seconds and not executemany:
+            self.slow.append((statement, parameters, seconds))
+    
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Return (shape, count) for every shape executed more than threshold times."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+    
+    def problems(self, budget: Optional[int], threshold: Optional[int]) -> List[str]:
+        """Describe every budget and repeated-statement violation."""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} statements, budget is {budget}")
+        if threshold:
+            for shape, count in self.repeated(threshold):
+                caller = self.callers.get(shape)
+                where = f" from {caller}" if caller else ""
+                problems.append(f"possible N+1: {count} x{where}: {shape}")
+        return problems
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('_diagnostics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info['_diagnostics_started'].pop()
+    if _suspended.get():
+        return
+    for log in _active_logs.get():
+        log.record(statement, parameters, elapsed, executemany)
+
+
+def _handle_error(context) -> None:
+    if context.connection is not None and context.connection.info.get('_diagnostics_started'):
+        context.connection.info['_diagnostics_started'].pop()
+
+
+def attach_query_diagnostics(engine) -> None:
+    """Record the statements an engine executes into the active query logs. Safe to call repeatedly."""
+    if id(engine) in _attached:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    _attached.add(id(engine))
+
+
+def _push(log: QueryLog):
+    return _active_logs.set(_active_logs.get() + (log,))
+
+
+def _discard(log: QueryLog) -> None:
+    _active_logs.set(tuple(active for active in _active_logs.get() if active is not log))
+
+
+def explain(statement: str, parameters) -> Optional[str]:
+    """
+    Return the plan of a SELECT on the app's engine, or None for other
+    statements. Runs on its own connection and is not recorded.
+    """
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    token = _suspended.set(True)
+    try:
+        with db.engine.connect() as conn:
+            result = conn.exec_driver_sql(prefix + statement, parameters)
+            return '\n'.join(
+                '  ' + ' | '.join(str(value) for value in row) for row in result
+            )
+    except Exception as e:
+        return f"  EXPLAIN failed: {e}"
+    finally:
+        _suspended.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None, engine=None):
+    """
+    Count the statements executed inside the block and raise
+    QueryBudgetExceeded on exit if there were more than max_queries, or if
+    any statement shape ran more than max_repeats times. Meant for tests:
+    
+        with query_budget(max_queries=8, max_repeats=1):
+            client.post('/results', data=form)
+    
+    Args:
+        max_queries: Maximum number of statements, or None for no limit
+        max_repeats: Maximum executions of one statement shape, or None for no limit
+        engine: Engine to watch; defaults to the app's engine
+    
+    Yields:
+        The QueryLog being filled in
+    """
+    attach_query_diagnostics(engine if engine is not None else db.engine)
+    log = QueryLog(root_path=current_app.root_path if has_app_context() else None)
+    _push(log)
+    try:
+        yield log
+    finally:
+        _discard(log)
+    problems = log.problems(max_queries, max_repeats)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+
+def init_query_diagnostics(app: Flask) -> None:
+    """
+    Opt-in diagnostics for development and staging, off unless
+    QUERY_DIAGNOSTICS is 'log' or 'raise'. Every request counts its
+    statements by shape. Shapes executed more than QUERY_N_PLUS_ONE_THRESHOLD
+    times are reported as possible N+1 patterns, along with the line that ran
+    them. Statements slower than QUERY_SLOW_LOG_SECONDS are logged with their
+    parameters and EXPLAIN plan. Requests over their route's entry in
+    QUERY_BUDGETS, or over QUERY_BUDGET, are reported too. In 'raise' mode
+    the report fails the request with QueryBudgetExceeded, so tests using the
+    Flask test client fail on a regression.
+    
+    Args:
+        app: Flask application instance; its database engine must be set up
+    """
+    mode = app.config.get('QUERY_DIAGNOSTICS', 'off')
+    if mode not in MODES:
+        raise ValueError(f"QUERY_DIAGNOSTICS must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == 'off':
+        return
+    
+    threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', 5)
+    slow_seconds = app.config.get('QUERY_SLOW_LOG_SECONDS', 0.1)
+    default_budget = app.config.get('QUERY_BUDGET') or None
+    budgets = app.config.get('QUERY_BUDGETS', {})
+    with app.app_context():
+        attach_query_diagnostics(db.engine)
+    
+    @app.before_request
+    def start_query_log():
+        g._query_log = QueryLog(slow_seconds, app.root_path)
+        _push(g._query_log)
+    
+    @app.after_request
+    def check_query_log(response):
+        log = g.get('_query_log')
+        if log is None:
+            return response
+        _discard(log)
+        
+        for statement, parameters, seconds in log.slow:
+            plan = explain(statement, parameters)
+            current_app.logger.warning(
+                f"Slow query ({seconds * 1000:.1f} ms) in {request.method} {request.path}: "
+                f"{statement}\n  parameters: {parameters!r}" + (f"\n{plan}" if plan else "")
+            )
+        
+        route = request.url_rule.rule if request.url_rule is not None else None
+        problems = log.problems(budgets.get(route, default_budget), threshold)
+        if problems:
+            message = f"Query diagnostics for {request.method} {request.path}: " + '; '.join(problems)
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+        return response
+    
+    @app.teardown_request
+    def stop_query_log(exc):
+        # after_request is skipped when the view raises
+        log = g.pop('_query_log', None)
+        if log is not None:
+            _discard(log)
@@ -0,0 +1,257 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import exists, func, select, text, tuple_
+
+from db import greatest, least, upsert
+from models import db, Listing, ListingArchive, RegressionStat
+
+SUM_COLUMNS = ('n', 'sum_x', 'sum_y', 'sum_xy', 'sum_xx', 'sum_yy')
+
+REBUILD_SQL = (
+    "INSERT INTO regression_stats "
+    "(year, model_id, n, sum_x, sum_y, sum_xy, sum_xx, sum_yy, min_x, max_x) "
+    "SELECT year, model_id, COUNT(*), SUM(mileage), SUM(price), SUM(mileage * price), "
+    "SUM(mileage * mileage), SUM(price * price), MIN(mileage), MAX(mileage) "
+    "FROM listings WHERE price IS NOT NULL AND mileage IS NOT NULL "
+    "GROUP BY year, model_id"
+)
+
+
+class RegressionStatsDelta:
+    """
+    Accumulates changes to the regression sums caused by listings being
+    inserted, updated or removed, and applies them in one statement. The
+    mileage range is only widened: removals cannot shrink it without a rebuild.
+    """
+    
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0, 0.0])
+        self.ranges = defaultdict(lambda: [math.inf, -math.inf])
+    
+    def _apply_row(self, year, model_id, mileage, price, sign: int) -> None:
+        if year is None or model_id is None or mileage is None or price is None:
+            return  # Listings without a price or mileage are not part of the regression
+        x = float(mileage)
+        y = float(price)
+        delta = self.deltas[(year, model_id)]
+        delta[0] += sign
+        delta[1] += sign * x
+        delta[2] += sign * y
+        delta[3] += sign * x * y
+        delta[4] += sign * x * x
+        delta[5] += sign * y * y
+        if sign > 0:
+            mileage_range = self.ranges[(year, model_id)]
+            mileage_range[0] = min(mileage_range[0], x)
+            mileage_range[1] = max(mileage_range[1], x)
+    
+    def add(self, year, model_id, mileage, price) -> None:
+        """Record a listing entering the regression."""
+        self._apply_row(year, model_id, mileage, price, 1)
+    
+    def remove(self, year, model_id, mileage, price) -> None:
+        """Record a listing leaving the regression."""
+        self._apply_row(year, model_id, mileage, price, -1)
+    
+    def replace(self, old, new) -> None:
+        """
+        Record a listing changing from one set of values to another.
+        
+        Args:
+            old: Previous (year, model_id, mileage, price), or None for a new listing
+            new: Current (year, model_id, mileage, price), or None for a removed listing
+        """
+        if old is not None:
+            self.remove(*old)
+        if new is not None:
+            self.add(*new)
+    
+    def apply(self) -> list:
+        """
+        Add the accumulated deltas to regression_stats in the current transaction.
+        
+        Returns:
+            The (year, model_id) groups that changed
+        """
+        rows = []
+        for key, delta in self.deltas.items():
+            if not any(delta):
+                continue
+            min_x, max_x = self.ranges.get(key, (math.inf, -math.inf))
+            rows.append({
+                'year': key[0],
+                'model_id': key[1],
+                **dict(zip(SUM_COLUMNS, delta)),
+                'min_x': min_x if min_x != math.inf else None,
+                'max_x': max_x if max_x != -math.inf else None,
+            })
+        if rows:
+            db.session.execute(upsert(RegressionStat, rows, self._updates))
+        self.deltas.clear()
+        self.ranges.clear()
+        return [(row['year'], row['model_id']) for row in rows]
+    
+    @staticmethod
+    def _updates(inserted) -> dict:
+        updates = {
+            column: getattr(RegressionStat, column) + inserted[column]
+            for column in SUM_COLUMNS
+        }
+        # LEAST/GREATEST return NULL if either side is NULL
+        updates['min_x'] = func.coalesce(
+            least(RegressionStat.min_x, inserted.min_x),
+            RegressionStat.min_x, inserted.min_x,
+        )
+        updates['max_x'] = func.coalesce(
+            greatest(RegressionStat.max_x, inserted.max_x),
+            RegressionStat.max_x, inserted.max_x,
+        )
+        return updates
+
+
+def rebuild_regression_stats(connection=None) -> None:
+    """
+    Recompute every row of regression_stats from listings. Used after
+    set-based loads, and to clear any floating-point drift from increments.
+    
+    Args:
+        connection: Connection to run on; defaults to the session
+    """
+    executor = connection if connection is not None else db.session
+    executor.execute(text("DELETE FROM regression_stats"))
+    executor.execute(text(REBUILD_SQL))
+
+
+def history_groups(stats, keys, min_listings: int) -> set:
+    """
+    Return the (year, model_id) groups with fewer than min_listings listings
+    in the hot table, counting groups without a regression_stats row as empty.
+    
+    Args:
+        stats: RegressionStat rows fetched for keys
+        keys: Requested (year, model_id) groups
+        min_listings: Threshold below which a group also uses archived listings
+    """
+    if not min_listings:
+        return set()
+    counts = {(stat.year, stat.model_id): stat.n for stat in stats}
+    return {key for key in keys if counts.get(key, 0) < min_listings}
+
+
+def archived_sums(keys):
+    """
+    Select the regression sums of archived listings for (year, model_id)
+    groups, labelled like the RegressionStat columns. VINs listed again are
+    left out, since the hot table already counts them.
+    """
+    relisted = exists().where(Listing.vin == ListingArchive.vin)
+    mileage = ListingArchive.mileage
+    price = ListingArchive.price
+    return (
+        select(
+            ListingArchive.year,
+            ListingArchive.model_id,
+            func.count().label('n'),
+            func.sum(mileage).label('sum_x'),
+            func.sum(price).label('sum_y'),
+            func.sum(mileage * price).label('sum_xy'),
+            func.sum(mileage * mileage).label('sum_xx'),
+            func.sum(price * price).label('sum_yy'),
+            func.min(mileage).label('min_x'),
+            func.max(mileage).label('max_x'),
+        )
+        .where(
+            tuple_(ListingArchive.year, ListingArchive.model_id).in_(keys),
+            price.isnot(None),
+            mileage.isnot(None),
+            ~relisted,
+        )
+        .group_by(ListingArchive.year, ListingArchive.model_id)
+    )
+
+
+def with_history(stats, archived) -> list:
+    """
+    Add archived sums to the hot sums of the same groups.
+    
+    Args:
+        stats: RegressionStat rows from the hot table
+        archived: Rows selected by archived_sums
+        
+    Returns:
+        List of RegressionStat, one per group in either input; groups with
+        history are new, unsaved objects so the stored sums are never changed
+    """
+    combined = {(stat.year, stat.model_id): stat for stat in stats}
+    for row in archived:
+        key = (row.year, row.model_id)
+        hot = combined.get(key)
+        sums = {column: float(getattr(row, column)) for column in SUM_COLUMNS}
+        sums['n'] = int(row.n)
+        min_x, max_x = float(row.min_x), float(row.max_x)
+        if hot is not None:
+            sums = {column: sums[column] + getattr(hot, column) for column in SUM_COLUMNS}
+            if hot.min_x is not None:
+                min_x, max_x = min(min_x, hot.min_x), max(max_x, hot.max_x)
+        combined[key] = RegressionStat(year=key[0], model_id=key[1], min_x=min_x, max_x=max_x, **sums)
+    return list(combined.values())
+
+
+def group_sums(keys: np.ndarray, mileage: np.ndarray, price: np.ndarray):
+    """
+    Reduce listings to per-group regression sums with grouped NumPy reductions.
+    
+    Args:
+        keys: Integer group key per listing
+        mileage: Mileage per listing
+        price: Price per listing
+        
+    Returns:
+        Tuple of (unique keys, array of shape (6, groups) holding
+        n, sum_x, sum_y, sum_xy, sum_xx and sum_yy, array of shape (2, groups)
+        holding the minimum and maximum mileage)
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    weights = (np.ones_like(mileage), mileage, price, mileage * price, mileage * mileage, price * price)
+    sums = np.vstack([
+        np.bincount(inverse, weights=w, minlength=len(unique_keys)) for w in weights
+    ])
+    ranges = np.vstack([
+        np.full(len(unique_keys), np.inf),
+        np.full(len(unique_keys), -np.inf),
+    ])
+    np.minimum.at(ranges[0], inverse, mileage)
+    np.maximum.at(ranges[1], inverse, mileage)
+    return unique_keys, sums, ranges
+
+
+def fit_groups(sums: np.ndarray):
+    """
+    Vectorized form of RegressionStat.fit for many groups at once.
+    
+    Args:
+        sums: Array of shape (6, groups) as returned by group_sums
+        
+    Returns:
+        Tuple of (slope, intercept, r_squared) arrays; groups with fewer than
+        two listings get NaN
+    """
+    n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov_xy = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x ** 2 / n
+        var_y = sum_yy - sum_y ** 2 / n
+        
+        slope = np.where(var_x > 0, cov_xy / var_x, 0.0)
+        intercept = (sum_y - slope * sum_x) / n
+        r_squared = np.where(
+            var_y <= 0, 1.0,
+            np.where(var_x <= 0, 0.0, np.minimum(cov_xy ** 2 / (var_x * var_y), 1.0))
+        )
+    too_small = n < 2
+    slope[too_small] = np.nan
+    intercept[too_small] = np.nan
+    r_squared[too_small] = np.nan
+    return slope, intercept, r_squared
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations of the same keys across threads. The
+    first caller for a key computes it; callers arriving while it runs wait
+    for that result instead of computing it again.
+    """
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def do(self, keys, compute) -> dict:
+        """
+        Compute values for keys, sharing in-flight computations.
+        
+        Args:
+            keys: Iterable of hashable keys
+            compute: Called with the list of keys this caller owns; returns a
+                dictionary of key to value, where missing keys mean no value
+                
+        Returns:
+            Dictionary of key to value for every key that has one
+        """
+        with self._lock:
+            owned = []
+            waiting = {}
+            for key in set(keys):
+                if key in self._calls:
+                    waiting[key] = self._calls[key]
+                else:
+                    self._calls[key] = _Call()
+                    owned.append(key)
+        
+        results = {}
+        if owned:
+            error = None
+            computed = {}
+            try:
+                computed = compute(owned)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        call = self._calls.pop(key)
+                        call.result = computed.get(key)
+                        call.error = error
+                        call.done.set()
+            results.update(computed)
+        
+        for key, call in waiting.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if call.result is not None:
+                results[key] = call.result
+        return results
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+    
+    def __init__(self):
+        self._calls = {}
+    
+    async def do(self, keys, compute) -> dict:
+        """
+        Compute values for keys, sharing in-flight computations.
+        
+        Args:
+            keys: Iterable of hashable keys
+            compute: Coroutine function called with the list of keys this
+                caller owns, returning a dictionary of key to value
+                
+        Returns:
+            Dictionary of key to value for every key that has one
+        """
+        loop = asyncio.get_running_loop()
+        owned = []
+        waiting = {}
+        for key in set(keys):
+            if key in self._calls:
+                waiting[key] = self._calls[key]
+            else:
+                self._calls[key] = loop.create_future()
+                owned.append(key)
+        
+        results = {}
+        if owned:
+            try:
+                computed = await compute(owned)
+            except BaseException as e:
+                for key in owned:
+                    future = self._calls.pop(key)
+                    future.set_exception(e)
+                    # Mark retrieved so an unawaited failure is not logged
+                    future.exception()
+                raise
+            for key in owned:
+                self._calls.pop(key).set_result(computed.get(key))
+            results.update(computed)
+        
+        for key, future in waiting.items():
+            result = await asyncio.shield(future)
+            if result is not None:
+                results[key] = result
+        return results
+    
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,128 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import update
+
+from models import db, Prediction
+from .instrumentation import timed_phase
+
+
+class UsageTracker:
+    """
+    Write-behind buffer for predictions.last_used_at. Request handlers record
+    which predictions they served; a background thread writes them all in one
+    UPDATE per flush interval, so cache hits never wait on a row write.
+    Timestamps are therefore accurate to the flush interval.
+    
+    Threads do not survive fork, so the thread is started by the first
+    touch() in each process rather than when the app is created: workers
+    forked from a preloaded app (gunicorn --preload) each start their own.
+    """
+    
+    def __init__(self, flush_interval: float = 30.0):
+        self.flush_interval = flush_interval
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None  # Process the flush thread was started in
+        self._app = None
+        self.flushed = 0
+    
+    def configure(self, app: Flask, flush_interval: float) -> None:
+        """Set the application whose database touch() starts flushing to."""
+        self._app = app
+        self.flush_interval = flush_interval
+    
+    def touch(self, prediction_id: int) -> None:
+        """Record that a prediction was just served."""
+        with self._lock:
+            self._pending.add(prediction_id)
+        if self._pid != os.getpid() and self._app is not None:
+            self.start(self._app)
+    
+    def flush(self) -> int:
+        """
+        Write the buffered usage to the database. Requires an app context.
+        
+        Returns:
+            Number of predictions updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return 0
+        try:
+            with timed_phase('usage_flush'):
+                db.session.execute(
+                    update(Prediction)
+                    .where(Prediction.id.in_(pending))
+                    .values(last_used_at=datetime.utcnow())
+                )
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Keep the ids for the next attempt
+            with self._lock:
+                self._pending |= pending
+            raise
+        self.flushed += len(pending)
+        return len(pending)
+    
+    def start(self, app: Flask) -> None:
+        """
+        Start the background flush thread for an application in this process,
+        with a final flush at exit. Does nothing if this process already has one.
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._app = app
+            # A thread and event inherited through fork belong to the parent
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='prediction-usage-flush', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+    
+    def stop(self) -> None:
+        """Stop this process's background thread after one final flush."""
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._pid = None
+    
+    def _run(self) -> None:
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+            with self._app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    self._app.logger.warning(f"Failed to flush prediction usage: {e}")
+            if stopping:
+                return
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+usage_tracker = UsageTracker()
+
+
+def init_usage_tracker(app: Flask) -> None:
+    """
+    Configure the usage tracker. Its flush thread starts on the first
+    prediction served in each process.
+    
+    Args:
+        app: Flask application instance
+    """
+    usage_tracker.configure(app, app.config.get('PREDICTION_USAGE_FLUSH_INTERVAL', 30.0))
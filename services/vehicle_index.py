@@ -0,0 +1,165 @@
+import bisect
+import hashlib
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Vehicle
+
+
+class VehicleIndex:
+    """
+    Immutable sorted index of vehicle makes and models. Lookups are
+    case-insensitive and answered with binary searches; a changed vehicles
+    table is handled by building a new index, never by mutating this one.
+    """
+    
+    def __init__(self, vehicles, version=None):
+        """
+        Args:
+            vehicles: Iterable of (make, model) pairs
+            version: Stamp of the vehicles table the index was built from
+        """
+        makes = {}
+        for make, model in vehicles:
+            # Makes that differ only in case share the first spelling seen
+            makes.setdefault(make.lower(), (make, set()))[1].add(model)
+        
+        self.version = version
+        self._makes = tuple(sorted(name for name, _ in makes.values()))
+        self._models = {
+            key: tuple(sorted(models, key=str.lower)) for key, (_, models) in makes.items()
+        }
+        
+        # Completion entries keyed by "make model" and by model alone
+        entries = set()
+        for name, models in makes.values():
+            for model in models:
+                entries.add((f"{name} {model}".lower(), name, model))
+                entries.add((model.lower(), name, model))
+        self._entries = tuple(sorted(entries))
+        self._entry_keys = tuple(key for key, _, _ in self._entries)
+        
+        digest = hashlib.sha1()
+        for key, name, model in self._entries:
+            digest.update(f"{name}|{model}\n".encode('utf-8'))
+        self.etag = digest.hexdigest()
+    
+    def makes(self) -> List[str]:
+        """Every make, sorted."""
+        return list(self._makes)
+    
+    def models(self, make: str) -> List[str]:
+        """Models of a make, sorted; empty if the make is unknown."""
+        return list(self._models.get(make.lower(), ()))
+    
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """
+        Find vehicles whose "make model" or model starts with a prefix.
+        
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of matches
+            
+        Returns:
+            List of (make, model) pairs in key order
+        """
+        prefix = prefix.lower()
+        matches = []
+        seen = set()
+        start = bisect.bisect_left(self._entry_keys, prefix)
+        for key, make, model in self._entries[start:]:
+            if not key.startswith(prefix) or len(matches) >= limit:
+                break
+            if (make, model) not in seen:
+                seen.add((make, model))
+                matches.append((make, model))
+        return matches
+    
+    def __len__(self) -> int:
+        return sum(len(models) for models in self._models.values())
+
+
+class VehicleIndexCache:
+    """
+    Holds the current VehicleIndex. Ingest signals a change in-process with
+    invalidate(); other processes are picked up by comparing a cheap stamp of
+    the vehicles table at most once per check interval. Vehicles are only
+    ever inserted, so the row count and highest model_id identify a version.
+    """
+    
+    def __init__(self, check_interval: float = 60.0):
+        self.check_interval = check_interval
+        self._index = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+    
+    def get(self) -> VehicleIndex:
+        """
+        Return the current index, rebuilding it first if it is stale. Requires
+        an app context.
+        """
+        if not self._needs_check():
+            return self._index
+        with self._lock:
+            if self._needs_check():
+                version = tuple(db.session.execute(
+                    select(func.count(), func.max(Vehicle.model_id)).select_from(Vehicle)
+                ).one())
+                if self._stale or self._index.version != version:
+                    self._index = self._build(version)
+                self._checked_at = time.monotonic()
+                self._stale = False
+            return self._index
+    
+    def current(self) -> Optional[VehicleIndex]:
+        """
+        Return the current index without touching the database, or None if it
+        is stale or due for a check. Lets async callers skip a thread hop.
+        """
+        return None if self._needs_check() else self._index
+    
+    def invalidate(self) -> None:
+        """Mark the index stale so the next lookup rebuilds it."""
+        self._stale = True
+    
+    def _needs_check(self) -> bool:
+        return (
+            self._stale
+            or self._index is None
+            or time.monotonic() - self._checked_at >= self.check_interval
+        )
+    
+    def _build(self, version) -> VehicleIndex:
+        rows = db.session.execute(select(Vehicle.make, Vehicle.model))
+        return VehicleIndex(((make, model) for make, model in rows), version)
+
+
+vehicle_index_cache = VehicleIndexCache()
+
+
+def invalidate_vehicle_index() -> None:
+    """Invalidation hook for ingest: rebuild the vehicle index on next use."""
+    vehicle_index_cache.invalidate()
+
+
+def init_vehicle_index(app: Flask) -> None:
+    """
+    Configure the vehicle index and build it at startup. If the database is
+    not reachable yet, the index is built on first use instead.
+    
+    Args:
+        app: Flask application instance
+    """
+    vehicle_index_cache.check_interval = app.config.get('VEHICLE_INDEX_CHECK_INTERVAL', 60.0)
+    with app.app_context():
+        try:
+            vehicle_index_cache.get()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.warning(f"Vehicle index not built at startup: {e}")
@@ -0,0 +1,98 @@
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import select, text
+
+from db import upsert
+from models import db, Vehicle, VinPrefix
+
+# Must match VinPrefix.prefix_for
+PREFIX_SQL = "CONCAT(UPPER(LEFT(vin, 8)), UPPER(SUBSTRING(vin, 10, 1)))"
+
+REBUILD_SQL = (
+    "INSERT INTO vin_prefixes (prefix, year, model_id, listing_count) "
+    f"SELECT {PREFIX_SQL}, year, model_id, COUNT(*) "
+    "FROM listings WHERE CHAR_LENGTH(vin) = 17 "
+    f"GROUP BY {PREFIX_SQL}, year, model_id"
+)
+
+
+class VinPrefixDelta:
+    """
+    Accumulates changes to the per-prefix listing counts caused by listings
+    being inserted, removed or changing year or model, and applies them in one
+    statement.
+    """
+    
+    def __init__(self):
+        self.counts = Counter()
+    
+    def replace(self, vin: str, old, new) -> None:
+        """
+        Record a listing written over its previous version.
+        
+        Args:
+            vin: Listing VIN
+            old: Stored (year, model_id), or None for a new listing
+            new: Written (year, model_id)
+        """
+        prefix = VinPrefix.prefix_for(vin)
+        if prefix is None or old == new:
+            return
+        if old is not None:
+            self.counts[(prefix, *old)] -= 1
+        self.counts[(prefix, *new)] += 1
+    
+    def remove(self, vin: str, year, model_id) -> None:
+        """Record a listing leaving listings."""
+        prefix = VinPrefix.prefix_for(vin)
+        if prefix is not None:
+            self.counts[(prefix, year, model_id)] -= 1
+    
+    def apply(self) -> None:
+        """Add the accumulated counts to vin_prefixes in the current transaction."""
+        rows = [
+            {'prefix': prefix, 'year': year, 'model_id': model_id, 'listing_count': count}
+            for (prefix, year, model_id), count in self.counts.items()
+            if count
+        ]
+        if rows:
+            db.session.execute(upsert(VinPrefix, rows, lambda inserted: {
+                'listing_count': VinPrefix.listing_count + inserted.listing_count
+            }))
+        self.counts.clear()
+
+
+def rebuild_vin_prefixes(connection=None) -> None:
+    """
+    Recompute every row of vin_prefixes from listings. Used after set-based loads.
+    
+    Args:
+        connection: Connection to run on; defaults to the session
+    """
+    executor = connection if connection is not None else db.session
+    executor.execute(text("DELETE FROM vin_prefixes"))
+    executor.execute(text(REBUILD_SQL))
+
+
+def decode_vin(vin: str) -> Optional[tuple]:
+    """
+    Resolve a VIN to the year and model most often listed under its prefix,
+    with a single probe of the vin_prefixes primary key.
+    
+    Args:
+        vin: Vehicle identification number
+        
+    Returns:
+        Row of (year, model_id, make, model), or None if the prefix is unknown
+    """
+    prefix = VinPrefix.prefix_for(vin)
+    if prefix is None:
+        return None
+    return db.session.execute(
+        select(VinPrefix.year, VinPrefix.model_id, Vehicle.make, Vehicle.model)
+        .join(Vehicle, VinPrefix.model_id == Vehicle.model_id)
+        .where(VinPrefix.prefix == prefix, VinPrefix.listing_count > 0)
+        .order_by(VinPrefix.listing_count.desc())
+        .limit(1)
+    ).first()
@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from flask import Flask
+from sqlalchemy import func, select
+
+from benchmarks.generator import generate_feed
+from db import init_database
+from models import db, Listing, Vehicle
+from routes import init_routes
+from scripts.populate_database import process_file_batched
+from services import init_prediction_cache, init_vehicle_index, invalidate_predictions, model_id_cache
+
+FEED_LINES = 2000
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """
+    The web app on the SQLite stand-in the benchmarks use, loaded from a
+    small generated feed through the batched loader.
+    """
+    data_dir = tmp_path_factory.mktemp('data')
+    feed = str(data_dir / 'feed.txt')
+    generate_feed(feed, FEED_LINES)
+
+    # The app's templates live at the repository root
+    app = Flask('app', root_path=ROOT)
+    init_database(app, {'connect_args': {'check_same_thread': False}}, uri=f"sqlite:///{data_dir / 'test.sqlite'}")
+    app.config.update(
+        TESTING=True,
+        # Check the vehicles table on every request, the most a request can cost
+        VEHICLE_INDEX_CHECK_INTERVAL=0,
+        ESTIMATE_BATCH_LIMIT=100,
+    )
+    with app.app_context():
+        db.create_all()
+    with redirect_stdout(io.StringIO()):
+        process_file_batched(feed, app, 500)
+
+    init_prediction_cache(app)
+    init_vehicle_index(app)
+    init_routes(app)
+    yield app
+    invalidate_predictions()
+    model_id_cache.invalidate()
+
+
+@pytest.fixture(scope='session')
+def vehicle(app):
+    """(vin, year, make, model, mileage) of a listing in the largest year and model group."""
+    with app.app_context():
+        year, model_id = db.session.execute(
+            select(Listing.year, Listing.model_id)
+            .where(Listing.price.isnot(None), Listing.mileage.isnot(None))
+            .group_by(Listing.year, Listing.model_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).one()
+        return tuple(db.session.execute(
+            select(Listing.vin, Listing.year, Vehicle.make, Vehicle.model, Listing.mileage)
+            .join(Vehicle, Listing.model_id == Vehicle.model_id)
+            .where(Listing.year == year, Listing.model_id == model_id, Listing.mileage.isnot(None))
+            .limit(1)
+        ).one())
@@ -0,0 +1,59 @@
+import pytest
+
+
+def post_json(client, path, body: str):
+    return client.post(path, data=body, content_type='application/json')
+
+
+@pytest.mark.parametrize('year', ['1e400', '-1e400', '2015.7', '"2015x"', 'true', '[2015]'])
+def test_batch_rejects_a_year_that_is_not_an_integer(app, year):
+    response = post_json(
+        app.test_client(), '/api/v1/estimate/batch',
+        f'{{"vehicles": [{{"year": {year}, "make": "Toyota", "model": "Camry"}}]}}',
+    )
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "vehicles[0]: year must be an integer"
+
+
+@pytest.mark.parametrize('mileage, error', [
+    ('1e400', "mileage must be an integer"),
+    ('42.5', "mileage must be an integer"),
+    ('-1', "mileage must not be negative"),
+])
+def test_estimate_rejects_an_invalid_mileage(app, mileage, error):
+    response = post_json(
+        app.test_client(), '/api/v1/estimate',
+        f'{{"year": 2015, "make": "Toyota", "model": "Camry", "mileage": {mileage}}}',
+    )
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_whole_floats_are_accepted(app, vehicle):
+    _, year, make, model, _ = vehicle
+    response = post_json(
+        app.test_client(), '/api/v1/estimate/batch',
+        f'{{"vehicles": [{{"year": {year}.0, "make": "{make}", "model": "{model}", "mileage": 5e4}}]}}',
+    )
+    assert response.status_code == 200
+    result, = response.get_json()['results']
+    assert (result['year'], result['mileage']) == (year, 50000)
+
+
+@pytest.mark.parametrize('mileage, error', [
+    ('-5', "mileage must not be negative"),
+    ('1e400', "mileage must be an integer"),
+    ('abc', "mileage must be an integer"),
+])
+def test_vin_rejects_an_invalid_mileage(app, vehicle, mileage, error):
+    vin = vehicle[0]
+    response = app.test_client().get(f'/api/v1/vin/{vin}?mileage={mileage}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_vin_estimates_at_a_given_mileage(app, vehicle):
+    vin = vehicle[0]
+    response = app.test_client().get(f'/api/v1/vin/{vin}?mileage=0')
+    assert response.status_code == 200
+    assert response.get_json()['mileage'] == 0
@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine, event, func, select
+
+from db import stream
+from models import Listing
+
+
+def test_stream_reads_every_row_in_batches(app):
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    batches = list(stream(select(Listing.vin), batch_size=100, engine=engine))
+    with engine.connect() as connection:
+        total = connection.scalar(select(func.count()).select_from(Listing))
+    assert all(len(batch) <= 100 for batch in batches)
+    assert sum(map(len, batches)) == total
+    assert engine.pool.checkedout() == 0
+
+
+def test_stopping_a_stream_early_discards_its_connection(app):
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    invalidated = []
+    event.listen(engine, 'invalidate', lambda *args: invalidated.append(args))
+    
+    batches = stream(select(Listing.vin), batch_size=10, engine=engine)
+    assert len(next(batches)) == 10
+    batches.close()
+    
+    assert len(invalidated) == 1
+    assert engine.pool.checkedout() == 0
+    # The pool hands out a fresh connection afterwards
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(Listing)) > 10
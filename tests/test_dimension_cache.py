@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import func, select
+
+from models import db, Dealer, Vehicle
+from scripts.dimension_cache import DimensionCache
+from services import vehicle_index_cache
+
+DEALER = ('Harbor Motors', '1 Pier Rd', 'Monterey', 'CA', '93940')
+
+
+@pytest.fixture(autouse=True)
+def rebuilt_vehicle_index(app):
+    """New vehicles invalidate the index; rebuild it so later budget tests start warm."""
+    yield
+    with app.app_context():
+        vehicle_index_cache.get()
+
+
+def record(make: str, model: str, dealer=DEALER) -> dict:
+    return {'make': make, 'model': model, 'dealer': dealer}
+
+
+def count(table, **filters) -> int:
+    return db.session.scalar(select(func.count()).select_from(table).filter_by(**filters))
+
+
+def test_dealer_key_ignores_case():
+    assert Dealer.natural_key_for(*DEALER) == Dealer.natural_key_for(*(field.upper() for field in DEALER))
+
+
+def test_dealers_differing_only_in_case_share_a_row(app):
+    with app.app_context():
+        dimensions = DimensionCache()
+        records = [record('Citroën', 'C3'), record('Citroën', 'C3', tuple(field.upper() for field in DEALER))]
+        dimensions.resolve(records)
+        assert dimensions.dealer_id(records[0]) == dimensions.dealer_id(records[1])
+        assert count(Dealer, natural_key=Dealer.natural_key_for(*DEALER)) == 1
+
+
+def test_existing_vehicle_resolves_without_a_loaded_cache(app):
+    with app.app_context():
+        DimensionCache().resolve([record('Citroën', 'C4')])
+        stored = db.session.scalar(select(Vehicle.model_id).filter_by(make='Citroën', model='C4'))
+
+        # A fresh cache misses, so the upsert hits the existing row and the
+        # id comes from matching the feed's spelling back to it
+        dimensions = DimensionCache()
+        dimensions.resolve([record('Citroën', 'C4')])
+        assert dimensions.model_id(record('Citroën', 'C4')) == stored
+        assert count(Vehicle, model='C4') == 1
+
+
+def test_every_spelling_in_a_chunk_resolves(app):
+    with app.app_context():
+        dimensions = DimensionCache()
+        dimensions.load()
+        spellings = [record('Citroën', 'C5'), record('CITROËN', 'C5'), record('Citroen', 'C5 ')]
+        dimensions.resolve(spellings)
+        # However the database collation groups them, each spelling has an id
+        assert all(dimensions.model_id(spelling) for spelling in spellings)
@@ -0,0 +1,53 @@
+import pytest
+
+from controllers import HomeController
+from controllers.home_controller import LISTING_SORTS
+from models import Listing
+
+
+def index_columns() -> dict:
+    return {index.name: tuple(column.name for column in index.columns) for index in Listing.__table__.indexes}
+
+
+def test_no_index_repeats_what_innodb_already_stores():
+    indexes = index_columns()
+    assert 'idx_year_model' not in indexes
+    # InnoDB appends the primary key to every secondary index
+    assert all(columns[-1] != 'vin' for columns in indexes.values())
+
+
+@pytest.mark.parametrize('sort', LISTING_SORTS)
+def test_each_sort_has_an_index_in_its_order(sort):
+    keys = tuple(column.name for column in LISTING_SORTS[sort][0])
+    assert any(columns[:2 + len(keys)] == ('model_id', 'year') + keys for columns in index_columns().values())
+
+
+@pytest.mark.parametrize('sort', LISTING_SORTS)
+def test_pages_cover_every_listing_once_in_order(app, vehicle, sort):
+    _, year, make, model, _ = vehicle
+    keys, descending, _ = LISTING_SORTS[sort]
+    controller = HomeController()
+    with app.app_context():
+        everything, cursor = controller.listing_page(year, make, model, sort, limit=10000)
+        assert cursor is None
+        
+        paged = []
+        while True:
+            rows, cursor = controller.listing_page(year, make, model, sort, cursor=cursor, limit=3)
+            paged.extend(rows)
+            if cursor is None:
+                break
+    
+    order = [tuple(getattr(row, column.key) for column in keys) + (row.vin,) for row in everything]
+    assert order == sorted(order, reverse=descending)
+    assert [row.vin for row in paged] == [row.vin for row in everything]
+    assert len(everything) > 3
+
+
+def test_a_cursor_only_works_for_its_own_sort(app, vehicle):
+    _, year, make, model, _ = vehicle
+    controller = HomeController()
+    with app.app_context():
+        _, cursor = controller.listing_page(year, make, model, 'price', limit=1)
+        with pytest.raises(ValueError, match="cursor is invalid"):
+            controller.listing_page(year, make, model, 'mileage', cursor=cursor, limit=1)
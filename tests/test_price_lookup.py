@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from controllers import HomeController
+from controllers.async_api_controller import AsyncApiController
+from models import db, Prediction, RegressionStat, Vehicle
+from services import PredictionFit, invalidate_predictions, model_id_cache, prediction_lock_names
+from services.price_lookup import FITTED_COLUMNS
+
+
+def forget_predictions(app) -> None:
+    """Delete stored predictions and empty the in-process caches."""
+    with app.app_context():
+        db.session.execute(delete(Prediction))
+        db.session.commit()
+    invalidate_predictions()
+    model_id_cache.invalidate()
+
+
+@pytest.fixture
+def vehicles(app):
+    """(year, make, model) of a few groups with enough listings to fit, and one unknown vehicle."""
+    with app.app_context():
+        rows = db.session.execute(
+            select(RegressionStat.year, Vehicle.make, Vehicle.model)
+            .join(Vehicle, RegressionStat.model_id == Vehicle.model_id)
+            .where(RegressionStat.n >= 5)
+            .order_by(RegressionStat.n.desc())
+            .limit(5)
+        ).all()
+    return [tuple(row) for row in rows] + [(2015, 'Nonexistent', 'Car')]
+
+
+def async_price_models(app, vehicles) -> dict:
+    uri = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite://', 'sqlite+aiosqlite://', 1)
+    controller = AsyncApiController(create_async_engine(uri), app, fit_workers=1)
+    
+    async def run():
+        try:
+            return await controller.price_models(vehicles)
+        finally:
+            await controller.close()
+    return asyncio.run(run())
+
+
+def line(price_model):
+    return None if price_model is None else (price_model.slope, price_model.intercept, price_model.sample_size)
+
+
+@pytest.mark.parametrize('fitted_by', ['sync', 'async'])
+def test_sync_and_async_controllers_agree(app, vehicles, fitted_by):
+    forget_predictions(app)
+    with app.app_context():
+        if fitted_by == 'sync':
+            fitted = HomeController().price_models(vehicles)
+        else:
+            fitted = async_price_models(app, vehicles)
+        stored = db.session.scalar(select(func.count()).select_from(Prediction))
+    
+    # The other controller reads what the first one stored
+    invalidate_predictions()
+    model_id_cache.invalidate()
+    with app.app_context():
+        if fitted_by == 'sync':
+            read = async_price_models(app, vehicles)
+        else:
+            read = HomeController().price_models(vehicles)
+        assert db.session.scalar(select(func.count()).select_from(Prediction)) == stored
+    
+    assert stored == len(vehicles) - 1
+    assert fitted[(2015, 'Nonexistent', 'Car')] is None
+    assert {vehicle: line(price_model) for vehicle, price_model in fitted.items()} == {
+        vehicle: line(price_model) for vehicle, price_model in read.items()
+    }
+
+
+def test_lookup_matches_vehicles_case_insensitively(app, vehicles):
+    forget_predictions(app)
+    year, make, model = vehicles[0]
+    with app.app_context():
+        price_models = HomeController().price_models([(year, make, model), (year, make.upper(), model.upper())])
+    assert line(price_models[(year, make, model)]) == line(price_models[(year, make.upper(), model.upper())])
+
+
+def fittable_keys(app, count: int = 5) -> set:
+    with app.app_context():
+        return set(db.session.execute(
+            select(RegressionStat.year, RegressionStat.model_id)
+            .where(RegressionStat.n >= 5)
+            .order_by(RegressionStat.n.desc())
+            .limit(count)
+        ).all())
+
+
+def test_storing_predictions_is_idempotent(app):
+    forget_predictions(app)
+    keys = fittable_keys(app)
+    with app.app_context():
+        fit = PredictionFit(keys)
+        predictions = fit.fit_predictions(db.session.scalars(fit.stats_query()).all())
+        first = next(prediction for prediction in predictions if (prediction.year, prediction.model_id) == min(keys))
+        # Another process stored one of the groups first, with a different line
+        db.session.execute(insert(Prediction).values(
+            {**{column: getattr(first, column) for column in FITTED_COLUMNS}, 'slope': 123.0}
+        ))
+        
+        for _ in range(2):
+            db.session.execute(fit.store_query(predictions))
+            db.session.commit()
+        fit.add_stored(db.session.scalars(fit.stored_query()))
+        
+        assert db.session.scalar(select(func.count()).select_from(Prediction)) == len(keys)
+        assert fit.price_models.keys() == keys
+        assert fit.price_models[min(keys)].slope == 123.0
+
+
+def test_fit_keeps_groups_another_process_stored_meanwhile(app, monkeypatch):
+    forget_predictions(app)
+    keys = fittable_keys(app)
+    raced = min(keys)
+    fit_predictions = PredictionFit.fit_predictions
+    
+    def racing_fit(stats, archived=()):
+        predictions = fit_predictions(stats, archived)
+        # Stored on another connection between the re-read and the insert
+        with db.engine.begin() as connection:
+            prediction = next(p for p in predictions if (p.year, p.model_id) == raced)
+            connection.execute(insert(Prediction).values(
+                {**{column: getattr(prediction, column) for column in FITTED_COLUMNS}, 'slope': 123.0}
+            ))
+        return predictions
+    monkeypatch.setattr(PredictionFit, 'fit_predictions', staticmethod(racing_fit))
+    
+    with app.app_context():
+        price_models = HomeController()._fit(keys)
+        assert db.session.scalar(select(func.count()).select_from(Prediction)) == len(keys)
+    assert price_models.keys() == keys
+    assert price_models[raced].slope == 123.0
+    assert all(price_model.prediction_id is not None for price_model in price_models.values())
+
+
+def test_lock_names_are_bounded_per_request():
+    keys = {(year, model_id) for year in range(1990, 2026) for model_id in range(1, 500)}
+    assert len(prediction_lock_names(keys, slots=16)) == 16
+    assert prediction_lock_names({(2010, 7), (2020, 7)}) == prediction_lock_names({(2015, 7)})
@@ -0,0 +1,111 @@
+import pytest
+from flask import Flask
+from sqlalchemy import delete, select
+
+from models import db, Listing, Prediction
+from routes import QUERY_BUDGETS
+from scripts.audit_query_plans import sample_requests
+from services import (
+    QueryBudgetExceeded,
+    init_query_diagnostics,
+    invalidate_predictions,
+    model_id_cache,
+    query_budget,
+    statement_shape,
+)
+
+# A shape repeated more often than this in one request is an N+1
+MAX_REPEATS = 5
+
+
+def route_rule(app: Flask, method: str, path: str) -> str:
+    """Return the URL rule a request is dispatched to, as QUERY_BUDGETS keys them."""
+    rule, _ = app.url_map.bind('localhost').match(path, method=method, return_rule=True)
+    return rule.rule
+
+
+def reset_caches(app: Flask) -> None:
+    """Forget every cached and stored prediction, so the next estimate has to fit."""
+    with app.app_context():
+        db.session.execute(delete(Prediction))
+        db.session.commit()
+    invalidate_predictions()
+    model_id_cache.invalidate()
+
+
+class TestStatementShape:
+    
+    def test_collapses_whitespace(self):
+        assert statement_shape("SELECT  a\n  FROM t\tWHERE b = ?") == "SELECT a FROM t WHERE b = ?"
+    
+    @pytest.mark.parametrize('placeholder', ['?', '%s', ':vin', '%(vin)s'])
+    def test_in_lists_of_any_length_share_a_shape(self, placeholder):
+        one = statement_shape(f"SELECT * FROM listings WHERE vin IN ({placeholder})")
+        many = statement_shape(
+            f"SELECT * FROM listings WHERE vin IN ({placeholder}, {placeholder}, {placeholder})"
+        )
+        assert one == many == "SELECT * FROM listings WHERE vin IN (?)"
+    
+    def test_values_lists_of_any_length_share_a_shape(self):
+        one = statement_shape("INSERT INTO t (a, b) VALUES (?, ?)")
+        many = statement_shape("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)")
+        assert one == many
+    
+    def test_different_statements_keep_different_shapes(self):
+        assert statement_shape("SELECT a FROM t WHERE b = ?") != statement_shape("SELECT a FROM t WHERE c = ?")
+
+
+@pytest.mark.parametrize('cold', [True, False], ids=['cold', 'warm'])
+def test_routes_stay_within_their_query_budget(app, vehicle, cold):
+    client = app.test_client()
+    for method, path, kwargs in sample_requests(*vehicle):
+        budget = QUERY_BUDGETS[route_rule(app, method, path)]
+        if cold:
+            reset_caches(app)
+        # The app context lets a failure name the line that ran the repeated statement
+        with app.app_context(), query_budget(max_queries=budget, max_repeats=MAX_REPEATS) as log:
+            response = client.open(path, method=method, **kwargs)
+        assert response.status_code < 500, f"{method} {path} returned {response.status_code}"
+        assert log.count <= budget
+
+
+def test_every_budgeted_route_is_exercised(app, vehicle):
+    rules = {route_rule(app, method, path) for method, path, _ in sample_requests(*vehicle)}
+    assert rules == set(QUERY_BUDGETS) - {'/'}
+
+
+def test_query_budget_catches_an_n_plus_one(app):
+    with app.app_context():
+        vins = db.session.scalars(select(Listing.vin).limit(MAX_REPEATS + 1)).all()
+        with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+            with query_budget(max_repeats=MAX_REPEATS):
+                for vin in vins:
+                    db.session.execute(select(Listing.price).where(Listing.vin == vin)).one()
+
+
+def test_query_budget_catches_too_many_statements(app):
+    with app.app_context():
+        with pytest.raises(QueryBudgetExceeded, match="3 statements, budget is 2"):
+            with query_budget(max_queries=2):
+                for _ in range(3):
+                    db.session.execute(select(Listing.vin).limit(1)).all()
+
+
+def test_raise_mode_fails_a_request_with_an_n_plus_one(app):
+    diagnosed = Flask(__name__)
+    diagnosed.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=app.config['SQLALCHEMY_DATABASE_URI'],
+        QUERY_DIAGNOSTICS='raise',
+        QUERY_N_PLUS_ONE_THRESHOLD=MAX_REPEATS,
+    )
+    db.init_app(diagnosed)
+    
+    @diagnosed.route('/prices')
+    def prices():
+        vins = db.session.scalars(select(Listing.vin).limit(MAX_REPEATS + 1)).all()
+        return {vin: str(db.session.scalar(select(Listing.price).where(Listing.vin == vin))) for vin in vins}
+    
+    init_query_diagnostics(diagnosed)
+    with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+        diagnosed.test_client().get('/prices')
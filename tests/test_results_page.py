@@ -0,0 +1,35 @@
+from controllers import HomeController
+
+
+def estimate_text(app, vehicle) -> str:
+    _, year, make, model, mileage = vehicle
+    with app.app_context():
+        price_model = HomeController().price_models([(year, make, model)])[(year, make, model)]
+    return f"${int(round(price_model.predict(mileage) / 100.0)) * 100:,}"
+
+
+def post_search(app, vehicle):
+    _, year, make, model, mileage = vehicle
+    return app.test_client().post(
+        '/results', data={'year': year, 'make': make, 'model': model, 'mileage': mileage}
+    )
+
+
+def test_results_show_the_estimate_and_sample(app, vehicle):
+    response = post_search(app, vehicle)
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert estimate_text(app, vehicle) in page
+    assert '<table' in page
+
+
+def test_an_empty_sample_still_shows_the_estimate(app, vehicle, monkeypatch):
+    # The generated feed was last seen in 2024, so no listing is recent enough
+    monkeypatch.setitem(app.config, 'SAMPLE_MAX_AGE_DAYS', 30)
+    response = post_search(app, vehicle)
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert estimate_text(app, vehicle) in page
+    assert '$0<' not in page
+    assert 'No sample listings available.' in page
+    assert '<table' not in page
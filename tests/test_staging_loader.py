@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import MetaData, create_engine, insert, select, text
+
+from models import Dealer, Vehicle
+from scripts.staging_loader import (
+    RESOLVE_DEALERS,
+    RESOLVE_VEHICLES,
+    MERGE_WEBSITES,
+    VALID_ROWS,
+    build_staging_table,
+    foreign_key_rename_sql,
+    merge_listings_sql,
+)
+
+
+def line(line_no, vin, make, dealer_key, **fields) -> dict:
+    return {
+        'line_no': line_no, 'vin': vin, 'year': 2018, 'make': make, 'model': 'Model', 'dealer_name': make,
+        'dealer_city': 'Austin', 'dealer_state': 'TX', 'dealer_zip': '78701', 'dealer_key': dealer_key,
+        'first_seen': date(2024, 1, 1), 'last_seen': date(2024, 2, 1), **fields,
+    }
+
+
+@pytest.fixture
+def staging():
+    """An in-memory database with the staging, vehicles and dealers tables."""
+    metadata = MetaData()
+    staging = build_staging_table(metadata)
+    Vehicle.__table__.to_metadata(metadata)
+    Dealer.__table__.to_metadata(metadata)
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(staging), [
+            # Superseded by the next line for the same VIN
+            line(1, '1HGCM82633A000001', 'Superseded', 'a' * 40),
+            line(2, '1HGCM82633A000001', 'Kept', 'b' * 40),
+            # Rejected for a missing year
+            line(3, '1HGCM82633A000002', 'Rejected', 'c' * 40, year=None),
+        ])
+    return engine
+
+
+@pytest.mark.parametrize('statement', [
+    RESOLVE_VEHICLES, RESOLVE_DEALERS, MERGE_WEBSITES, merge_listings_sql('listings', upsert=True),
+])
+def test_every_step_reads_only_the_kept_lines(statement):
+    assert f"JOIN ({VALID_ROWS}) latest USING (line_no)" in statement
+
+
+def test_rejected_and_superseded_lines_add_no_vehicles_or_dealers(staging):
+    with staging.begin() as connection:
+        connection.execute(text(RESOLVE_VEHICLES))
+        connection.execute(text(RESOLVE_DEALERS))
+        assert connection.execute(select(Vehicle.__table__.c.make)).scalars().all() == ['Kept']
+        assert connection.execute(select(Dealer.__table__.c.natural_key)).scalars().all() == ['b' * 40]
+
+
+def test_swapped_in_foreign_keys_take_the_table_name():
+    foreign_key = {
+        'name': 'listings_new_ibfk_2',
+        'constrained_columns': ['dealer_id'],
+        'referred_table': 'dealers',
+        'referred_columns': ['dealer_id'],
+        'options': {'ondelete': 'CASCADE'},
+    }
+    assert foreign_key_rename_sql(foreign_key, 'listings', 'listings_new') == (
+        "ALTER TABLE listings DROP FOREIGN KEY listings_new_ibfk_2, "
+        "ADD CONSTRAINT listings_ibfk_2 FOREIGN KEY (dealer_id) REFERENCES dealers (dealer_id) ON DELETE CASCADE"
+    )
+    # MySQL versions that rename them with the table leave nothing to do
+    assert foreign_key_rename_sql({**foreign_key, 'name': 'listings_ibfk_2'}, 'listings', 'listings_new') is None
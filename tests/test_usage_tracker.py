@@ -0,0 +1,78 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from controllers import HomeController
+from models import db, Prediction, RegressionStat, Vehicle
+from services import UsageTracker
+
+
+def stale_prediction_id(app) -> int:
+    """Store a prediction for some group and date its last use a week back."""
+    with app.app_context():
+        year, make, model = db.session.execute(
+            select(RegressionStat.year, Vehicle.make, Vehicle.model)
+            .join(Vehicle, RegressionStat.model_id == Vehicle.model_id)
+            .order_by(RegressionStat.n.desc())
+            .limit(1)
+        ).one()
+        HomeController().price_models([(year, make, model)])
+        prediction_id = db.session.scalar(select(Prediction.id).limit(1))
+        db.session.execute(
+            update(Prediction).where(Prediction.id == prediction_id)
+            .values(last_used_at=datetime.utcnow() - timedelta(days=7))
+        )
+        db.session.commit()
+        return prediction_id
+
+
+def last_used_at(app, prediction_id: int) -> datetime:
+    with app.app_context():
+        return db.session.scalar(select(Prediction.last_used_at).where(Prediction.id == prediction_id))
+
+
+def test_configuring_starts_no_thread(app):
+    tracker = UsageTracker()
+    tracker.configure(app, 3600)
+    assert tracker._thread is None
+
+
+def test_first_touch_starts_the_thread_and_stop_flushes(app):
+    prediction_id = stale_prediction_id(app)
+    tracker = UsageTracker()
+    tracker.configure(app, 3600)
+    
+    tracker.touch(prediction_id)
+    assert tracker._thread.is_alive()
+    thread = tracker._thread
+    tracker.touch(prediction_id)
+    assert tracker._thread is thread
+    
+    tracker.stop()
+    assert not thread.is_alive()
+    assert len(tracker) == 0
+    assert last_used_at(app, prediction_id) > datetime.utcnow() - timedelta(minutes=1)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_a_forked_process_starts_its_own_thread(app):
+    tracker = UsageTracker()
+    tracker.configure(app, 3600)
+    tracker.touch(1)
+    
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The child inherits the parent's state, but not its thread
+        tracker.touch(2)
+        started = tracker._thread.is_alive() and tracker._pid == os.getpid()
+        os.write(write_end, b'1' if started else b'0')
+        os._exit(0)
+    os.close(write_end)
+    started = os.read(read_end, 1)
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    tracker.stop()
+    assert started == b'1'